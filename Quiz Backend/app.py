@@ -1,12 +1,22 @@
 # app.py
-from flask import Flask
+import threading
+
+from flask import Flask, Response, jsonify
 from flask_cors import CORS
 from controllers.Admin_controller import admin_bp
 from controllers.Student_controller import student_bp
 from flask_mail import Mail
+from models.db_connection import get_pool_stats
+from models.admission import login_admission
+from services.mailer import mail_dispatcher
+from services.drive import drive_uploader
+from services.sheets_sync import start_sync
+from models.sessions import session_sweeper
+from models import metrics, notifications
+from models.quiz_cache import quiz_content_cache
 
 app = Flask(__name__)
-CORS(app)  # Enable CORS for frontend-backend communication
+CORS(app, expose_headers=["Content-Disposition"])  # Enable CORS for frontend-backend communication; downloads read the file name
 
 
 # Email Configuration
@@ -19,15 +29,72 @@ app.config['MAIL_PASSWORD'] = 'hxgd iqxn bver eeea'
 # Initialize Mail
 mail = Mail(app)
 
+# Notification emails are sent from background threads
+mail_dispatcher.init_app(app)
+
+# Per-route latency, DB query count/time and slow-query logging (METRICS_CONFIG)
+metrics.init_app(app)
+metrics.registry.add_collector('quiz_db_pool', get_pool_stats)
+metrics.registry.add_collector('quiz_login_admission', login_admission.stats)
+metrics.registry.add_collector('quiz_content_cache', quiz_content_cache.stats)
+metrics.registry.add_collector('quiz_notification_cache', notifications.stats)
+
+_workers_started = False
+_workers_lock = threading.Lock()
+
+
+def start_background_workers():
+    """Start this process's background threads (idempotent).
+
+    serve.py calls it when a server process starts, and other servers start the
+    workers on their first request, so importing app (tests, scripts) does not
+    connect to MySQL.
+    """
+    global _workers_started
+    with _workers_lock:
+        if _workers_started:
+            return
+        _workers_started = True
+    # Study materials are copied to Google Drive in the background; unfinished copies resume here
+    drive_uploader.start()
+    # Notification e-mails left pending by a restart are sent again
+    mail_dispatcher.start()
+    # Expired login sessions are deleted periodically (SESSION_CONFIG['sweep_interval'])
+    session_sweeper.start()
+    # Quiz results left unsynced by a restart reach Google Sheets without waiting for a submission
+    start_sync()
+
+
+@app.before_request
+def ensure_background_workers():
+    if not _workers_started:
+        start_background_workers()
+
 
 # Test API to check if the server is running
 @app.route('/hello', methods=['GET'])
 def hello_world():
     return "Hello, World! The flask server is running !"
 
+# Prometheus-style metrics (request latency, DB time, external calls, pool and admission counters)
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+# Connection pool statistics (checkouts, waits, wait time) for monitoring
+@app.route('/pool/stats', methods=['GET'])
+def pool_stats():
+    return jsonify(get_pool_stats()), 200
+
+# Login admission control counters (admitted, queued, rejected by reason)
+@app.route('/admission/stats', methods=['GET'])
+def admission_stats():
+    return jsonify(login_admission.stats()), 200
+
 # # Register Blueprints
 app.register_blueprint(admin_bp, url_prefix='/api/admin')
 app.register_blueprint(student_bp, url_prefix='/api/student')
 
+# Development server only; production runs `python serve.py` (see wsgi.py)
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,639 @@
+"""Load test of the student exam flow, as quiz.html drives it.
+
+Each virtual student runs: login -> list quizzes -> fetch questions ->
+submit -> view results -> logout. Throughput and p50/p95/p99 are reported
+per endpoint and can be compared with a stored baseline:
+
+    python benchmark.py run --students 500 --quizzes 5 --questions 20 --save-baseline
+    python benchmark.py run --students 500 --quizzes 5 --questions 20     # exits 1 on regression
+
+By default everything runs against a separate database (quiz_bench, created
+and migrated on demand) with the Google Sheets sync writing to a local CSV,
+so a run never touches real data. The server is started with serve.py's
+waitress settings unless --url points at one that is already running.
+
+`submit` compares the submission path from before the single-query rewrite
+(four round trips, COUNT then INSERT) with models/submissions.py, every
+student sending --submits submissions of one quiz at the same moment:
+
+    python benchmark.py submit --students 200 --submits 4 --attempt-limit 2
+
+It reports p50/p95/p99 per path and how many stored attempts exceed the
+attempt limit. The baseline runs on the schema it was written for, without
+the unique attempt key (restored before the current path runs).
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+import config
+from loadtest import summarize, wait_until_up, BACKEND_DIR
+
+BASELINE_FILE = os.path.join(BACKEND_DIR, 'benchmark_baseline.json')
+BENCH_PASSWORD = 'bench-password'
+EMAIL_DOMAIN = 'bench.local'
+QUIZ_PREFIX = 'bench-quiz-'
+CLASS_NAME = 'bench-class'
+
+ENDPOINTS = ['login', 'list_quizzes', 'questions', 'submit', 'results', 'logout']
+
+
+def use_bench_environment(database):
+    """Point the app at the benchmark database and keep Sheets sync and Drive copies local."""
+    config.DB_CONFIG['database'] = database
+    config.SHEETS_CONFIG['backend'] = 'local'
+    config.SHEETS_CONFIG['local_path'] = os.path.join(BACKEND_DIR, 'uploads', f'{database}_sheet.csv')
+    config.DRIVE_CONFIG['backend'] = 'local'
+    # Virtual students send distinct X-Forwarded-For addresses, so per-IP
+    # buckets behave as they would with real clients.
+    config.ADMISSION_CONFIG['trust_proxy'] = True
+
+
+def create_database(database):
+    import mysql.connector
+
+    server = {key: value for key, value in config.DB_CONFIG.items() if key != 'database'}
+    conn = mysql.connector.connect(**server)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{database}`")
+    finally:
+        cursor.close()
+        conn.close()
+
+
+#                   ----------- Synthetic data -----------
+
+def clean(cursor):
+    """Remove everything a previous seed() created."""
+    email_pattern = f"bench-%@{EMAIL_DOMAIN}"
+    cursor.execute("""
+        DELETE FROM student_quiz_visibility
+        WHERE student_id IN (SELECT id FROM students WHERE email LIKE %s)
+    """, (email_pattern,))
+    cursor.execute("DELETE FROM students WHERE email LIKE %s", (email_pattern,))
+    cursor.execute("DELETE FROM quizzes WHERE title LIKE %s", (QUIZ_PREFIX + '%',))
+    cursor.execute("DELETE FROM classes WHERE name = %s", (CLASS_NAME,))
+
+
+def seed(cursor, students, quizzes, questions, options=4, chunk_size=1000, attempt_limit=1000000):
+    """Create one class of students with `quizzes` quizzes of `questions` questions assigned.
+
+    Returns [(student_id, email)]. Every student shares one password hash so
+    seeding does not spend minutes in the password hasher.
+    """
+    from models import visibility
+    from models.passwords import hash_password
+
+    cursor.execute("INSERT INTO classes (name) VALUES (%s)", (CLASS_NAME,))
+    class_id = cursor.lastrowid
+
+    password_hash = hash_password(BENCH_PASSWORD)
+    for start in range(0, students, chunk_size):
+        rows = [(f"Bench Student {i}", f"bench-{i}@{EMAIL_DOMAIN}", password_hash, class_id)
+                for i in range(start, min(students, start + chunk_size))]
+        cursor.execute(
+            "INSERT INTO students (name, email, password, class_id) VALUES "
+            + ', '.join(['(%s, %s, %s, %s)'] * len(rows)),
+            [value for row in rows for value in row]
+        )
+
+    for q in range(quizzes):
+        cursor.execute(
+            "INSERT INTO quizzes (title, description, attempt_limit) VALUES (%s, %s, %s)",
+            (f"{QUIZ_PREFIX}{q}", "Synthetic benchmark quiz", attempt_limit)
+        )
+        quiz_id = cursor.lastrowid
+        cursor.executemany(
+            "INSERT INTO quiz_questions (quiz_id, question) VALUES (%s, %s)",
+            [(quiz_id, f"Benchmark question {n} of quiz {q}?") for n in range(questions)]
+        )
+        cursor.execute("SELECT id FROM quiz_questions WHERE quiz_id = %s ORDER BY id", (quiz_id,))
+        question_ids = [row[0] for row in cursor.fetchall()]
+        cursor.executemany(
+            "INSERT INTO quiz_options (question_id, option_text, is_correct) VALUES (%s, %s, %s)",
+            [(question_id, f"Option {o}", 1 if o == 0 else 0)
+             for question_id in question_ids for o in range(options)]
+        )
+        cursor.execute("INSERT INTO quiz_class_assignments (quiz_id, class_id) VALUES (%s, %s)",
+                       (quiz_id, class_id))
+        visibility.grant_class(cursor, quiz_id, class_id)
+
+    cursor.execute(
+        "SELECT id, email FROM students WHERE class_id = %s ORDER BY id", (class_id,)
+    )
+    return [(row[0], row[1]) for row in cursor.fetchall()]
+
+
+def prepare(students, quizzes, questions, attempt_limit=1000000):
+    """Migrate, clean and seed the benchmark database; returns the seeded students."""
+    from migrate import migrate
+    from models.db_connection import get_db_connection
+
+    migrate()
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        clean(cursor)
+        seeded = seed(cursor, students, quizzes, questions, attempt_limit=attempt_limit)
+        conn.commit()
+        return seeded
+    finally:
+        cursor.close()
+        conn.close()
+
+
+#                   ----------- Exam flow -----------
+
+class ExamClient:
+    """One virtual student on a keep-alive connection, timing every request."""
+
+    def __init__(self, host, port, student_id, email, address, rng, record):
+        self.host, self.port = host, port
+        self.student_id = student_id
+        self.email = email
+        self.headers = {'X-Forwarded-For': address, 'Content-Type': 'application/json'}
+        self.rng = rng
+        self.record = record
+        self.conn = http.client.HTTPConnection(host, port, timeout=60)
+
+    def request(self, endpoint, method, path, body=None):
+        payload = json.dumps(body).encode() if body is not None else None
+        started = time.perf_counter()
+        try:
+            self.conn.request(method, path, body=payload, headers=self.headers)
+            response = self.conn.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            self.record(endpoint, None, time.perf_counter() - started)
+            return None, None
+        self.record(endpoint, response.status, time.perf_counter() - started)
+        try:
+            return response.status, json.loads(data) if data else None
+        except ValueError:
+            return response.status, None
+
+    def run(self):
+        status, body = self.request('login', 'POST', '/api/student/login',
+                                    {"email": self.email, "password": BENCH_PASSWORD})
+        if status != 200:
+            return False
+        self.headers['Authorization'] = f"Bearer {body['session_token']}"
+        token = body['session_token']
+        try:
+            status, quizzes = self.request('list_quizzes', 'GET', f'/api/student/student/{self.student_id}/quizzes')
+            if status != 200 or not quizzes:
+                return False
+            quiz_id = self.rng.choice(quizzes)['quiz_id']
+
+            status, questions = self.request('questions', 'GET', f'/api/student/quizzes/{quiz_id}/questions')
+            if status != 200:
+                return False
+            answers = {str(q['question_id']): self.rng.choice(q['options'])['option_id'] for q in questions}
+
+            status, _ = self.request('submit', 'POST',
+                                     f'/api/student/student/{self.student_id}/quizzes/{quiz_id}/submit',
+                                     {"answers": answers})
+            if status not in (200, 201):
+                return False
+            status, _ = self.request('results', 'GET', f'/api/student/student/{self.student_id}/results')
+            return status == 200
+        finally:
+            self.request('logout', 'POST', '/api/student/logout', {"session_token": token})
+            self.conn.close()
+
+
+def run_exam_flow(base_url, students, concurrency=32, seed_value=1):
+    """Run every student through the exam flow with `concurrency` in flight."""
+    parts = urlsplit(base_url)
+    host, port = parts.hostname, parts.port or 80
+
+    samples = {endpoint: [] for endpoint in ENDPOINTS}
+    statuses = {endpoint: {} for endpoint in ENDPOINTS}
+    lock = threading.Lock()
+
+    def record(endpoint, status, elapsed):
+        with lock:
+            key = str(status) if status is not None else 'connection_error'
+            statuses[endpoint][key] = statuses[endpoint].get(key, 0) + 1
+            if status is not None and status < 400:
+                samples[endpoint].append(elapsed)
+
+    queue = list(enumerate(students))
+    queue.reverse()
+    completed = [0]
+
+    def worker():
+        while True:
+            with lock:
+                if not queue:
+                    return
+                index, (student_id, email) = queue.pop()
+            address = f"10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256}"
+            client = ExamClient(host, port, student_id, email, address,
+                                random.Random(seed_value * 1000003 + index), record)
+            if client.run():
+                with lock:
+                    completed[0] += 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    report = {"students": len(students), "completed": completed[0], "seconds": round(elapsed, 2),
+              "flows_per_second": round(completed[0] / elapsed, 2) if elapsed else 0.0, "endpoints": {}}
+    for endpoint in ENDPOINTS:
+        failed = sum(count for status, count in statuses[endpoint].items()
+                     if status == 'connection_error' or int(status) >= 400)
+        stats = summarize(samples[endpoint], failed, elapsed)
+        stats["statuses"] = statuses[endpoint]
+        report["endpoints"][endpoint] = stats
+    return report
+
+
+def print_report(report):
+    print(f"{report['completed']}/{report['students']} exam flows in {report['seconds']} s "
+          f"({report['flows_per_second']} flows/s)")
+    print(f"{'endpoint':13} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  statuses")
+    for endpoint, stats in report["endpoints"].items():
+        print(f"{endpoint:13} {stats['rps']:9.1f} {stats['p50_ms'] or 0:9.2f} {stats['p95_ms'] or 0:9.2f} "
+              f"{stats['p99_ms'] or 0:9.2f}  {stats['statuses']}")
+
+
+#                   ----------- Submit paths -----------
+
+def baseline_submit(conn, cursor, student_id, quiz_id, answers):
+    """The submit path before the single-query rewrite: four round trips, then COUNT + 1 as the attempt."""
+    from models.scoring import AnswerKey, pack_answers
+    from models.submissions import SubmitResult
+
+    cursor.execute("SELECT attempt_limit FROM quizzes WHERE id = %s", (quiz_id,))
+    quiz_data = cursor.fetchone()
+    if not quiz_data:
+        return SubmitResult('not_found', None, None, None)
+    attempt_limit = quiz_data['attempt_limit']
+
+    cursor.execute(
+        "SELECT COUNT(*) AS attempt_count FROM quiz_results WHERE student_id = %s AND quiz_id = %s",
+        (student_id, quiz_id)
+    )
+    attempt_count = cursor.fetchone()['attempt_count']
+    if attempt_count >= attempt_limit:
+        return SubmitResult('limit_reached', None, None, attempt_limit)
+
+    cursor.execute("""
+        SELECT 1 FROM quizzes q
+        LEFT JOIN quiz_student_assignments qsa ON q.id = qsa.quiz_id AND qsa.student_id = %s
+        LEFT JOIN quiz_class_assignments qca ON q.id = qca.quiz_id
+        LEFT JOIN students s ON qca.class_id = s.class_id
+        WHERE q.id = %s AND (qsa.quiz_id IS NOT NULL OR s.id = %s)
+    """, (student_id, quiz_id, student_id))
+    if not cursor.fetchall():
+        return SubmitResult('not_assigned', None, None, attempt_limit)
+
+    cursor.execute("""
+        SELECT q.id AS question_id, o.id AS correct_option_id
+        FROM quiz_questions q
+        JOIN quiz_options o ON q.id = o.question_id
+        WHERE o.is_correct = 1 AND q.quiz_id = %s
+    """, (quiz_id,))
+    answer_key = AnswerKey.from_rows(cursor.fetchall())
+    score = answer_key.score(answers)
+    feedback = f"Your score is {score}/{len(answer_key)}."
+
+    cursor.execute("""
+        INSERT INTO quiz_results (student_id, quiz_id, attempt_number, score, feedback, answers)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """, (student_id, quiz_id, attempt_count + 1, score, feedback, pack_answers(answers)))
+    conn.commit()
+    return SubmitResult('stored', score, feedback, attempt_limit)
+
+
+def current_submit(conn, cursor, student_id, quiz_id, answers):
+    from models.submissions import submit_attempt
+    return submit_attempt(conn, cursor, student_id, quiz_id, answers)
+
+
+SUBMIT_PATHS = {'baseline': baseline_submit, 'current': current_submit}
+
+
+def set_unique_attempt_key(cursor, present):
+    """Add or remove uq_quiz_results_attempt (migration 0002), keeping an index for the student foreign key."""
+    if present:
+        cursor.execute("""
+            ALTER TABLE quiz_results
+                ADD UNIQUE KEY uq_quiz_results_attempt (student_id, quiz_id, attempt_number),
+                DROP INDEX idx_bench_results_student
+        """)
+    else:
+        cursor.execute("""
+            ALTER TABLE quiz_results
+                ADD KEY idx_bench_results_student (student_id, quiz_id),
+                DROP INDEX uq_quiz_results_attempt
+        """)
+
+
+def delete_bench_results(cursor):
+    cursor.execute("""
+        DELETE FROM quiz_results
+        WHERE student_id IN (SELECT id FROM students WHERE email LIKE %s)
+    """, (f"bench-%@{EMAIL_DOMAIN}",))
+
+
+def load_answers(cursor, quiz_ids):
+    """{quiz_id: {question_id: option_id}} with the first option of every question."""
+    cursor.execute(f"""
+        SELECT q.quiz_id, q.id AS question_id, MIN(o.id) AS option_id
+        FROM quiz_questions q
+        JOIN quiz_options o ON o.question_id = q.id
+        WHERE q.quiz_id IN ({', '.join(['%s'] * len(quiz_ids))})
+        GROUP BY q.quiz_id, q.id
+    """, quiz_ids)
+    answers = {quiz_id: {} for quiz_id in quiz_ids}
+    for quiz_id, question_id, option_id in cursor.fetchall():
+        answers[quiz_id][str(question_id)] = option_id
+    return answers
+
+
+def attempt_violations(cursor, attempt_limit):
+    """(attempts stored beyond the limit, attempts sharing an attempt number) for the bench students."""
+    cursor.execute("""
+        SELECT COUNT(*), COUNT(DISTINCT qr.attempt_number)
+        FROM quiz_results qr
+        JOIN students s ON s.id = qr.student_id
+        WHERE s.email LIKE %s
+        GROUP BY qr.student_id, qr.quiz_id
+    """, (f"bench-%@{EMAIL_DOMAIN}",))
+    rows = cursor.fetchall()
+    over_limit = sum(max(0, attempts - attempt_limit) for attempts, _ in rows)
+    duplicate_numbers = sum(attempts - numbers for attempts, numbers in rows)
+    return over_limit, duplicate_numbers
+
+
+def run_concurrent_submits(submit, students, answers, submits, concurrency):
+    """Every student sends `submits` submissions of one quiz at once, `concurrency` students at a time.
+
+    Returns (latencies in seconds, {outcome: count}); outcomes are SubmitResult
+    statuses or 'error <MySQL error number>'.
+    """
+    from models.db_connection import get_db_connection
+
+    quiz_ids = sorted(answers)
+    latencies, outcomes = [], {}
+    lock = threading.Lock()
+    queue = list(enumerate(students))
+    queue.reverse()
+
+    def submit_once(student_id, quiz_id, barrier):
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        try:
+            barrier.wait()
+            started = time.perf_counter()
+            try:
+                outcome = submit(conn, cursor, student_id, quiz_id, answers[quiz_id]).status
+            except Exception as e:
+                conn.rollback()
+                outcome = f"error {e.args[0] if e.args else type(e).__name__}"
+            elapsed = time.perf_counter() - started
+        finally:
+            cursor.close()
+            conn.close()
+        with lock:
+            latencies.append(elapsed)
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    def worker():
+        while True:
+            with lock:
+                if not queue:
+                    return
+                index, (student_id, _) = queue.pop()
+            quiz_id = quiz_ids[index % len(quiz_ids)]
+            barrier = threading.Barrier(submits)
+            threads = [threading.Thread(target=submit_once, args=(student_id, quiz_id, barrier))
+                       for _ in range(submits)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, outcomes
+
+
+def compare_submit_paths(students, submits, attempt_limit, concurrency, keep_unique_key=False):
+    """Run both submit paths on a clean slate; returns {path: report}."""
+    from models.db_connection import get_db_connection
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT id FROM quizzes WHERE title LIKE %s ORDER BY id", (QUIZ_PREFIX + '%',))
+        answers = load_answers(cursor, [row[0] for row in cursor.fetchall()])
+
+        reports = {}
+        for path in ('baseline', 'current'):
+            delete_bench_results(cursor)
+            conn.commit()
+            old_schema = path == 'baseline' and not keep_unique_key
+            if old_schema:
+                set_unique_attempt_key(cursor, False)
+            try:
+                started = time.perf_counter()
+                latencies, outcomes = run_concurrent_submits(
+                    SUBMIT_PATHS[path], students, answers, submits, concurrency
+                )
+                elapsed = time.perf_counter() - started
+                over_limit, duplicate_numbers = attempt_violations(cursor, attempt_limit)
+            finally:
+                if old_schema:
+                    # The baseline may have stored duplicate attempt numbers
+                    delete_bench_results(cursor)
+                    conn.commit()
+                    set_unique_attempt_key(cursor, True)
+            report = summarize(latencies, sum(n for o, n in outcomes.items() if o.startswith('error')), elapsed)
+            report.update(outcomes=outcomes, over_limit=over_limit, duplicate_attempt_numbers=duplicate_numbers)
+            reports[path] = report
+        delete_bench_results(cursor)
+        conn.commit()
+        return reports
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def print_submit_report(reports, attempt_limit):
+    print(f"{'path':9} {'submits/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'over limit':>11} {'dup attempt':>12}  outcomes")
+    for path, report in reports.items():
+        print(f"{path:9} {report['rps']:10.1f} {report['p50_ms'] or 0:9.2f} {report['p95_ms'] or 0:9.2f} "
+              f"{report['p99_ms'] or 0:9.2f} {report['over_limit']:11d} {report['duplicate_attempt_numbers']:12d}"
+              f"  {report['outcomes']}")
+    print(f"'over limit' counts stored attempts beyond the attempt limit of {attempt_limit}.")
+
+
+#                   ----------- Baseline -----------
+
+def compare_with_baseline(report, baseline, tolerance=0.25):
+    """Regressions of report against baseline: latency up or throughput down by more than tolerance."""
+    regressions = []
+    if report["completed"] < report["students"]:
+        regressions.append(f"{report['students'] - report['completed']} exam flows did not complete")
+    for endpoint, base in baseline.get("endpoints", {}).items():
+        current = report["endpoints"].get(endpoint)
+        if current is None:
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            if base.get(metric) and current.get(metric) and current[metric] > base[metric] * (1 + tolerance):
+                regressions.append(f"{endpoint} {metric}: {current[metric]} > {base[metric]} (+{tolerance:.0%})")
+        if base.get("rps") and current["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(f"{endpoint} req/s: {current['rps']} < {base['rps']} (-{tolerance:.0%})")
+    return regressions
+
+
+def load_baseline(path, parameters):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        baseline = json.load(f)
+    if baseline.get("parameters") != parameters:
+        print(f"Baseline in {path} was recorded with {baseline.get('parameters')}, not comparing.")
+        return None
+    return baseline
+
+
+#                   ----------- Command line -----------
+
+def start_bench_server(database, port, threads):
+    command = [sys.executable, 'benchmark.py', 'serve', '--database', database,
+               '--port', str(port), '--threads', str(threads)]
+    return subprocess.Popen(command, cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test of the student exam flow.")
+    parser.add_argument('command', choices=['run', 'submit', 'seed', 'clean', 'serve'])
+    parser.add_argument('--database', default='quiz_bench', help="benchmark database (created if missing)")
+    parser.add_argument('--students', type=int, default=200)
+    parser.add_argument('--quizzes', type=int, default=5)
+    parser.add_argument('--questions', type=int, default=20)
+    parser.add_argument('--concurrency', type=int, default=32, help="virtual students in flight")
+    parser.add_argument('--url', help="benchmark an already running server instead of starting one")
+    parser.add_argument('--port', type=int, default=5200)
+    parser.add_argument('--threads', type=int, default=config.SERVER_CONFIG['threads'])
+    parser.add_argument('--seed', type=int, default=1, help="random seed for answer choices")
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed regression, 0.25 = 25%%")
+    parser.add_argument('--save-baseline', action='store_true', help="store this run as the new baseline")
+    parser.add_argument('--json', help="also write the report to this file")
+    parser.add_argument('--submits', type=int, default=4, help="submit: concurrent submissions per student")
+    parser.add_argument('--attempt-limit', type=int, default=2, help="submit: attempt limit of the seeded quizzes")
+    parser.add_argument('--keep-unique-key', action='store_true',
+                        help="submit: run the baseline with the unique attempt key in place")
+    args = parser.parse_args()
+
+    if args.command == 'submit':
+        if args.database == config.DB_CONFIG['database']:
+            print("The submit comparison changes the quiz_results keys; use a separate --database.")
+            return 1
+        # Every submission of the students in flight holds a connection at once
+        config.POOL_CONFIG['pool_size'] = max(config.POOL_CONFIG['pool_size'], args.concurrency * args.submits + 1)
+    use_bench_environment(args.database)
+
+    if args.command == 'serve':
+        from serve import serve_waitress
+        serve_waitress(dict(config.SERVER_CONFIG, host='127.0.0.1', port=args.port, threads=args.threads))
+        return 0
+
+    create_database(args.database)
+    if args.command == 'clean':
+        from models.db_connection import get_db_connection
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            clean(cursor)
+            conn.commit()
+        finally:
+            cursor.close()
+            conn.close()
+        print(f"Removed benchmark data from {args.database}.")
+        return 0
+
+    attempt_limit = args.attempt_limit if args.command == 'submit' else 1000000
+    students = prepare(args.students, args.quizzes, args.questions, attempt_limit)
+    print(f"Seeded {len(students)} students, {args.quizzes} quizzes x {args.questions} questions "
+          f"in {args.database}.")
+    if args.command == 'seed':
+        return 0
+
+    if args.command == 'submit':
+        reports = compare_submit_paths(students, args.submits, attempt_limit, args.concurrency,
+                                       args.keep_unique_key)
+        print_submit_report(reports, attempt_limit)
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(reports, f, indent=2)
+        # The current path must never store more attempts than allowed
+        return 1 if reports['current']['over_limit'] or reports['current']['duplicate_attempt_numbers'] else 0
+
+    process = None
+    base_url = args.url
+    if base_url is None:
+        process = start_bench_server(args.database, args.port, args.threads)
+        base_url = f"http://127.0.0.1:{args.port}"
+        if not wait_until_up('127.0.0.1', args.port):
+            process.terminate()
+            print("Benchmark server did not start.")
+            return 1
+    try:
+        report = run_exam_flow(base_url, students, args.concurrency, args.seed)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(10)
+
+    parameters = {"students": args.students, "quizzes": args.quizzes, "questions": args.questions,
+                  "concurrency": args.concurrency}
+    report["parameters"] = parameters
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}.")
+        return 0
+
+    baseline = load_baseline(args.baseline, parameters)
+    if baseline is None:
+        return 0
+    regressions = compare_with_baseline(report, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION  {regression}")
+    if not regressions:
+        print("No regressions against the baseline.")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
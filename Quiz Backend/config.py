@@ -1,6 +1,155 @@
+import os
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
 DB_CONFIG = {
     "host": "localhost",
     "user": "Rohan",
     "password": "root",
     "database": "quiz"
 }
+
+# Connection pool used by models/db_connection.get_db_connection
+POOL_CONFIG = {
+    "enabled": True,
+    "pool_size": 10,        # connections kept open between requests
+    "max_overflow": 10,     # extra connections allowed under load, closed on return
+    "pool_timeout": 30,     # seconds to wait for a free connection before failing
+    "pre_ping": True,       # check the connection is alive on checkout
+    "recycle": 3600         # seconds before a connection is closed and replaced
+}
+
+# Google Sheets sync of quiz_summary rows (services/sheets_sync.py)
+SHEETS_CONFIG = {
+    "backend": "google",    # "google", or "local" to write to local_path instead
+    "mode": "thread",       # "thread" syncs inside the Flask process, "daemon" leaves it to `python -m services.sheets_sync`
+    "service_account_file": os.path.join(BASE_DIR, "credentials.json"),
+    "spreadsheet_id": "1Ql4A3XeyTwaPWpMOslpF5_wyKQNJ2PkvMcq5ibaBdoI",
+    "local_path": os.path.join(BASE_DIR, "uploads", "quiz_summary_sheet.csv"),
+    "interval": 30,         # seconds between sweeps when no submission wakes the worker
+    "batch_size": 500,      # rows per append_rows call and per UPDATE ... IN
+    "max_retries": 5,       # attempts per batch before the sweep gives up
+    "backoff": 1.0,         # seconds before the first retry, doubled on each retry
+    "claim_timeout": 600    # seconds before a sweep by a process that died is taken over
+}
+
+# In-process cache of quiz content served to students and of answer keys (models/quiz_cache.py).
+# Answer keys are checked against quizzes.content_version on every submit.
+QUIZ_CACHE_CONFIG = {
+    "max_entries": 1000,
+    "ttl": 300              # seconds; bounds how stale quiz content is across server processes
+}
+
+# In-process cache of student notification feeds and class membership (models/notifications.py)
+NOTIFICATION_CACHE_CONFIG = {
+    "max_entries": 10000,   # per cache (class feeds, student feeds, student -> class)
+    "ttl": 60,              # seconds; how late a notification sent through another process can appear
+    "feed_length": 200      # newest notifications kept per class and per student; also the largest limit
+}
+
+# Background e-mail dispatcher for notifications (services/mailer.py)
+MAIL_DISPATCH_CONFIG = {
+    "workers": 4,           # concurrent SMTP connections
+    "batch_size": 50,       # messages sent over one SMTP connection
+    "max_attempts": 5,      # per recipient, then the delivery is marked failed
+    "backoff": 2.0,         # seconds before the first retry, doubled on each retry
+    "claim_timeout": 600,   # seconds before a batch claimed by a process that died is sent again
+    "check_interval": 60    # seconds between checks for such expired claims
+}
+
+STUDENT_IMPORT_CONFIG = {
+    "chunk_size": 500       # rows per multi-row INSERT and per transaction
+}
+
+# Login sessions (models/sessions.py)
+SESSION_CONFIG = {
+    "backend": "mysql",     # "mysql" (sessions / admin_sessions tables), or "memory" for a local stand-in
+    "ttl": 12 * 3600,       # seconds a session stays valid after login
+    "cache_entries": 10000, # validated tokens kept in memory
+    "cache_ttl": 30,        # seconds a cached token is trusted before it is checked again;
+                            # also how long a logout takes to reach other processes
+    "sweep_interval": 600,  # seconds between expired-session sweeps, 0 to leave it to
+                            # `python -m models.sessions`
+    "enforce": True         # True: every route except login needs a token (the frontend sends it
+                            # from Quiz Frontend/api.js). False: only tokens that are sent are checked
+}
+
+# Password hashing (models/passwords.py). Hashes record their own algorithm and
+# cost, so changing these upgrades stored hashes as users log in.
+PASSWORD_CONFIG = {
+    "algorithm": "scrypt",  # "scrypt" (standard library), "bcrypt" (pip install bcrypt)
+                            # or "argon2" (pip install argon2-cffi)
+    "scrypt": {"n": 2 ** 14, "r": 8, "p": 1},
+    "bcrypt": {"rounds": 12},
+    "argon2": {"time_cost": 2, "memory_cost": 19456, "parallelism": 1},
+    "workers": os.cpu_count() or 2   # threads that hash/verify; bounds login CPU use
+}
+
+# Admission control for the login routes (models/admission.py)
+ADMISSION_CONFIG = {
+    "backend": "memory",    # "memory", or "sqlite" to share buckets between processes on one host
+    "sqlite_path": os.path.join(BASE_DIR, "uploads", "admission.sqlite3"),
+    "ip_rate": 20,          # logins per second per client IP (a school may share one NAT address)
+    "ip_burst": 200,
+    "account_rate": 0.2,    # logins per second per account (one every 5 s once the burst is used)
+    "account_burst": 5,
+    "max_concurrent": 16,   # logins processed at once in this process
+    "max_queue": 200,       # logins waiting for a slot before new ones are turned away
+    "queue_timeout": 10,    # seconds a login may wait for a slot
+    "trust_proxy": False,   # use X-Forwarded-For (only behind a proxy that sets it)
+    "max_keys": 100000      # buckets kept by the memory backend (least recently used are dropped)
+}
+
+# Production serving (serve.py). Keep workers * threads within the connection
+# pool (pool_size + max_overflow) so request threads do not queue for MySQL.
+SERVER_CONFIG = {
+    "server": "waitress",   # "waitress" (any OS) or "gunicorn" (Linux/macOS)
+    "host": "0.0.0.0",
+    "port": 5000,
+    "workers": 2,           # gunicorn processes; waitress always runs one process
+    "threads": 16,          # request threads per process
+    "connection_limit": 1000,   # waitress: open client connections per process
+    "backlog": 2048,        # listen() backlog
+    "timeout": 60           # gunicorn: seconds before a stuck worker is restarted
+}
+
+# Study material uploads, streamed to disk and hashed while they arrive (services/storage.py)
+UPLOAD_CONFIG = {
+    "folder": os.path.join(BASE_DIR, "uploads", "study_materials"),
+    # Files stored once per content as blobs/ab/cd/<sha256>; on the same disk as "folder"
+    "blob_folder": os.path.join(BASE_DIR, "uploads", "study_materials", "blobs"),
+    "max_bytes": 100 * 1024 * 1024,    # largest accepted file; bigger uploads get 413
+    "orphan_age": 3600      # seconds before gc removes a blob file that has no study_blobs row
+}
+
+# Study material downloads (services/storage.send_blob). Behind nginx, offload the
+# file transfer with "x-accel" and an internal location aliased to the blob folder:
+#     location /protected/study-materials/ { internal; alias <blob_folder>/; }
+DOWNLOAD_CONFIG = {
+    "offload": None,        # None (serve from Python), "x-accel" (nginx) or "x-sendfile" (Apache, lighttpd)
+    "x_accel_prefix": "/protected/study-materials/",
+    "max_age": 86400        # seconds a browser may reuse a download before revalidating it
+}
+
+# Background copy of study materials to Google Drive (services/drive.py)
+DRIVE_CONFIG = {
+    "backend": "google",    # "google", or "local" to copy files into local_path instead (tests, development)
+    "service_account_file": os.path.join(BASE_DIR, "controllers", "service_account.json"),
+    "folder_id": "15tm2g81xTv0H2UYv_pYnnvwc-D8juZLr",
+    "local_path": os.path.join(BASE_DIR, "uploads", "local_drive"),
+    "chunk_size": 8 * 1024 * 1024,     # resumable upload chunk, a multiple of 256 KiB
+    "workers": 1,           # uploads in flight at once
+    "max_attempts": 5,      # tries per file before it is marked failed
+    "backoff": 5.0,         # seconds before the first retry, doubled on each retry
+    "claim_timeout": 3600,  # seconds before an upload claimed by a process that died is started again
+    "check_interval": 300   # seconds between checks for such expired claims
+}
+
+# Request, database and external-call metrics served at /metrics (models/metrics.py)
+METRICS_CONFIG = {
+    "enabled": True,
+    "slow_query_ms": 200,           # queries at least this slow are logged with their SQL (literals masked)
+    "slow_query_sql_length": 2000,  # characters of SQL logged per slow query
+    "latency_buckets": [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10],   # seconds
+    "query_count_buckets": [0, 1, 2, 5, 10, 20, 50, 100]
+}
@@ -1,64 +1,38 @@
-from flask import Blueprint, request, jsonify, current_app, send_file
+from flask import Blueprint, request, jsonify, send_file, Response, stream_with_context, url_for, g, current_app
 from models.db_connection import get_db_connection
+from models.quiz_cache import invalidate_quiz, quiz_id_for_question, get_answer_key
+from models.scoring import unpack_answers
+from models import visibility, blobs, notifications
+from models.pagination import Page
+from models.passwords import check_password, hash_password, password_manager
+from models.admission import login_admission
+from models.sessions import admin_sessions, student_sessions, protect_blueprint, check_any_session
+from services.export import EXPORT_FORMATS, iter_rows
+from services.mailer import mail_dispatcher, create_mail_job, get_mail_job
+from services.drive import drive_uploader, get_upload_status
+from services.storage import receive_upload, blob_store, send_blob
+from services.importer import (
+    READERS, IMPORT_FORMATS, QUIZ_IMPORT_FORMATS, detect_format, detect_quiz_format, read_quiz_document
+)
+from config import STUDENT_IMPORT_CONFIG, UPLOAD_CONFIG
+from datetime import datetime, timedelta
+from xml.etree.ElementTree import ParseError
+from werkzeug.exceptions import RequestEntityTooLarge
 import os
+import re
+import zipfile
 from werkzeug.utils import secure_filename
-from flask_mail import Mail, Message
-
-
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
-from google.oauth2.service_account import Credentials
-
-def upload_to_drive(file_path, folder_id):
-    """Upload a file to Google Drive and return its file ID."""
-    try:
-        print("Starting upload_to_drive function.")
-
-        # Authenticate using the service account credentials
-        print(f"Authenticating with service account credentials from: {file_path}")
-        creds = Credentials.from_service_account_file(
-            r'C:/Users/Abu Hurairah/Desktop/Quiz Project/Quiz Backend/controllers/service_account.json',
-            scopes=['https://www.googleapis.com/auth/drive']
-        )
-        service = build('drive', 'v3', credentials=creds)
-        print("Google Drive service initialized.")
-
-        # Prepare the file metadata and upload
-        print(f"Preparing to upload file: {file_path} to folder ID: {folder_id}")
-        file_metadata = {'name': os.path.basename(file_path), 'parents': [folder_id]}
-        media = MediaFileUpload(file_path, resumable=True)
-
-        # Uploading file
-        uploaded_file = service.files().create(
-            body=file_metadata, media_body=media, fields='id'
-        ).execute()
-
-        # Get the uploaded file ID
-        file_id = uploaded_file.get('id')
-        print(f"File uploaded successfully. File ID: {file_id}")
-
-        return file_id
-    except Exception as e:
-        print("An error occurred during the file upload.")
-        print(f"Error: {e}")
-        return None  # Return None or handle the error as required
 
 
 admin_bp = Blueprint('admin', __name__)
 
-mail = Mail()
-
-# Helper function to send email
-def send_email(to_email, subject, body):
-    try:
-        msg = Message(subject, sender=current_app.config['MAIL_USERNAME'], recipients=[to_email])
-        msg.body = body
-        mail.send(msg)
-    except Exception as e:
-        raise Exception(f"Failed to send email: {e}")
+# Every route checks the session token except login/logout (see SESSION_CONFIG). Study
+# material downloads are also open to students and check their own session.
+protect_blueprint(admin_bp, 'admin', exempt=('admin_login', 'admin_logout', 'download_material'))
 
 # Admin Login API
 @admin_bp.route('/login', methods=['POST'])
+@login_admission.guard('admin')
 def admin_login():
     """Login for Admin"""
     data = request.json
@@ -71,17 +45,46 @@ def admin_login():
     # Connect to the database
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
-    
-    query = "SELECT id, password FROM admins WHERE email = %s"
-    cursor.execute(query, (email,))
-    admin = cursor.fetchone()
-    cursor.close()
-    conn.close()
+    try:
+        query = "SELECT id, password, password_legacy FROM admins WHERE email = %s"
+        cursor.execute(query, (email,))
+        admin = cursor.fetchone()
+
+        # Runs on the hashing pool; an unknown e-mail is checked against a dummy hash
+        matches, new_hash = check_password(
+            password, admin['password'] if admin else None, bool(admin and admin['password_legacy'])
+        )
+        if not matches:
+            return jsonify({"error": "Invalid email or password"}), 401
+
+        if new_hash:
+            # Upgrade plaintext or outdated hashes to the configured algorithm/cost
+            cursor.execute("UPDATE admins SET password = %s, password_legacy = 0 WHERE id = %s",
+                           (new_hash, admin['id']))
+
+        # The session row commits with the hash upgrade, on this route's connection
+        session_token = admin_sessions.create(admin['id'], cursor)
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+    admin_sessions.remember(session_token, admin['id'])
+    return jsonify({"message": "Login successful", "id": admin['id'], "session_token": session_token}), 200
 
-    if not admin or admin['password'] != password:
-        return jsonify({"error": "Invalid email or password"}), 401
 
-    return jsonify({"message": "Login successful", "id": admin['id']}), 200
+# Admin Logout API
+@admin_bp.route('/logout', methods=['POST'])
+def admin_logout():
+    """Logout for Admin"""
+    data = request.json or {}
+    session_token = data.get('session_token')
+
+    if not session_token:
+        return jsonify({"error": "Session token is required"}), 400
+
+    admin_sessions.revoke(session_token)
+    return jsonify({"message": "Logout successful"}), 200
 
 
 
@@ -101,35 +104,205 @@ def create_student():
 
     conn = get_db_connection()
     cursor = conn.cursor()
-    query = """
-        INSERT INTO students (name, email, password, class_id) 
-        VALUES (%s, %s, %s, %s)
-    """
-    cursor.execute(query, (name, email, password, class_id))
-    conn.commit()
-    cursor.close()
-    conn.close()
+    try:
+        query = """
+            INSERT INTO students (name, email, password, class_id) 
+            VALUES (%s, %s, %s, %s)
+        """
+        cursor.execute(query, (name, email, hash_password(password), class_id))
+        if class_id:
+            visibility.refresh_student(cursor, cursor.lastrowid)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        return jsonify({"error": str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
 
     return jsonify({"message": "Student created successfully"}), 201
 
 
+# ---- Bulk student import ----
+EMAIL_PATTERN = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+
+def _validate_student_row(row, class_ids, class_names, seen_emails):
+    """Return ((name, email, password, class_id), None) or (None, error) for one import row."""
+    if row is None:
+        return None, "Row is not an object"
+    name, email, password = row.get('name'), row.get('email'), row.get('password')
+    if not all([name, email, password]):
+        return None, "Missing required fields (name, email, password)"
+    if len(name) > 100:
+        return None, "Name is longer than 100 characters"
+    if len(email) > 255 or not EMAIL_PATTERN.match(email):
+        return None, "Invalid email"
+    if email.lower() in seen_emails:
+        return None, f"Duplicate email in file (row {seen_emails[email.lower()]})"
+
+    class_id = None
+    class_name = row.get('class_name') or row.get('class')
+    if row.get('class_id'):
+        try:
+            class_id = int(row['class_id'])
+        except ValueError:
+            return None, "class_id must be an integer"
+        if class_id not in class_ids:
+            return None, f"Unknown class_id {class_id}"
+    elif class_name:
+        class_id = class_names.get(class_name.lower())
+        if class_id is None:
+            return None, f"Unknown class '{class_name}'"
+        if class_id == 0:
+            return None, f"Class name '{class_name}' is ambiguous, use class_id"
+    return (name, email, password, class_id), None
+
+
+def _insert_student_chunk(conn, cursor, chunk, errors):
+    """Insert one chunk of validated rows in a single transaction; returns the inserted count."""
+    emails = [values[1] for _, values in chunk]
+    placeholders = ', '.join(['%s'] * len(emails))
+    cursor.execute(f"SELECT email FROM students WHERE email IN ({placeholders})", emails)
+    existing = {row[0].lower() for row in cursor.fetchall()}
+    for number, values in chunk:
+        if values[1].lower() in existing:
+            errors.append({"row": number, "email": values[1], "error": "Email already exists"})
+    chunk = [(number, values) for number, values in chunk if values[1].lower() not in existing]
+    if not chunk:
+        return 0
+
+    # Hash the chunk's passwords in parallel on the password pool
+    hashes = password_manager.hash_many([values[2] for _, values in chunk])
+    chunk = [(number, (name, email, hashed, class_id))
+             for (number, (name, email, _, class_id)), hashed in zip(chunk, hashes)]
+
+    try:
+        cursor.execute(
+            "INSERT INTO students (name, email, password, class_id) VALUES "
+            + ', '.join(['(%s, %s, %s, %s)'] * len(chunk)),
+            [value for _, values in chunk for value in values]
+        )
+        visibility.add_students(cursor, [values[1] for _, values in chunk if values[3]])
+        conn.commit()
+        return len(chunk)
+    except Exception as e:
+        conn.rollback()
+        if not (e.args and e.args[0] == 1062):
+            raise
+
+    # A concurrent insert took one of the emails: fall back to row by row for this chunk
+    inserted = 0
+    for number, values in chunk:
+        try:
+            cursor.execute(
+                "INSERT INTO students (name, email, password, class_id) VALUES (%s, %s, %s, %s)",
+                values
+            )
+            if values[3]:
+                visibility.refresh_student(cursor, cursor.lastrowid)
+            conn.commit()
+            inserted += 1
+        except Exception as e:
+            conn.rollback()
+            if not (e.args and e.args[0] == 1062):
+                raise
+            errors.append({"row": number, "email": values[1], "error": "Email already exists"})
+    return inserted
+
+
+@admin_bp.route('/students/import', methods=['POST'])
+def import_students():
+    """Bulk-create students from a CSV, XLSX or JSON/NDJSON upload (form field 'file').
+
+    Columns: name, email, password and optionally class (name) or class_id.
+    Rows are validated as they are read and inserted in chunks of
+    STUDENT_IMPORT_CONFIG['chunk_size'], one transaction per chunk. Valid rows
+    are imported even when others fail; the response lists every failed row.
+    """
+    upload = request.files.get('file')
+    if upload is None or not upload.filename:
+        return jsonify({"error": "No file provided"}), 400
+    fmt = detect_format(upload.filename, request.args.get('format'))
+    if fmt is None:
+        return jsonify({"error": f"Unsupported format, use one of: {', '.join(IMPORT_FORMATS)}"}), 400
+
+    chunk_size = STUDENT_IMPORT_CONFIG['chunk_size']
+    inserted, total, errors = 0, 0, []
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        # Every class in one lookup; names that occur twice map to 0 (ambiguous)
+        cursor.execute("SELECT id, name FROM classes")
+        class_ids, class_names = set(), {}
+        for class_id, class_name in cursor.fetchall():
+            class_ids.add(class_id)
+            key = class_name.strip().lower()
+            class_names[key] = 0 if key in class_names else class_id
+
+        seen_emails, chunk = {}, []
+        for number, row in READERS[fmt](upload.stream):
+            total += 1
+            values, error = _validate_student_row(row, class_ids, class_names, seen_emails)
+            if error:
+                errors.append({"row": number, "email": (row or {}).get('email'), "error": error})
+                continue
+            seen_emails[values[1].lower()] = number
+            chunk.append((number, values))
+            if len(chunk) >= chunk_size:
+                inserted += _insert_student_chunk(conn, cursor, chunk, errors)
+                chunk = []
+        if chunk:
+            inserted += _insert_student_chunk(conn, cursor, chunk, errors)
+
+        errors.sort(key=lambda error: error['row'])
+        return jsonify({
+            "message": f"Imported {inserted} of {total} students",
+            "total": total,
+            "inserted": inserted,
+            "failed": len(errors),
+            "errors": errors
+        }), 200
+    except (ValueError, zipfile.BadZipFile, ParseError, UnicodeDecodeError) as e:
+        # Chunks before the unreadable part are already committed
+        return jsonify({"error": f"Could not read {fmt} file: {e}", "inserted": inserted}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+
 
 # View all students
+STUDENT_FIELDS = {"id": "s.id", "name": "s.name", "email": "s.email", "class_name": "c.name"}
+
 @admin_bp.route('/students', methods=['GET'])
 def get_all_students():
-    """Retrieve all students."""
+    """Retrieve all students (paginated with ?limit=&cursor=, projected with ?fields=)."""
+    try:
+        page = Page(request.args, STUDENT_FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
-    query = """
-        SELECT s.id, s.name, s.email, c.name AS class_name 
-        FROM students s
-        LEFT JOIN classes c ON s.class_id = c.id
-    """
-    cursor.execute(query)
-    students = cursor.fetchall()
-    cursor.close()
-    conn.close()
+    try:
+        tail, params = page.clause("s.id")
+        query = f"""
+            SELECT {page.select("s.id")}
+            FROM students s
+            LEFT JOIN classes c ON s.class_id = c.id
+            {tail}
+        """
+        cursor.execute(query, params)
+        students = cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
 
+    if page.paginated:
+        return jsonify(page.result(students)), 200
     return jsonify(students), 200
 
 
@@ -170,15 +343,22 @@ def update_student(student_id):
 
     conn = get_db_connection()
     cursor = conn.cursor()
-    query = """
-        UPDATE students 
-        SET name = %s, email = %s, password = %s, class_id = %s
-        WHERE id = %s
-    """
-    cursor.execute(query, (name, email, password, class_id, student_id))
-    conn.commit()
-    cursor.close()
-    conn.close()
+    try:
+        query = """
+            UPDATE students 
+            SET name = %s, email = %s, password = %s, password_legacy = 0, class_id = %s
+            WHERE id = %s
+        """
+        cursor.execute(query, (name, email, hash_password(password), class_id, student_id))
+        visibility.refresh_student(cursor, student_id)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        return jsonify({"error": str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+    notifications.invalidate_student(student_id)
 
     return jsonify({"message": "Student updated successfully"}), 200
 
@@ -190,11 +370,19 @@ def delete_student(student_id):
     """Delete a student."""
     conn = get_db_connection()
     cursor = conn.cursor()
-    query = "DELETE FROM students WHERE id = %s"
-    cursor.execute(query, (student_id,))
-    conn.commit()
-    cursor.close()
-    conn.close()
+    try:
+        visibility.remove_student(cursor, student_id)
+        query = "DELETE FROM students WHERE id = %s"
+        cursor.execute(query, (student_id,))
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        return jsonify({"error": str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+    student_sessions.revoke_user(student_id)
+    notifications.invalidate_student(student_id)
 
     return jsonify({"message": "Student deleted successfully"}), 200
 
@@ -272,11 +460,20 @@ def delete_class(class_id):
     """Delete a class."""
     conn = get_db_connection()
     cursor = conn.cursor()
-    query = "DELETE FROM classes WHERE id = %s"
-    cursor.execute(query, (class_id,))
-    conn.commit()
-    cursor.close()
-    conn.close()
+    try:
+        visibility.remove_class(cursor, class_id)
+        # The class's study materials are deleted with it (ON DELETE CASCADE)
+        blobs.release_class(cursor, class_id)
+        query = "DELETE FROM classes WHERE id = %s"
+        cursor.execute(query, (class_id,))
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        return jsonify({"error": str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+    notifications.invalidate_class(class_id)
 
     return jsonify({"message": "Class deleted successfully"}), 200
 
@@ -372,6 +569,151 @@ def create_quiz():
         conn.close()
 
 
+# ---- Bulk quiz authoring ----
+def _unique_key(text):
+    # The unique keys cover the first 255 characters, case-insensitively
+    return text[:255].lower()
+
+
+def _validate_quiz_questions(questions):
+    """Normalise a document's questions; returns (questions, errors)."""
+    if not isinstance(questions, list) or not questions:
+        return [], [{"question": None, "error": "At least one question is required"}]
+
+    normalised, errors, seen = [], [], {}
+    for index, question in enumerate(questions, start=1):
+        if not isinstance(question, dict):
+            errors.append({"question": index, "error": "Question must be an object"})
+            continue
+        text = str(question.get('question') or '').strip()
+        options = question.get('options')
+        if not text:
+            errors.append({"question": index, "error": "Question text is required"})
+            continue
+        if len(text) > 1000:
+            errors.append({"question": index, "error": "Question is longer than 1000 characters"})
+            continue
+        if _unique_key(text) in seen:
+            errors.append({"question": index, "error": f"Duplicate of question {seen[_unique_key(text)]}"})
+            continue
+        seen[_unique_key(text)] = index
+        if not isinstance(options, list) or len(options) < 2:
+            errors.append({"question": index, "error": "At least two options are required"})
+            continue
+
+        option_rows, option_keys, error = [], set(), None
+        for option in options:
+            option_text = str((option or {}).get('option_text') or '').strip() if isinstance(option, dict) else ''
+            if not option_text:
+                error = "Option text is required"
+            elif len(option_text) > 500:
+                error = "Option is longer than 500 characters"
+            elif _unique_key(option_text) in option_keys:
+                error = f"Duplicate option '{option_text}'"
+            if error:
+                break
+            option_keys.add(_unique_key(option_text))
+            option_rows.append((option_text, 1 if option.get('is_correct') else 0))
+        if not error and sum(correct for _, correct in option_rows) != 1:
+            error = "Exactly one option must be correct"
+        if error:
+            errors.append({"question": index, "error": error})
+            continue
+        normalised.append((text, option_rows))
+    return normalised, errors
+
+
+@admin_bp.route('/quiz/import', methods=['POST'])
+def import_quiz():
+    """Create a quiz with all its questions and options in one transaction.
+
+    Accepts a JSON quiz document as the request body, or an upload (form
+    field 'file') in JSON, GIFT, CSV or XLSX format with title, description,
+    attempt_limit and created_by as form fields. Table formats have one row
+    per option with question, option and is_correct columns.
+    """
+    upload = request.files.get('file')
+    try:
+        if upload is not None and upload.filename:
+            fmt = detect_quiz_format(upload.filename, request.args.get('format'))
+            if fmt is None:
+                return jsonify({"error": f"Unsupported format, use one of: {', '.join(QUIZ_IMPORT_FORMATS)}"}), 400
+            document = read_quiz_document(upload.stream, fmt)
+            document.update({k: v for k, v in request.form.items() if v != ''})
+        else:
+            document = request.get_json(silent=True)
+            if not isinstance(document, dict):
+                return jsonify({"error": "Quiz document must be a JSON object"}), 400
+    except (ValueError, zipfile.BadZipFile, ParseError, UnicodeDecodeError) as e:
+        return jsonify({"error": f"Could not read quiz: {e}"}), 400
+
+    title = document.get('title')
+    description = document.get('description', '')
+    created_by = document.get('created_by')
+    if not title or not created_by:
+        return jsonify({"error": "Title and Created By are required"}), 400
+    try:
+        attempt_limit = int(document.get('attempt_limit', 3))
+    except (TypeError, ValueError):
+        return jsonify({"error": "attempt_limit must be an integer"}), 400
+
+    questions, errors = _validate_quiz_questions(document.get('questions'))
+    if errors:
+        return jsonify({"error": "Invalid questions, nothing was created", "errors": errors}), 400
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            INSERT INTO quizzes (title, description, attempt_limit, created_by)
+            VALUES (%s, %s, %s, %s)
+        """, (title, description, attempt_limit, created_by))
+        quiz_id = cursor.lastrowid
+
+        # Ids are read back by text: a multi-row INSERT's auto-increment values
+        # are not guaranteed to be consecutive with concurrent inserts.
+        cursor.executemany(
+            "INSERT INTO quiz_questions (quiz_id, question) VALUES (%s, %s)",
+            [(quiz_id, text) for text, _ in questions]
+        )
+        cursor.execute("SELECT id, question FROM quiz_questions WHERE quiz_id = %s", (quiz_id,))
+        question_ids = {_unique_key(text): question_id for question_id, text in cursor.fetchall()}
+
+        cursor.executemany(
+            "INSERT INTO quiz_options (question_id, option_text, is_correct) VALUES (%s, %s, %s)",
+            [(question_ids[_unique_key(text)], option_text, is_correct)
+             for text, options in questions for option_text, is_correct in options]
+        )
+        cursor.execute("""
+            SELECT o.id, o.question_id, o.option_text
+            FROM quiz_options o
+            JOIN quiz_questions q ON q.id = o.question_id
+            WHERE q.quiz_id = %s
+        """, (quiz_id,))
+        option_ids = {(question_id, _unique_key(text)): option_id for option_id, question_id, text in cursor.fetchall()}
+        conn.commit()
+
+        created = []
+        for text, options in questions:
+            question_id = question_ids[_unique_key(text)]
+            created.append({
+                "question_id": question_id,
+                "question": text,
+                "option_ids": [option_ids[(question_id, _unique_key(option_text))] for option_text, _ in options]
+            })
+        return jsonify({
+            "message": f"Quiz created with {len(created)} questions",
+            "quiz_id": quiz_id,
+            "questions": created
+        }), 201
+    except Exception as e:
+        conn.rollback()
+        return jsonify({"error": str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+
 # Update a quiz
 @admin_bp.route('/quiz/<int:quiz_id>', methods=['PUT'])
 def update_quiz(quiz_id):
@@ -394,6 +736,7 @@ def update_quiz(quiz_id):
         """
         cursor.execute(query, (title, description, attempt_limit, quiz_id))
         conn.commit()
+        invalidate_quiz(quiz_id)
         return jsonify({"message": "Quiz updated successfully"}), 200
     except Exception as e:
         conn.rollback()
@@ -410,9 +753,11 @@ def delete_quiz(quiz_id):
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
+        visibility.remove_quiz(cursor, quiz_id)
         query = "DELETE FROM quizzes WHERE id = %s"
         cursor.execute(query, (quiz_id,))
         conn.commit()
+        invalidate_quiz(quiz_id)
         return jsonify({"message": "Quiz deleted successfully"}), 200
     except Exception as e:
         conn.rollback()
@@ -487,6 +832,7 @@ def create_question(quiz_id):
         """
         cursor.execute(query, (quiz_id, question))
         conn.commit()
+        invalidate_quiz(quiz_id)
         return jsonify({"message": "Question created successfully"}), 201
     except Exception as e:
         conn.rollback()
@@ -526,20 +872,36 @@ def retrieve_questions_by_quiz_id(quiz_id):
 
 
 # Retrieve all questions
+QUESTION_FIELDS = {
+    "id": "quiz_questions.id",
+    "question": "quiz_questions.question",
+    "quiz_title": "quizzes.title"
+}
+
 @admin_bp.route('/questions', methods=['GET'])
 def retrieve_all_questions():
-    """Retrieve all questions across all quizzes."""
+    """Retrieve all questions across all quizzes (paginated with ?limit=&cursor=, projected with ?fields=)."""
+    try:
+        page = Page(request.args, QUESTION_FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
     try:
-        query = """
-            SELECT quiz_questions.id, quiz_questions.question, quizzes.title AS quiz_title
+        tail, params = page.clause("quiz_questions.id")
+        query = f"""
+            SELECT {page.select("quiz_questions.id")}
             FROM quiz_questions
             JOIN quizzes ON quiz_questions.quiz_id = quizzes.id
+            {tail}
         """
-        cursor.execute(query)
+        cursor.execute(query, params)
         questions = cursor.fetchall()
 
+        if page.paginated:
+            return jsonify(page.result(questions)), 200
+
         if not questions:
             return jsonify({"message": "No questions found"}), 404
 
@@ -576,6 +938,7 @@ def create_option():
         """
         cursor.execute(query, (question_id, option_text, is_correct))
         conn.commit()
+        invalidate_quiz(quiz_id_for_question(cursor, question_id))
         return jsonify({"message": "Option created successfully"}), 201
     except Exception as e:
         if e.args[0] == 1062:  # Duplicate entry error
@@ -615,25 +978,38 @@ def retrieve_options_by_question(question_id):
 
 
 
+OPTION_FIELDS = {
+    "option_id": "quiz_options.id",
+    "option_text": "quiz_options.option_text",
+    "is_correct": "quiz_options.is_correct",
+    "question_id": "quiz_questions.id",
+    "question_text": "quiz_questions.question"
+}
+
 @admin_bp.route('/options', methods=['GET'])
 def retrieve_all_options():
-    """Retrieve all options across all questions."""
+    """Retrieve all options across all questions (paginated with ?limit=&cursor=, projected with ?fields=)."""
+    try:
+        page = Page(request.args, OPTION_FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
     try:
-        query = """
-            SELECT 
-                quiz_options.id AS option_id,
-                quiz_options.option_text,
-                quiz_options.is_correct,
-                quiz_questions.id AS question_id,
-                quiz_questions.question AS question_text
+        tail, params = page.clause("quiz_options.id")
+        query = f"""
+            SELECT {page.select("quiz_options.id")}
             FROM quiz_options
             JOIN quiz_questions ON quiz_options.question_id = quiz_questions.id
+            {tail}
         """
-        cursor.execute(query)
+        cursor.execute(query, params)
         options = cursor.fetchall()
 
+        if page.paginated:
+            return jsonify(page.result(options)), 200
+
         if not options:
             return jsonify({"message": "No options found"}), 404
 
@@ -672,6 +1048,7 @@ def create_quiz_assignment():
             VALUES (%s, %s)
         """
         cursor.execute(query, (quiz_id, student_id))
+        visibility.grant_student(cursor, quiz_id, student_id)
         conn.commit()
         return jsonify({"message": "Quiz assigned to student successfully"}), 201
     except Exception as e:
@@ -683,40 +1060,42 @@ def create_quiz_assignment():
         conn.close()
 
 
+ASSIGNMENT_FIELDS = {
+    "assignment_id": "a.id",
+    "quiz_title": "q.title",
+    "student_name": "s.name",
+    "quiz_id": "a.quiz_id",
+    "student_id": "a.student_id"
+}
+
 @admin_bp.route('/assignments', methods=['GET'])
 def get_all_assignments():
     """
-    Retrieve all quiz assignments.
+    Retrieve all quiz assignments (paginated with ?limit=&cursor=, projected with ?fields=).
     """
+    try:
+        page = Page(request.args, ASSIGNMENT_FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     conn = get_db_connection()
-    cursor = conn.cursor()
+    cursor = conn.cursor(dictionary=True)
     try:
-        query = """
-            SELECT 
-                a.id AS assignment_id,
-                q.title AS quiz_title,
-                s.name AS student_name,
-                a.quiz_id,
-                a.student_id
+        tail, params = page.clause("a.id")
+        query = f"""
+            SELECT {page.select("a.id")}
             FROM 
                 quiz_student_assignments a
             JOIN quizzes q ON a.quiz_id = q.id
             JOIN students s ON a.student_id = s.id
+            {tail}
         """
-        cursor.execute(query)
+        cursor.execute(query, params)
         assignments = cursor.fetchall()
 
-        results = []
-        for assignment in assignments:
-            results.append({
-                "assignment_id": assignment[0],
-                "quiz_title": assignment[1],
-                "student_name": assignment[2],
-                "quiz_id": assignment[3],
-                "student_id": assignment[4]
-            })
-
-        return jsonify(results), 200
+        if page.paginated:
+            return jsonify(page.result(assignments)), 200
+        return jsonify(assignments), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     finally:
@@ -732,11 +1111,15 @@ def delete_assignment(assignment_id):
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
+        cursor.execute("SELECT quiz_id, student_id FROM quiz_student_assignments WHERE id = %s", (assignment_id,))
+        assignment = cursor.fetchone()
+        if not assignment:
+            return jsonify({"error": "Assignment not found"}), 404
+
         query = "DELETE FROM quiz_student_assignments WHERE id = %s"
         cursor.execute(query, (assignment_id,))
+        visibility.revoke_student(cursor, assignment[0], assignment[1])
         conn.commit()
-        if cursor.rowcount == 0:
-            return jsonify({"error": "Assignment not found"}), 404
         return jsonify({"message": "Assignment deleted successfully"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -770,6 +1153,7 @@ def create_class_assignment():
             VALUES (%s, %s)
         """
         cursor.execute(query, (quiz_id, class_id))
+        visibility.grant_class(cursor, quiz_id, class_id)
         conn.commit()
         return jsonify({"message": "Quiz assigned to class successfully"}), 201
     except Exception as e:
@@ -781,40 +1165,129 @@ def create_class_assignment():
         conn.close()
 
 
+# ---- Bulk assignment ----
+MAX_BULK_ASSIGNMENT_IDS = 10000
+
+
+def _id_list(value, name):
+    """Deduplicated list of integer ids from a JSON array; raises ValueError."""
+    if value is None:
+        return []
+    if not isinstance(value, list):
+        raise ValueError(f"{name} must be a list")
+    try:
+        ids = list(dict.fromkeys(int(item) for item in value))
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must contain integer ids")
+    if len(ids) > MAX_BULK_ASSIGNMENT_IDS:
+        raise ValueError(f"{name} can contain at most {MAX_BULK_ASSIGNMENT_IDS} ids")
+    return ids
+
+
+def _bulk_assign(cursor, table, column, source_table, quiz_id, ids):
+    """Assign quiz_id to every existing id in one INSERT; returns the counts for the response."""
+    if not ids:
+        return {"requested": 0, "inserted": 0, "already_assigned": 0, "unknown_ids": []}
+    placeholders = ', '.join(['%s'] * len(ids))
+    cursor.execute(f"SELECT id FROM {source_table} WHERE id IN ({placeholders})", ids)
+    found = {row[0] for row in cursor.fetchall()}
+
+    # INSERT IGNORE's row count is exactly the number of new pairs; an
+    # ON DUPLICATE KEY no-op update is counted too when FOUND_ROWS is set.
+    cursor.execute(f"""
+        INSERT IGNORE INTO {table} (quiz_id, {column})
+        SELECT %s, id FROM {source_table} WHERE id IN ({placeholders})
+    """, [quiz_id, *ids])
+    inserted = cursor.rowcount
+    return {
+        "requested": len(ids),
+        "inserted": inserted,
+        "already_assigned": len(found) - inserted,
+        "unknown_ids": [item for item in ids if item not in found]
+    }
+
+
+@admin_bp.route('/assignments/bulk', methods=['POST'])
+def create_bulk_assignments():
+    """
+    Assign a quiz to many students and classes at once.
+
+    Body: {"quiz_id": 1, "student_ids": [...], "class_ids": [...]}. Pairs that
+    already exist are left alone and counted as already_assigned.
+    """
+    data = request.json or {}
+    quiz_id = data.get('quiz_id')
+    try:
+        student_ids = _id_list(data.get('student_ids'), 'student_ids')
+        class_ids = _id_list(data.get('class_ids'), 'class_ids')
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if not quiz_id or not (student_ids or class_ids):
+        return jsonify({"error": "Quiz ID and at least one student or class ID are required"}), 400
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT id FROM quizzes WHERE id = %s", (quiz_id,))
+        if not cursor.fetchone():
+            return jsonify({"error": "Quiz not found"}), 404
+
+        students = _bulk_assign(cursor, 'quiz_student_assignments', 'student_id', 'students', quiz_id, student_ids)
+        classes = _bulk_assign(cursor, 'quiz_class_assignments', 'class_id', 'classes', quiz_id, class_ids)
+        visibility.grant_students(cursor, quiz_id, student_ids)
+        visibility.grant_classes(cursor, quiz_id, class_ids)
+        conn.commit()
+        return jsonify({
+            "message": (f"Quiz assigned to {students['inserted']} new students "
+                        f"and {classes['inserted']} new classes"),
+            "students": students,
+            "classes": classes
+        }), 200
+    except Exception as e:
+        conn.rollback()
+        return jsonify({"error": str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+
+CLASS_ASSIGNMENT_FIELDS = {
+    "assignment_id": "a.id",
+    "quiz_title": "q.title",
+    "class_name": "c.name",
+    "quiz_id": "a.quiz_id",
+    "class_id": "a.class_id"
+}
+
 @admin_bp.route('/class-assignments', methods=['GET'])
 def get_all_class_assignments():
     """
-    Retrieve all quiz-class assignments.
+    Retrieve all quiz-class assignments (paginated with ?limit=&cursor=, projected with ?fields=).
     """
+    try:
+        page = Page(request.args, CLASS_ASSIGNMENT_FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     conn = get_db_connection()
-    cursor = conn.cursor()
+    cursor = conn.cursor(dictionary=True)
     try:
-        query = """
-            SELECT 
-                a.id AS assignment_id,
-                q.title AS quiz_title,
-                c.name AS class_name,
-                a.quiz_id,
-                a.class_id
+        tail, params = page.clause("a.id")
+        query = f"""
+            SELECT {page.select("a.id")}
             FROM 
                 quiz_class_assignments a
             JOIN quizzes q ON a.quiz_id = q.id
             JOIN classes c ON a.class_id = c.id
+            {tail}
         """
-        cursor.execute(query)
+        cursor.execute(query, params)
         assignments = cursor.fetchall()
 
-        results = []
-        for assignment in assignments:
-            results.append({
-                "assignment_id": assignment[0],
-                "quiz_title": assignment[1],
-                "class_name": assignment[2],
-                "quiz_id": assignment[3],
-                "class_id": assignment[4]
-            })
-
-        return jsonify(results), 200
+        if page.paginated:
+            return jsonify(page.result(assignments)), 200
+        return jsonify(assignments), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     finally:
@@ -830,11 +1303,15 @@ def delete_class_assignment(assignment_id):
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
+        cursor.execute("SELECT quiz_id, class_id FROM quiz_class_assignments WHERE id = %s", (assignment_id,))
+        assignment = cursor.fetchone()
+        if not assignment:
+            return jsonify({"error": "Assignment not found"}), 404
+
         query = "DELETE FROM quiz_class_assignments WHERE id = %s"
         cursor.execute(query, (assignment_id,))
+        visibility.revoke_class(cursor, assignment[0], assignment[1])
         conn.commit()
-        if cursor.rowcount == 0:
-            return jsonify({"error": "Assignment not found"}), 404
         return jsonify({"message": "Assignment deleted successfully"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -888,16 +1365,136 @@ def create_result():
 
 
 
+#                    ----------- Re-grade Quiz Results Api --------------
+
+REGRADE_CHUNK_SIZE = 1000
+
+@admin_bp.route('/quiz/<int:quiz_id>/regrade', methods=['POST'])
+def regrade_quiz_results(quiz_id):
+    """
+    Recompute the score of every stored attempt of a quiz against its current answer key.
+    Attempts are read in id-ordered chunks; only attempts whose score or feedback
+    (e.g. the question count changed) differs are written back.
+    """
+    chunk_size = request.args.get('chunk_size', REGRADE_CHUNK_SIZE, type=int)
+    chunk_size = max(1, min(chunk_size, 10000))
+
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("SELECT id FROM quizzes WHERE id = %s", (quiz_id,))
+        if not cursor.fetchone():
+            return jsonify({"error": "Quiz not found"}), 404
+
+        # Always grade against the answer key as it is in the database now
+        invalidate_quiz(quiz_id)
+        answer_key = get_answer_key(quiz_id, cursor)
+        total_questions = len(answer_key)
+
+        regraded = changed = skipped = 0
+        last_id = 0
+        while True:
+            cursor.execute("""
+                SELECT id, score, feedback, answers
+                FROM quiz_results
+                WHERE quiz_id = %s AND id > %s
+                ORDER BY id
+                LIMIT %s
+            """, (quiz_id, last_id, chunk_size))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            last_id = rows[-1]['id']
+
+            # Attempts stored before answers were persisted cannot be re-graded
+            graded = [row for row in rows if row['answers'] is not None]
+            skipped += len(rows) - len(graded)
+            scores = answer_key.score_many(unpack_answers(row['answers']) for row in graded)
+            # Same feedback text as a submission; an unchanged score can still need a new denominator
+            updates = []
+            for row, score in zip(graded, scores):
+                feedback = f"Your score is {score}/{total_questions}."
+                if row['score'] != score or row['feedback'] != feedback:
+                    updates.append((row['id'], score, feedback))
+            regraded += len(graded)
+
+            if updates:
+                # One UPDATE per chunk instead of one per attempt
+                cases = " ".join(["WHEN %s THEN %s"] * len(updates))
+                placeholders = ", ".join(["%s"] * len(updates))
+                query = f"""
+                    UPDATE quiz_results
+                    SET score = CASE id {cases} END,
+                        feedback = CASE id {cases} END
+                    WHERE id IN ({placeholders})
+                """
+                score_params = [value for result_id, score, _ in updates for value in (result_id, score)]
+                feedback_params = [value for result_id, _, feedback in updates for value in (result_id, feedback)]
+                params = score_params + feedback_params + [result_id for result_id, _, _ in updates]
+                cursor.execute(query, params)
+                conn.commit()
+                changed += len(updates)
+
+            if len(rows) < chunk_size:
+                break
+
+        return jsonify({
+            "message": "Quiz results re-graded successfully",
+            "regraded": regraded,
+            "changed": changed,
+            "skipped": skipped
+        }), 200
+    except Exception as e:
+        conn.rollback()
+        return jsonify({"error": str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+
+
+
 
 
 #                    ----------- view Quiz Results Api --------------
 
+RESULT_FIELDS = {
+    "result_id": "qr.id",
+    "student_name": "s.name",
+    "quiz_title": "q.title",
+    "score": "qr.score",
+    "feedback": "qr.feedback",
+    "attempt_number": "qr.attempt_number"
+}
+
 @admin_bp.route('/results', methods=['GET'])
 def get_all_results():
-    """Retrieve all quiz results grouped by quiz title."""
+    """
+    Retrieve all quiz results grouped by quiz title.
+    With ?limit=&cursor= returns flat pages in result id order, projected with ?fields=.
+    """
+    try:
+        page = Page(request.args, RESULT_FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
     try:
+        if page.paginated:
+            tail, params = page.clause("qr.id")
+            cursor.execute(f"""
+                SELECT {page.select("qr.id")}
+                FROM 
+                    quiz_results qr
+                JOIN 
+                    students s ON qr.student_id = s.id
+                JOIN 
+                    quizzes q ON qr.quiz_id = q.id
+                {tail}
+            """, params)
+            return jsonify(page.result(cursor.fetchall())), 200
+
         # Query to fetch grouped quiz results
         results_query = """
             SELECT 
@@ -946,9 +1543,83 @@ def get_all_results():
 
 
 
+#                    ----------- Export Quiz Results Api --------------
+
+EXPORT_COLUMNS = ["result_id", "student_name", "class_name", "quiz_title",
+                  "score", "feedback", "attempt_number", "submitted_at"]
+
+@admin_bp.route('/results/export', methods=['GET'])
+def export_results():
+    """
+    Stream quiz results as CSV, NDJSON or XLSX (?format=csv|ndjson|xlsx).
+    Optional filters: quiz_id, class_id, from and to (YYYY-MM-DD, inclusive).
+    Rows are read from an unbuffered cursor and written out as they arrive.
+    """
+    export_format = request.args.get('format', 'csv').lower()
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"error": f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    writer, mimetype, extension = EXPORT_FORMATS[export_format]
+
+    conditions = []
+    params = []
+    try:
+        for arg, condition in (('quiz_id', "qr.quiz_id = %s"), ('class_id', "s.class_id = %s")):
+            if request.args.get(arg):
+                conditions.append(condition)
+                params.append(int(request.args[arg]))
+        if request.args.get('from'):
+            conditions.append("qr.created_at >= %s")
+            params.append(datetime.strptime(request.args['from'], '%Y-%m-%d'))
+        if request.args.get('to'):
+            conditions.append("qr.created_at < %s")
+            params.append(datetime.strptime(request.args['to'], '%Y-%m-%d') + timedelta(days=1))
+    except ValueError:
+        return jsonify({"error": "quiz_id and class_id must be integers, from and to dates as YYYY-MM-DD"}), 400
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    # Ordered by primary key so the server can stream without sorting first
+    query = f"""
+        SELECT qr.id, s.name, c.name, q.title, qr.score, qr.feedback, qr.attempt_number, qr.created_at
+        FROM quiz_results qr
+        JOIN students s ON qr.student_id = s.id
+        LEFT JOIN classes c ON s.class_id = c.id
+        JOIN quizzes q ON qr.quiz_id = q.id
+        {where}
+        ORDER BY qr.id
+    """
+
+    def rows():
+        conn = get_db_connection()
+        cursor = conn.cursor()  # unbuffered: rows stay on the server until fetched
+        try:
+            cursor.execute(query, params)
+            yield from iter_rows(cursor)
+        except Exception:
+            # stream_with_context keeps the app context for the logger
+            current_app.logger.exception("Results export failed")
+            raise
+        finally:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+            conn.close()
+
+    filename = f"quiz_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+    return Response(
+        stream_with_context(writer(EXPORT_COLUMNS, rows())),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+
+
+
+
+
 #             ----------------------- Upload study material api-------------------
 
-UPLOAD_FOLDER = os.path.join(os.getcwd(), 'uploads', 'study_materials')  # Absolute path
+UPLOAD_FOLDER = UPLOAD_CONFIG["folder"]  # Absolute path
 ALLOWED_EXTENSIONS = {'pdf', 'doc', 'docx', 'ppt', 'pptx', 'txt', 'xlsx'}
 
 # Ensure the upload folder exists
@@ -960,58 +1631,115 @@ def allowed_file(filename):
 
 @admin_bp.route('/study-materials/upload', methods=['POST'])
 def upload_study_material():
-    """Admin uploads and assigns study material to a class."""
-    title = request.form.get('title')
-    description = request.form.get('description', '')
-    class_id = request.form.get('class_id')
-    admin_id = request.form.get('admin_id')
-    file = request.files.get('file')
-
-    if not title or not class_id or not admin_id or not file:
+    """Admin uploads and assigns study material to a class.
+
+    The file is streamed to disk and hashed as it arrives; the Google Drive
+    copy is made in the background (see /study-materials/<id>/upload-status).
+    """
+    try:
+        form, upload = receive_upload(request.environ, 'file')
+    except RequestEntityTooLarge:
+        max_mb = UPLOAD_CONFIG["max_bytes"] / (1024 * 1024)
+        return jsonify({"error": f"File is larger than the {max_mb:g} MB limit."}), 413
+    except ValueError as e:
+        return jsonify({"error": f"Could not read the upload: {e}"}), 400
+
+    title = form.get('title')
+    description = form.get('description', '')
+    class_id = form.get('class_id')
+    admin_id = form.get('admin_id')
+
+    if not title or not class_id or not admin_id or not upload:
+        if upload:
+            upload.discard()
         return jsonify({"error": "All fields (title, class_id, admin_id, and file) are required."}), 400
 
-    if not allowed_file(file.filename):
+    if not allowed_file(upload.filename):
+        upload.discard()
         return jsonify({"error": "File type not allowed."}), 400
 
-    # Save the file temporarily
-    filename = secure_filename(file.filename)
-    local_file_path = os.path.join(UPLOAD_FOLDER, filename)
-    file.save(local_file_path)
-    print(f"File saved locally at {local_file_path}")
+    filename = secure_filename(upload.filename)
 
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
     try:
-        print("Saving file locally...")
-        # Upload file to Google Drive
-        folder_id = "15tm2g81xTv0H2UYv_pYnnvwc-D8juZLr"  # Replace with your Drive folder ID
-        drive_file_id = upload_to_drive(local_file_path, folder_id)
-        if not drive_file_id:
-            raise ValueError("File upload to Google Drive failed. No file ID returned.")
-        print("File uploaded to Google Drive with ID:", drive_file_id)
-
-        # Insert study material record into the database
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        query = """
-            INSERT INTO study_materials (title, description, file_path, file_drive_id, class_id, uploaded_by)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """
-        # Save the file path and drive file ID
-        drive_file_link = f"https://drive.google.com/file/d/{drive_file_id}/view"
-        cursor.execute(query, (title, description, drive_file_link, drive_file_id, class_id, admin_id))
+        # Content is stored and copied to Drive once, however many classes it is uploaded to
+        blobs.add_reference(cursor, upload.sha256, upload.size, filename)
+        stored = blob_store.put(upload)
+        blob = blobs.get_blob(cursor, upload.sha256)
+
+        drive_file_id = blob['drive_file_id'] if blob['drive_status'] == 'uploaded' else None
+        cursor.execute("""
+            INSERT INTO study_materials
+                (title, description, file_drive_id, class_id, uploaded_by, sha256, original_filename)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """, (title, description, drive_file_id, class_id, admin_id, upload.sha256, filename))
+        material_id = cursor.lastrowid
+
+        # Served from here until the Drive copy replaces the link
+        file_path = drive_file_id and drive_uploader.link(drive_file_id)
+        if not file_path:
+            file_path = url_for('admin.download_material', material_id=material_id, _external=True)
+        cursor.execute("UPDATE study_materials SET file_path = %s WHERE id = %s", (file_path, material_id))
         conn.commit()
-        print("Database insertion successful.")
-        # Only return a minimal success message
-        return jsonify({"message": "Study material uploaded successfully."}), 201
+
+        if drive_file_id:
+            message, status = "Study material uploaded successfully.", 201
+        else:
+            drive_uploader.enqueue(upload.sha256)
+            message, status = "Study material uploaded successfully, it is being copied to Google Drive.", 202
+        return jsonify({
+            "message": message,
+            "material_id": material_id,
+            "size": upload.size,
+            "sha256": upload.sha256,
+            "deduplicated": not stored
+        }), status
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     finally:
-        if 'conn' in locals():
-            cursor.close()
-            conn.close()
+        upload.discard()
+        cursor.close()
+        conn.close()
+
+@admin_bp.route('/study-materials/<int:material_id>', methods=['DELETE'])
+def delete_study_material(material_id):
+    """Delete a study material; its file goes once no other material shares the content (storage gc)."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        blobs.release_material(cursor, material_id)
+        cursor.execute("DELETE FROM study_materials WHERE id = %s", (material_id,))
+        if cursor.rowcount == 0:
+            conn.rollback()
+            return jsonify({"error": "Study material not found"}), 404
+        conn.commit()
+        return jsonify({"message": "Study material deleted successfully"}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+# Google Drive copy status of an uploaded study material
+@admin_bp.route('/study-materials/<int:material_id>/upload-status', methods=['GET'])
+def study_material_upload_status(material_id):
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        status = get_upload_status(cursor, material_id)
+        if not status:
+            return jsonify({"error": "Study material not found"}), 404
+        return jsonify(status), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
 
 @admin_bp.route('/study-materials/download/<filename>', methods=['GET'])
 def download_study_material(filename):
-    """Serve the study material file for download."""
+    """Serve a file from the flat upload folder (materials uploaded before content-addressed storage)."""
     try:
         file_path = os.path.join(UPLOAD_FOLDER, filename)
         if not os.path.exists(file_path):
@@ -1020,31 +1748,71 @@ def download_study_material(filename):
         return send_file(file_path, as_attachment=True)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-        
-        
-        
-        
+
+@admin_bp.route('/study-materials/<int:material_id>/download', methods=['GET'])
+def download_material(material_id):
+    """Serve a study material under its uploaded file name, with Range and conditional request support.
+
+    Admins can download any material, students those of their own class.
+    """
+    error = check_any_session(('admin', 'student'))
+    if error:
+        return error
+
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("SELECT sha256, original_filename, class_id FROM study_materials WHERE id = %s", (material_id,))
+        material = cursor.fetchone()
+        if material and g.get('student_id') is not None:
+            cursor.execute("SELECT class_id FROM students WHERE id = %s", (g.student_id,))
+            student = cursor.fetchone()
+            if not student or student['class_id'] != material['class_id']:
+                return jsonify({"error": "This material belongs to another class"}), 403
+    finally:
+        cursor.close()
+        conn.close()
+
+    if not material or not material['sha256'] or not blob_store.exists(material['sha256']):
+        return jsonify({"error": "File not found."}), 404
+    return send_blob(material['sha256'], material['original_filename'] or material['sha256'])
+
+
+
+
+STUDY_MATERIAL_FIELDS = {
+    "id": "sm.id",
+    "title": "sm.title",
+    "description": "sm.description",
+    "file_path": "sm.file_path",
+    "class_name": "c.name"
+}
 
 @admin_bp.route('/study-materials', methods=['GET'])
 def get_study_materials():
-    """Retrieve all uploaded study materials with class names."""
+    """Retrieve all uploaded study materials with class names (paginated with ?limit=&cursor=, projected with ?fields=)."""
+    try:
+        page = Page(request.args, STUDY_MATERIAL_FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
     try:
-        query = """
-            SELECT 
-                sm.id, 
-                sm.title, 
-                sm.description, 
-                sm.file_path, 
-                c.name AS class_name
+        tail, params = page.clause("sm.id")
+        query = f"""
+            SELECT {page.select("sm.id")}
             FROM 
                 study_materials sm
             LEFT JOIN 
                 classes c ON sm.class_id = c.id
+            {tail}
         """
-        cursor.execute(query)
+        cursor.execute(query, params)
         materials = cursor.fetchall()
+
+        if page.paginated:
+            return jsonify(page.result(materials)), 200
         return jsonify({"materials": materials}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -1089,19 +1857,21 @@ def send_class_notification():
             INSERT INTO class_notifications (message, class_id, created_by)
             VALUES (%s, %s, %s)
         """, (message, class_id, admin_id))
-        conn.commit()
-
-        # Send emails to each student
-        for student in students:
-            student_email = student['email']
-            student_name = student['name']
 
-            # Send email to the student
-            subject = "New Class Notification"
-            body = f"Dear {student_name},\n\n{message}\n\nBest regards,\nAdmin Team"
-            send_email(student_email, subject, body)
+        # Queue one email per student; they are sent in the background
+        job_id = create_mail_job(
+            cursor, "New Class Notification", message,
+            [(student['name'], student['email']) for student in students],
+            admin_id
+        )
+        conn.commit()
+        notifications.invalidate_class_feed(class_id)
+        mail_dispatcher.dispatch(job_id)
 
-        return jsonify({"message": "Notification sent to class and emails delivered to all students"}), 201
+        return jsonify({
+            "message": f"Notification sent to class, emails to {len(students)} students are being delivered",
+            "job_id": job_id
+        }), 202
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     finally:
@@ -1137,16 +1907,38 @@ def send_student_notification():
             INSERT INTO student_notifications (message, student_id, created_by)
             VALUES (%s, %s, %s)
         """, (message, student_id, admin_id))
+
+        # Queue the email to the student
+        job_id = create_mail_job(
+            cursor, "New Notification from Admin", message,
+            [(student['name'], student['email'])],
+            admin_id
+        )
         conn.commit()
+        notifications.invalidate_student_feed(student_id)
+        mail_dispatcher.dispatch(job_id)
+
+        return jsonify({"message": "Notification sent to student, email is being delivered", "job_id": job_id}), 202
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
 
-        # Send email to the student
-        student_email = student['email']
-        student_name = student['name']
-        subject = "New Notification from Admin"
-        body = f"Dear {student_name},\n\n{message}\n\nBest regards,\nAdmin Team"
-        send_email(student_email, subject, body)
 
-        return jsonify({"message": "Notification sent to student and email delivered"}), 201
+
+# Delivery status of notification emails
+@admin_bp.route('/notifications/jobs/<int:job_id>', methods=['GET'])
+def get_notification_job(job_id):
+    """Per-recipient delivery status of a notification email job."""
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        job = get_mail_job(cursor, job_id)
+        if not job:
+            return jsonify({"error": "Job not found"}), 404
+        return jsonify(job), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     finally:
@@ -1159,24 +1951,38 @@ def send_student_notification():
 #          -------------------------View Messages from Students-------------------
 
 # View Messages from Students
+MESSAGE_FIELDS = {
+    "message_id": "m.id",
+    "student_name": "s.name",
+    "message_title": "m.subject",
+    "message_content": "m.content",
+    "sent_at": "m.created_at"
+}
+
 @admin_bp.route('/messages', methods=['GET'])
 def view_student_messages():
+    """Messages from students, newest first (paginated with ?limit=&cursor=, projected with ?fields=)."""
+    try:
+        page = Page(request.args, MESSAGE_FIELDS, descending=True)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
     try:
-        query = """
-            SELECT 
-                m.id AS message_id,
-                s.name AS student_name,
-                m.subject AS message_title,
-                m.content AS message_content,
-                m.created_at AS sent_at
+        # Pages follow message id, which grows with created_at
+        tail, params = page.clause("m.id", "ORDER BY m.created_at DESC")
+        query = f"""
+            SELECT {page.select("m.id")}
             FROM messages m
             JOIN students s ON m.sender_id = s.id
-            ORDER BY m.created_at DESC
+            {tail}
         """
-        cursor.execute(query)
+        cursor.execute(query, params)
         messages = cursor.fetchall()
+
+        if page.paginated:
+            return jsonify(page.result(messages)), 200
         return jsonify(messages), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
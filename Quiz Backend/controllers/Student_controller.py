@@ -1,12 +1,22 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response
 from models.db_connection import get_db_connection
-import uuid
-import subprocess
+from models.quiz_cache import get_quiz_payload
+from models.notifications import parse_feed_args, read_feed
+from models.submissions import submit_attempt
+from models.passwords import check_password
+from models.admission import login_admission
+from models.sessions import student_sessions, protect_blueprint, check_owner
+from services.sheets_sync import notify_sync
 
 student_bp = Blueprint('student_bp', __name__)
 
+# Every route checks the session token except login/logout (see SESSION_CONFIG), and
+# a <student_id> in the URL must be the logged-in student
+protect_blueprint(student_bp, 'student', exempt=('student_login', 'student_logout'), owner_arg='student_id')
+
 # Student Login API
 @student_bp.route('/login', methods=['POST'])
+@login_admission.guard('student')
 def student_login():
     """Login for Student"""
     data = request.json
@@ -21,31 +31,32 @@ def student_login():
 
     try:
         # Fetch student details
-        query = "SELECT id, password FROM students WHERE email = %s"
+        query = "SELECT id, password, password_legacy FROM students WHERE email = %s"
         cursor.execute(query, (email,))
         student = cursor.fetchone()
 
-        if not student or student['password'] != password:
+        # Runs on the hashing pool; an unknown e-mail is checked against a dummy hash
+        matches, new_hash = check_password(
+            password, student['password'] if student else None, bool(student and student['password_legacy'])
+        )
+        if not matches:
             return jsonify({"error": "Invalid email or password"}), 401
 
         student_id = student['id']
 
-        # Check if a session already exists
-        cursor.execute("SELECT session_token FROM sessions WHERE student_id = %s", (student_id,))
-        existing_session = cursor.fetchone()
+        # Upgrade plaintext or outdated hashes to the configured algorithm/cost
+        if new_hash:
+            cursor.execute("UPDATE students SET password = %s, password_legacy = 0 WHERE id = %s",
+                           (new_hash, student_id))
+            conn.commit()
 
-        if existing_session:
+        # Check if a live (unexpired) session already exists; both use this route's connection
+        if student_sessions.has_active(student_id, cursor):
             return jsonify({"error": "You are already logged in on another device"}), 403
 
-        # Generate a unique session token
-        session_token = str(uuid.uuid4())
-
-        # Insert new session token into the database
-        cursor.execute(
-            "INSERT INTO sessions (student_id, session_token) VALUES (%s, %s)",
-            (student_id, session_token)
-        )
+        session_token = student_sessions.create(student_id, cursor)
         conn.commit()
+        student_sessions.remember(session_token, student_id)
 
         return jsonify({
             "message": "Login successful",
@@ -71,23 +82,13 @@ def student_logout():
     if not session_token:
         return jsonify({"error": "Session token is required"}), 400
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
     try:
-        # Remove session token from the database
-        cursor.execute("DELETE FROM sessions WHERE session_token = %s", (session_token,))
-        conn.commit()
-
+        student_sessions.revoke(session_token)
         return jsonify({"message": "Logout successful"}), 200
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-    finally:
-        cursor.close()
-        conn.close()
-
 
 
 
@@ -103,15 +104,14 @@ def get_assigned_quizzes(student_id):
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
     try:
+        # student_quiz_visibility is kept up to date by the admin assignment routes
         query = """
-            SELECT DISTINCT q.id AS quiz_id, q.title AS quiz_title, q.description 
-            FROM quizzes q
-            LEFT JOIN quiz_student_assignments qsa ON q.id = qsa.quiz_id AND qsa.student_id = %s
-            LEFT JOIN quiz_class_assignments qca ON q.id = qca.quiz_id
-            LEFT JOIN students s ON s.class_id = qca.class_id
-            WHERE qsa.student_id = %s OR (s.id = %s AND qca.class_id = s.class_id)
+            SELECT q.id AS quiz_id, q.title AS quiz_title, q.description 
+            FROM student_quiz_visibility v
+            JOIN quizzes q ON q.id = v.quiz_id
+            WHERE v.student_id = %s
         """
-        cursor.execute(query, (student_id, student_id, student_id))
+        cursor.execute(query, (student_id,))
         quizzes = cursor.fetchall()
         return jsonify(quizzes), 200
     except Exception as e:
@@ -126,41 +126,18 @@ def get_assigned_quizzes(student_id):
 @student_bp.route('/quizzes/<int:quiz_id>/questions', methods=['GET'])
 def get_quiz_questions(quiz_id):
     """Retrieve questions and their options for the selected quiz."""
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
     try:
-        query = """
-            SELECT q.id AS question_id, q.question AS question_text, 
-                   o.id AS option_id, o.option_text, o.is_correct 
-            FROM quiz_questions q
-            JOIN quiz_options o ON q.id = o.question_id
-            WHERE q.quiz_id = %s
-        """
-        cursor.execute(query, (quiz_id,))
-        data = cursor.fetchall()
-
-        # Group questions with their options
-        questions = {}
-        for row in data:
-            question_id = row['question_id']
-            if question_id not in questions:
-                questions[question_id] = {
-                    "question_id": question_id,
-                    "question_text": row['question_text'],
-                    "options": []
-                }
-            questions[question_id]['options'].append({
-                "option_id": row['option_id'],
-                "option_text": row['option_text'],
-                "is_correct": row['is_correct']  # Used for result calculation
-            })
-
-        return jsonify(list(questions.values())), 200
+        # Served from the quiz content cache; the JSON body is serialized once per version
+        payload = get_quiz_payload(quiz_id)
+
+        if request.if_none_match.contains(payload.etag):
+            response = Response(status=304)
+        else:
+            response = Response(payload.body, status=200, mimetype='application/json')
+        response.set_etag(payload.etag)
+        return response
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        cursor.close()
-        conn.close()
 
 
 
@@ -175,89 +152,26 @@ def submit_quiz_result(student_id, quiz_id):
     if not answers:
         return jsonify({"error": "Answers are required"}), 400
 
-    # Convert keys to integers for consistency
-    answers = {int(k): v for k, v in answers.items()}
-
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
     try:
-        # Fetch the attempt limit for the quiz
-        cursor.execute("SELECT attempt_limit FROM quizzes WHERE id = %s", (quiz_id,))
-        quiz_data = cursor.fetchone()
+        # Eligibility in one round trip, attempt number allocated in the INSERT (models/submissions.py)
+        result = submit_attempt(conn, cursor, student_id, quiz_id, answers)
 
-        if not quiz_data:
+        if result.status == 'not_found':
             return jsonify({"error": "Quiz not found"}), 404
 
-        attempt_limit = quiz_data['attempt_limit']
-
-        # Check if the student has exceeded the attempt limit
-        cursor.execute(
-            "SELECT COUNT(*) AS attempt_count FROM quiz_results WHERE student_id = %s AND quiz_id = %s",
-            (student_id, quiz_id)
-        )
-        attempt_count = cursor.fetchone()['attempt_count']
-
-        if attempt_count >= attempt_limit:
-            return jsonify({"error": f"You have reached the maximum attempt limit of {attempt_limit}"}), 403
+        if result.status == 'limit_reached':
+            return jsonify({"error": f"You have reached the maximum attempt limit of {result.attempt_limit}"}), 403
 
-        # Ensure the student is assigned to the quiz either directly or via class
-        cursor.execute("""
-            SELECT 1 FROM quizzes q
-            LEFT JOIN quiz_student_assignments qsa ON q.id = qsa.quiz_id AND qsa.student_id = %s
-            LEFT JOIN quiz_class_assignments qca ON q.id = qca.quiz_id
-            LEFT JOIN students s ON qca.class_id = s.class_id
-            WHERE q.id = %s AND (qsa.quiz_id IS NOT NULL OR s.id = %s)
-        """, (student_id, quiz_id, student_id))
-        assignment = cursor.fetchone()
-
-        if not assignment:
+        if result.status == 'not_assigned':
             return jsonify({"error": "You are not assigned to this quiz"}), 403
 
-        # Fetch correct answers
-        cursor.execute("""
-            SELECT q.id AS question_id, o.id AS correct_option_id
-            FROM quiz_questions q
-            JOIN quiz_options o ON q.id = o.question_id
-            WHERE o.is_correct = 1 AND q.quiz_id = %s
-        """, (quiz_id,))
-        correct_answers = {row['question_id']: row['correct_option_id'] for row in cursor.fetchall()}
-
-        # Calculate score
-        score = sum(
-            1 for q_id, opt_id in answers.items()
-            if correct_answers.get(q_id) and int(correct_answers[q_id]) == int(opt_id)
-        )
+        # Google Sheets is updated by the background sync worker, not inline
+        notify_sync()
 
-        # Store result
-        feedback = f"Your score is {score}/{len(correct_answers)}."
-        cursor.execute("""
-            INSERT INTO quiz_results (student_id, quiz_id, attempt_number, score, feedback)
-            VALUES (%s, %s, %s, %s, %s)
-        """, (student_id, quiz_id, attempt_count + 1, score, feedback))
-        conn.commit()
-        
-        try:
-            subprocess.run(
-                ['python', r'C:/Users/Abu Hurairah/Desktop/Quiz Project/Quiz Backend/google-sheet-integeration.py'], 
-                check=True, 
-                capture_output=True, 
-                text=True
-            )
-            print("google-sheet-intergeration file run successfully")
-        except FileNotFoundError as e:
-            return jsonify({"error": f"Google Sheets integration script not found: {str(e)}"}), 500
-        except subprocess.CalledProcessError as e:
-            return jsonify({
-                "error": "Failed to update Google Sheets.",
-                "details": e.stderr or str(e)
-            }), 500
-        except Exception as e:
-            return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
-
-
-      
-        
-        return jsonify({"message": "Quiz submitted successfully", "score": score, "feedback": feedback}), 201
+        return jsonify({"message": "Quiz submitted successfully", "score": result.score,
+                        "feedback": result.feedback}), 201
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     finally:
@@ -379,26 +293,24 @@ def get_study_materials(student_id):
 # Fetch Notifications for Student
 @student_bp.route('/<int:student_id>/notifications', methods=['GET'])
 def get_student_notifications(student_id):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
+    """Notifications of the student and their class, newest first (served from models/notifications.py).
+
+    With ?limit= and/or ?since=<cursor> the response is {"items", "cursor", "has_more"};
+    poll again with since=cursor to get only newer notifications, at once while has_more is set.
+    """
     try:
-        query = """
-            SELECT message, created_at FROM student_notifications
-            WHERE student_id = %s
-            UNION
-            SELECT cn.message, cn.created_at
-            FROM class_notifications cn
-            JOIN students s ON cn.class_id = s.class_id
-            WHERE s.id = %s
-        """
-        cursor.execute(query, (student_id, student_id))
-        notifications = cursor.fetchall()
-        return jsonify(notifications), 200
+        since, limit, paged = parse_feed_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        items, cursor, has_more = read_feed(student_id, since, limit)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        cursor.close()
-        conn.close()
+
+    if paged:
+        return jsonify({"items": items, "cursor": cursor, "has_more": has_more}), 200
+    return jsonify([{"message": item['message'], "created_at": item['created_at']} for item in items]), 200
 
 
 
@@ -415,6 +327,10 @@ def send_message_to_admin():
     if not all([sender_id, subject, content]):
         return jsonify({"error": "All fields are required"}), 400
 
+    error = check_owner('student', sender_id)
+    if error:
+        return error
+
     conn = get_db_connection()
     cursor = conn.cursor()
     try:
@@ -2,6 +2,7 @@ import mysql.connector
 from mysql.connector import Error
 import gspread
 from google.oauth2.service_account import Credentials
+from services.sheets_sync import GoogleSheetsClient, sync_pending_rows
 
 # Google Sheets setup
 SERVICE_ACCOUNT_FILE = r'C:/Users/Abu Hurairah/Desktop/Quiz Project/Quiz Backend/credentials.json'
@@ -43,38 +44,20 @@ def get_db_connection():
         exit()
 
 # Function to fetch new rows from quiz_summary and write to Google Sheets
-def sync_to_google_sheet():
+def sync_to_google_sheet(batch_size=500):
+    """Sync unsynced quiz_summary rows in batches of at most batch_size rows.
+
+    Each batch is one append_rows call and one UPDATE ... WHERE id IN (...);
+    failed appends are retried with backoff (see services/sheets_sync.py).
+    """
     try:
         print("Starting sync process to Google Sheets...")
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-
-        print("Fetching unsynced rows from the database...")
-        query = "SELECT * FROM quiz_summary WHERE synced_to_google = 0"
-        cursor.execute(query)
-        new_rows = cursor.fetchall()
-        print(f"Fetched {len(new_rows)} new rows.")
-
-        if new_rows:
-            print("Writing rows to Google Sheets...")
-        for row in new_rows:
-            # Convert datetime object to string
-            inserted_at = row['inserted_at'].strftime('%Y-%m-%d %H:%M:%S') if row['inserted_at'] else None
-
-            sheet.append_row([
-                row['id'], row['student_name'], row['quiz_title'],
-                row['score'], row['attempt_number'], row['feedback'], inserted_at
-            ])
-            print(f"Row with ID {row['id']} written to Google Sheets.")
-
-            # Mark the row as synced
-            update_query = "UPDATE quiz_summary SET synced_to_google = 1 WHERE id = %s"
-            cursor.execute(update_query, (row['id'],))
-
-        conn.commit()
-        print("All rows synced and database updated.")
-        cursor.close()
-        conn.close()
+        synced = sync_pending_rows(
+            GoogleSheetsClient(sheet=sheet),
+            batch_size=batch_size,
+            connection_factory=get_db_connection
+        )
+        print(f"{synced} rows synced and database updated.")
     except Error as e:
         print(f"Database error during sync: {e}")
     except Exception as e:
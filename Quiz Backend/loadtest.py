@@ -0,0 +1,135 @@
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# How each serving mode is started for a comparison run; {port} and {threads}
+# are filled in. "dev" is the threaded Werkzeug server that `python app.py` uses.
+SERVER_COMMANDS = {
+    'dev': [sys.executable, '-c', "from app import app; app.run(port={port}, threaded=True)"],
+    'waitress': [sys.executable, 'serve.py', '--server', 'waitress', '--host', '127.0.0.1',
+                 '--port', '{port}', '--threads', '{threads}'],
+    'gunicorn': [sys.executable, 'serve.py', '--server', 'gunicorn', '--host', '127.0.0.1',
+                 '--port', '{port}', '--threads', '{threads}'],
+    'uvicorn': [sys.executable, '-m', 'uvicorn', 'wsgi:app', '--interface', 'wsgi', '--host', '127.0.0.1',
+                '--port', '{port}', '--log-level', 'warning']
+}
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(latencies, errors, elapsed):
+    """Request count, requests/sec and latency percentiles in milliseconds."""
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2) if latencies else None,
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2) if latencies else None
+    }
+
+
+def run_load(host, port, path, concurrency=32, duration=10.0, method='GET', body=None, headers=None):
+    """Send requests from `concurrency` keep-alive clients for `duration` seconds."""
+    payload = json.dumps(body).encode() if body is not None else None
+    request_headers = dict(headers or {})
+    if payload is not None:
+        request_headers['Content-Type'] = 'application/json'
+
+    latencies, lock = [], threading.Lock()
+    errors = [0]
+    deadline = time.perf_counter() + duration
+
+    def client():
+        local, failed = [], 0
+        conn = http.client.HTTPConnection(host, port, timeout=30)
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                conn.request(method, path, body=payload, headers=request_headers)
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 500:
+                    failed += 1
+                else:
+                    local.append(time.perf_counter() - started)
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection(host, port, timeout=30)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(latencies, errors[0], time.perf_counter() - started)
+
+
+def wait_until_up(host, port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=2)
+            conn.request('GET', '/hello')
+            conn.getresponse().read()
+            conn.close()
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def start_server(kind, port, threads):
+    command = [part.format(port=port, threads=threads) for part in SERVER_COMMANDS[kind]]
+    return subprocess.Popen(command, cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def compare(servers, path, concurrency, duration, port=5100, threads=16, warmup=1.0):
+    """Start each server in turn, load it, and print one line per server."""
+    results = {}
+    for kind in servers:
+        process = start_server(kind, port, threads)
+        try:
+            if not wait_until_up('127.0.0.1', port):
+                print(f"{kind:9} did not start")
+                continue
+            run_load('127.0.0.1', port, path, concurrency, warmup)
+            results[kind] = stats = run_load('127.0.0.1', port, path, concurrency, duration)
+            print(f"{kind:9} {stats['rps']:9.1f} req/s  p50 {stats['p50_ms']} ms  "
+                  f"p95 {stats['p95_ms']} ms  p99 {stats['p99_ms']} ms  errors {stats['errors']}")
+        finally:
+            process.terminate()
+            process.wait(10)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare requests/sec of the serving modes.")
+    parser.add_argument('--servers', default='dev,waitress', help=f"comma-separated: {', '.join(SERVER_COMMANDS)}")
+    parser.add_argument('--path', default='/hello', help="GET path to load, e.g. /api/student/student/1/quizzes")
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--threads', type=int, default=16, help="request threads for waitress/gunicorn")
+    parser.add_argument('--port', type=int, default=5100)
+    args = parser.parse_args()
+
+    compare(args.servers.split(','), args.path, args.concurrency, args.duration, args.port, args.threads)
@@ -0,0 +1,248 @@
+import argparse
+import os
+import re
+import sys
+
+from models.db_connection import get_db_connection
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+# Errors meaning "this object already exists". Databases created before the
+# migrations were checked in already have some of these tables and keys.
+ALREADY_EXISTS_ERRORS = {
+    1050,  # table exists
+    1060,  # duplicate column
+    1061,  # duplicate key name
+    1359,  # trigger exists
+    1826   # duplicate foreign key
+}
+
+# Errors meaning "this object is already gone", skipped for DROP statements only.
+# DDL commits as it runs, so a migration that failed part way through its drops
+# is rerun with some of them already done.
+ALREADY_DROPPED_ERRORS = {
+    1054,  # unknown column
+    1091   # can't drop; column or key doesn't exist
+}
+
+_DROP_STATEMENT = re.compile(r"^\s*(DROP\b|ALTER\s+TABLE\s+\S+\s+DROP\b)", re.IGNORECASE)
+
+# Queries on the request path, with sample parameters, checked by `migrate.py check`.
+# Register new hot queries here together with the index that serves them.
+HOT_QUERIES = [
+    ("student login", "SELECT id, password, password_legacy FROM students WHERE email = %s", ("student@example.com",)),
+    ("session by student", """
+        SELECT 1 FROM sessions WHERE student_id = %s AND expires_at > NOW() LIMIT 1
+    """, (1,)),
+    ("session by token", """
+        SELECT student_id, TIMESTAMPDIFF(SECOND, NOW(), expires_at)
+        FROM sessions WHERE session_token = %s AND expires_at > NOW()
+    """, ("token",)),
+    ("admin session by token", """
+        SELECT admin_id, TIMESTAMPDIFF(SECOND, NOW(), expires_at)
+        FROM admin_sessions WHERE session_token = %s AND expires_at > NOW()
+    """, ("token",)),
+    ("expired sessions", "SELECT id FROM sessions WHERE expires_at <= NOW() LIMIT 1000", ()),
+    ("assigned quizzes", """
+        SELECT q.id AS quiz_id, q.title AS quiz_title, q.description
+        FROM student_quiz_visibility v
+        JOIN quizzes q ON q.id = v.quiz_id
+        WHERE v.student_id = %s
+    """, (1,)),
+    ("quiz questions", """
+        SELECT q.id AS question_id, q.question AS question_text,
+               o.id AS option_id, o.option_text, o.is_correct
+        FROM quiz_questions q
+        JOIN quiz_options o ON q.id = o.question_id
+        WHERE q.quiz_id = %s
+    """, (1,)),
+    ("answer key", """
+        SELECT q.id AS question_id, o.id AS correct_option_id
+        FROM quiz_questions q
+        JOIN quiz_options o ON q.id = o.question_id
+        WHERE o.is_correct = 1 AND q.quiz_id = %s
+    """, (1,)),
+    ("submit eligibility", """
+        SELECT
+            q.attempt_limit,
+            q.content_version,
+            (SELECT COUNT(*) FROM quiz_results qr
+             WHERE qr.student_id = %s AND qr.quiz_id = q.id) AS attempt_count,
+            EXISTS (SELECT 1 FROM student_quiz_visibility v
+                    WHERE v.student_id = %s AND v.quiz_id = q.id) AS is_assigned
+        FROM quizzes q
+        WHERE q.id = %s
+    """, (1, 1, 1)),
+    ("student results", """
+        SELECT qr.quiz_id, q.title AS quiz_title, qr.score, qr.feedback, qr.attempt_number
+        FROM quiz_results qr
+        JOIN quizzes q ON qr.quiz_id = q.id
+        WHERE qr.student_id = %s
+    """, (1,)),
+    ("regrade chunk", """
+        SELECT id, score, answers FROM quiz_results
+        WHERE quiz_id = %s AND id > %s ORDER BY id LIMIT 1000
+    """, (1, 0)),
+    ("class roster", "SELECT name, email FROM students WHERE class_id = %s", (1,)),
+    ("class study materials", """
+        SELECT sm.title, sm.description, sm.file_path, sm.uploaded_by
+        FROM study_materials sm
+        WHERE sm.class_id = %s
+        ORDER BY sm.title ASC
+    """, (1,)),
+    ("student messages", """
+        SELECT id, subject, content, created_at FROM messages
+        WHERE sender_id = %s ORDER BY created_at DESC
+    """, (1,)),
+    ("student notifications", """
+        SELECT id, message, created_at FROM student_notifications
+        WHERE student_id = %s
+        ORDER BY created_at DESC, id DESC
+        LIMIT 200
+    """, (1,)),
+    ("class notifications", """
+        SELECT id, message, created_at FROM class_notifications
+        WHERE class_id = %s
+        ORDER BY created_at DESC, id DESC
+        LIMIT 200
+    """, (1,)),
+    ("pending drive uploads", "SELECT sha256 FROM study_blobs WHERE drive_status = 'pending' ORDER BY created_at", ()),
+    ("unreferenced blobs", "SELECT sha256 FROM study_blobs WHERE ref_count <= 0", ()),
+    ("materials by content", "SELECT id FROM study_materials WHERE sha256 = %s", ("0" * 64,)),
+    ("pending sheet rows", """
+        SELECT * FROM quiz_summary
+        WHERE synced_to_google = 0 AND id > %s
+        ORDER BY id LIMIT 500
+    """, (0,))
+]
+
+
+def split_statements(sql):
+    """Split a migration file into statements; each ends with ';' at the end of a line."""
+    statements, current = [], []
+    for line in sql.splitlines():
+        if not current and (not line.strip() or line.strip().startswith('--')):
+            continue
+        current.append(line)
+        if line.rstrip().endswith(';'):
+            statements.append('\n'.join(current).rstrip().rstrip(';'))
+            current = []
+    if current and '\n'.join(current).strip():
+        statements.append('\n'.join(current))
+    return statements
+
+
+def tolerated_errors(statement):
+    """Error codes that mean the statement was already applied by an earlier run."""
+    if _DROP_STATEMENT.match(statement):
+        return ALREADY_EXISTS_ERRORS | ALREADY_DROPPED_ERRORS
+    return ALREADY_EXISTS_ERRORS
+
+
+def available_migrations():
+    migrations = []
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        if filename.endswith('.sql'):
+            version = int(filename.split('_', 1)[0])
+            migrations.append((version, filename))
+    return migrations
+
+
+def applied_versions(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            filename VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def migrate(target=None):
+    """Apply pending migrations in version order, up to target if given."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        applied = applied_versions(cursor)
+        for version, filename in available_migrations():
+            if version in applied or (target is not None and version > target):
+                continue
+            print(f"Applying {filename}...")
+            with open(os.path.join(MIGRATIONS_DIR, filename)) as f:
+                statements = split_statements(f.read())
+            for statement in statements:
+                try:
+                    cursor.execute(statement)
+                except Exception as e:
+                    if e.args and e.args[0] in tolerated_errors(statement):
+                        print(f"  already applied, skipped: {e}")
+                        continue
+                    conn.rollback()
+                    raise
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, filename) VALUES (%s, %s)",
+                (version, filename)
+            )
+            conn.commit()
+        print("Database schema is up to date.")
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def status():
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        applied = applied_versions(cursor)
+        for version, filename in available_migrations():
+            print(f"{'applied' if version in applied else 'pending'}  {filename}")
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def full_scans(plan):
+    """Return the tables an EXPLAIN plan reads with a full table scan."""
+    scans = []
+    for row in plan:
+        extra = row.get('Extra') or ''
+        if row.get('type') == 'ALL' and 'no matching row' not in extra and 'Impossible' not in extra:
+            scans.append(row.get('table'))
+    return scans
+
+
+def check_hot_queries():
+    """EXPLAIN every registered hot query; return False if any falls back to a full scan."""
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    ok = True
+    try:
+        for name, query, params in HOT_QUERIES:
+            cursor.execute("EXPLAIN " + query, params)
+            scans = full_scans(cursor.fetchall())
+            if scans:
+                ok = False
+                print(f"FULL SCAN  {name}: {', '.join(str(table) for table in scans)}")
+            else:
+                print(f"ok         {name}")
+    finally:
+        cursor.close()
+        conn.close()
+    return ok
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Apply schema migrations and check hot query plans.")
+    parser.add_argument('command', nargs='?', default='migrate', choices=['migrate', 'status', 'check'])
+    parser.add_argument('--target', type=int, help="apply migrations up to this version only")
+    args = parser.parse_args()
+
+    if args.command == 'migrate':
+        migrate(args.target)
+    elif args.command == 'status':
+        status()
+    elif not check_hot_queries():
+        sys.exit(1)
@@ -0,0 +1,150 @@
+-- Tables used by controllers/Admin_controller.py and controllers/Student_controller.py.
+-- IF NOT EXISTS so that databases created before migrations adopt this as their baseline.
+
+CREATE TABLE IF NOT EXISTS admins (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    email VARCHAR(255) NOT NULL,
+    password VARCHAR(255) NOT NULL,
+    UNIQUE KEY uq_admins_email (email)
+);
+
+CREATE TABLE IF NOT EXISTS classes (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    created_by INT NULL,
+    KEY idx_classes_name (name),
+    CONSTRAINT fk_classes_admin FOREIGN KEY (created_by) REFERENCES admins (id) ON DELETE SET NULL
+);
+
+CREATE TABLE IF NOT EXISTS students (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    email VARCHAR(255) NOT NULL,
+    password VARCHAR(255) NOT NULL,
+    class_id INT NULL,
+    UNIQUE KEY uq_students_email (email),
+    CONSTRAINT fk_students_class FOREIGN KEY (class_id) REFERENCES classes (id) ON DELETE SET NULL
+);
+
+CREATE TABLE IF NOT EXISTS sessions (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    student_id INT NOT NULL,
+    session_token VARCHAR(64) NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT fk_sessions_student FOREIGN KEY (student_id) REFERENCES students (id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS quizzes (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    title VARCHAR(255) NOT NULL,
+    description TEXT,
+    attempt_limit INT NOT NULL DEFAULT 3,
+    created_by INT NULL,
+    CONSTRAINT fk_quizzes_admin FOREIGN KEY (created_by) REFERENCES admins (id) ON DELETE SET NULL
+);
+
+CREATE TABLE IF NOT EXISTS quiz_questions (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    quiz_id INT NOT NULL,
+    question VARCHAR(1000) NOT NULL,
+    UNIQUE KEY uq_quiz_questions_question (quiz_id, question(255)),
+    CONSTRAINT fk_quiz_questions_quiz FOREIGN KEY (quiz_id) REFERENCES quizzes (id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS quiz_options (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    question_id INT NOT NULL,
+    option_text VARCHAR(500) NOT NULL,
+    is_correct TINYINT(1) NOT NULL DEFAULT 0,
+    UNIQUE KEY uq_quiz_options_text (question_id, option_text(255)),
+    CONSTRAINT fk_quiz_options_question FOREIGN KEY (question_id) REFERENCES quiz_questions (id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS quiz_student_assignments (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    quiz_id INT NOT NULL,
+    student_id INT NOT NULL,
+    UNIQUE KEY uq_quiz_student (quiz_id, student_id),
+    CONSTRAINT fk_qsa_quiz FOREIGN KEY (quiz_id) REFERENCES quizzes (id) ON DELETE CASCADE,
+    CONSTRAINT fk_qsa_student FOREIGN KEY (student_id) REFERENCES students (id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS quiz_class_assignments (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    quiz_id INT NOT NULL,
+    class_id INT NOT NULL,
+    UNIQUE KEY uq_quiz_class (quiz_id, class_id),
+    CONSTRAINT fk_qca_quiz FOREIGN KEY (quiz_id) REFERENCES quizzes (id) ON DELETE CASCADE,
+    CONSTRAINT fk_qca_class FOREIGN KEY (class_id) REFERENCES classes (id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS quiz_results (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    student_id INT NOT NULL,
+    quiz_id INT NOT NULL,
+    attempt_number INT NOT NULL,
+    score INT NOT NULL,
+    feedback VARCHAR(255),
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT fk_quiz_results_student FOREIGN KEY (student_id) REFERENCES students (id) ON DELETE CASCADE,
+    CONSTRAINT fk_quiz_results_quiz FOREIGN KEY (quiz_id) REFERENCES quizzes (id) ON DELETE CASCADE
+);
+
+-- Filled by trg_quiz_results_summary, drained to Google Sheets by services/sheets_sync.py
+CREATE TABLE IF NOT EXISTS quiz_summary (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    student_name VARCHAR(100),
+    quiz_title VARCHAR(255),
+    score INT,
+    attempt_number INT,
+    feedback VARCHAR(255),
+    inserted_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    synced_to_google TINYINT(1) NOT NULL DEFAULT 0
+);
+
+CREATE TRIGGER trg_quiz_results_summary AFTER INSERT ON quiz_results
+FOR EACH ROW
+    INSERT INTO quiz_summary (student_name, quiz_title, score, attempt_number, feedback)
+    SELECT s.name, q.title, NEW.score, NEW.attempt_number, NEW.feedback
+    FROM students s JOIN quizzes q ON q.id = NEW.quiz_id
+    WHERE s.id = NEW.student_id;
+
+CREATE TABLE IF NOT EXISTS study_materials (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    title VARCHAR(255) NOT NULL,
+    description TEXT,
+    file_path VARCHAR(500),
+    file_drive_id VARCHAR(255),
+    class_id INT NULL,
+    uploaded_by INT NULL,
+    CONSTRAINT fk_study_materials_class FOREIGN KEY (class_id) REFERENCES classes (id) ON DELETE CASCADE,
+    CONSTRAINT fk_study_materials_admin FOREIGN KEY (uploaded_by) REFERENCES admins (id) ON DELETE SET NULL
+);
+
+CREATE TABLE IF NOT EXISTS class_notifications (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    message TEXT NOT NULL,
+    class_id INT NOT NULL,
+    created_by INT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT fk_class_notifications_class FOREIGN KEY (class_id) REFERENCES classes (id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS student_notifications (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    message TEXT NOT NULL,
+    student_id INT NOT NULL,
+    created_by INT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT fk_student_notifications_student FOREIGN KEY (student_id) REFERENCES students (id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS messages (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    sender_id INT NOT NULL,
+    subject VARCHAR(255) NOT NULL,
+    content TEXT NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT fk_messages_student FOREIGN KEY (sender_id) REFERENCES students (id) ON DELETE CASCADE
+);
@@ -0,0 +1,7 @@
+-- Graded answers per attempt (models/scoring.pack_answers) for re-grading,
+-- and the unique key submit_quiz_result relies on to allocate attempt numbers.
+
+ALTER TABLE quiz_results ADD COLUMN answers BLOB NULL;
+
+ALTER TABLE quiz_results
+    ADD UNIQUE KEY uq_quiz_results_attempt (student_id, quiz_id, attempt_number);
@@ -0,0 +1,21 @@
+-- Materialized student -> quiz visibility, maintained by models/visibility.py
+
+CREATE TABLE IF NOT EXISTS student_quiz_visibility (
+    student_id INT NOT NULL,
+    quiz_id INT NOT NULL,
+    via_student TINYINT(1) NOT NULL DEFAULT 0,
+    via_class TINYINT(1) NOT NULL DEFAULT 0,
+    PRIMARY KEY (student_id, quiz_id),
+    KEY idx_visibility_quiz (quiz_id)
+);
+
+-- Backfill from the assignment tables
+INSERT INTO student_quiz_visibility (student_id, quiz_id, via_student)
+SELECT student_id, quiz_id, 1 FROM quiz_student_assignments
+ON DUPLICATE KEY UPDATE via_student = 1;
+
+INSERT INTO student_quiz_visibility (student_id, quiz_id, via_class)
+SELECT s.id, qca.quiz_id, 1
+FROM quiz_class_assignments qca
+JOIN students s ON s.class_id = qca.class_id
+ON DUPLICATE KEY UPDATE via_class = 1;
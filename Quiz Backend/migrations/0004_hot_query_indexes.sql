@@ -0,0 +1,27 @@
+-- Indexes for the queries registered in migrate.HOT_QUERIES
+
+-- student_login / student_logout
+ALTER TABLE sessions ADD UNIQUE KEY uq_sessions_token (session_token);
+ALTER TABLE sessions ADD KEY idx_sessions_student (student_id);
+
+-- student roster per class (notifications, study materials, visibility)
+ALTER TABLE students ADD KEY idx_students_class (class_id, id);
+
+-- answer key: correct options of a question without touching the row
+ALTER TABLE quiz_options ADD KEY idx_quiz_options_correct (question_id, is_correct);
+
+-- re-grade keyset scan over one quiz's attempts (InnoDB appends id)
+ALTER TABLE quiz_results ADD KEY idx_quiz_results_quiz (quiz_id);
+
+-- Google Sheets sync: pending rows in id order
+ALTER TABLE quiz_summary ADD KEY idx_quiz_summary_sync (synced_to_google, id);
+
+-- messages by student, newest first
+ALTER TABLE messages ADD KEY idx_messages_sender (sender_id, created_at);
+
+-- notification feeds
+ALTER TABLE student_notifications ADD KEY idx_student_notifications_student (student_id, created_at);
+ALTER TABLE class_notifications ADD KEY idx_class_notifications_class (class_id, created_at);
+
+-- study materials of a class ordered by title
+ALTER TABLE study_materials ADD KEY idx_study_materials_class (class_id, title);
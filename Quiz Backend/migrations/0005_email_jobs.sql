@@ -0,0 +1,23 @@
+-- Notification e-mails sent by services/mailer.py, one delivery row per recipient
+
+CREATE TABLE IF NOT EXISTS email_jobs (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    subject VARCHAR(255) NOT NULL,
+    message TEXT NOT NULL,
+    created_by INT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS email_deliveries (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    job_id INT NOT NULL,
+    name VARCHAR(100),
+    email VARCHAR(255) NOT NULL,
+    status ENUM('pending', 'sent', 'failed') NOT NULL DEFAULT 'pending',
+    attempts INT NOT NULL DEFAULT 0,
+    last_error VARCHAR(500),
+    sent_at TIMESTAMP NULL,
+    KEY idx_email_deliveries_job (job_id, status),
+    KEY idx_email_deliveries_status (status, job_id),
+    CONSTRAINT fk_email_deliveries_job FOREIGN KEY (job_id) REFERENCES email_jobs (id) ON DELETE CASCADE
+);
@@ -0,0 +1,19 @@
+-- Session expiry for students and server-side sessions for admins (models/sessions.py)
+
+ALTER TABLE sessions ADD COLUMN expires_at DATETIME NULL;
+
+UPDATE sessions SET expires_at = created_at + INTERVAL 12 HOUR WHERE expires_at IS NULL;
+
+ALTER TABLE sessions ADD KEY idx_sessions_expires (expires_at);
+
+CREATE TABLE IF NOT EXISTS admin_sessions (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    admin_id INT NOT NULL,
+    session_token VARCHAR(64) NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    expires_at DATETIME NOT NULL,
+    UNIQUE KEY uq_admin_sessions_token (session_token),
+    KEY idx_admin_sessions_admin (admin_id),
+    KEY idx_admin_sessions_expires (expires_at),
+    CONSTRAINT fk_admin_sessions_admin FOREIGN KEY (admin_id) REFERENCES admins (id) ON DELETE CASCADE
+);
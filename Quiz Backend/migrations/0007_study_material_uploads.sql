@@ -0,0 +1,19 @@
+-- Study material uploads: content hash and size, and the state of the background
+-- Google Drive copy (services/drive.py). Earlier rows were uploaded inline.
+
+ALTER TABLE study_materials ADD COLUMN local_path VARCHAR(500) NULL;
+
+ALTER TABLE study_materials ADD COLUMN file_size BIGINT NULL;
+
+ALTER TABLE study_materials ADD COLUMN sha256 CHAR(64) NULL;
+
+ALTER TABLE study_materials
+    ADD COLUMN drive_status ENUM('pending', 'uploading', 'uploaded', 'failed') NOT NULL DEFAULT 'uploaded';
+
+ALTER TABLE study_materials ADD COLUMN drive_attempts INT NOT NULL DEFAULT 0;
+
+ALTER TABLE study_materials ADD COLUMN drive_error VARCHAR(500) NULL;
+
+ALTER TABLE study_materials ADD COLUMN drive_uploaded_at TIMESTAMP NULL;
+
+ALTER TABLE study_materials ADD KEY idx_study_materials_drive_status (drive_status);
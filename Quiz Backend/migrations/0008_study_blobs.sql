@@ -0,0 +1,45 @@
+-- Content-addressed study material storage (services/storage.py, models/blobs.py):
+-- one file and one Google Drive copy per unique SHA-256, shared by every
+-- study_materials row with that content. Drive copy state moves from
+-- study_materials (0007) to the blob; the old columns are dropped by 0011 once
+-- this copy is recorded as applied. Every statement here is safe to rerun.
+
+CREATE TABLE IF NOT EXISTS study_blobs (
+    sha256 CHAR(64) PRIMARY KEY,
+    size BIGINT NOT NULL,
+    filename VARCHAR(255) NOT NULL,
+    ref_count INT NOT NULL DEFAULT 0,
+    drive_status ENUM('pending', 'uploading', 'uploaded', 'failed') NOT NULL DEFAULT 'pending',
+    drive_file_id VARCHAR(255) NULL,
+    drive_attempts INT NOT NULL DEFAULT 0,
+    drive_error VARCHAR(500) NULL,
+    drive_uploaded_at TIMESTAMP NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    KEY idx_study_blobs_drive_status (drive_status),
+    KEY idx_study_blobs_ref_count (ref_count)
+);
+
+ALTER TABLE study_materials ADD COLUMN original_filename VARCHAR(255) NULL;
+
+ALTER TABLE study_materials ADD KEY idx_study_materials_sha256 (sha256);
+
+-- Materials uploaded under 0007 already carry their hash; their files are moved
+-- into the blob layout by `python -m services.storage adopt`.
+UPDATE study_materials
+SET original_filename = SUBSTRING_INDEX(REPLACE(local_path, '\\', '/'), '/', -1)
+WHERE local_path IS NOT NULL;
+
+INSERT IGNORE INTO study_blobs
+    (sha256, size, filename, ref_count, drive_status, drive_file_id, drive_attempts, drive_uploaded_at)
+SELECT
+    sha256,
+    MAX(file_size),
+    MIN(original_filename),
+    COUNT(*),
+    IF(MAX(drive_status = 'uploaded'), 'uploaded', 'pending'),
+    MAX(IF(drive_status = 'uploaded', file_drive_id, NULL)),
+    0,
+    MAX(drive_uploaded_at)
+FROM study_materials
+WHERE sha256 IS NOT NULL
+GROUP BY sha256;
@@ -0,0 +1,11 @@
+-- A dispatcher claims deliveries ('sending') before it connects to SMTP, so two
+-- server processes resuming the same job never send the same e-mail twice.
+-- Claims older than MAIL_DISPATCH_CONFIG["claim_timeout"] (a crashed process)
+-- are handed back to 'pending' by MailDispatcher.resume().
+
+ALTER TABLE email_deliveries
+    MODIFY status ENUM('pending', 'sending', 'sent', 'failed') NOT NULL DEFAULT 'pending';
+
+ALTER TABLE email_deliveries ADD COLUMN claimed_by CHAR(32) NULL;
+
+ALTER TABLE email_deliveries ADD COLUMN claimed_at TIMESTAMP NULL;
@@ -0,0 +1,8 @@
+-- The Drive upload worker (services/drive.py) records which process is copying a
+-- blob and since when. Every server process resumes unfinished uploads at start;
+-- only claims older than DRIVE_CONFIG["claim_timeout"] are taken over, so an
+-- upload in flight in a sibling process is not started a second time.
+
+ALTER TABLE study_blobs ADD COLUMN drive_claimed_by CHAR(32) NULL;
+
+ALTER TABLE study_blobs ADD COLUMN drive_claimed_at TIMESTAMP NULL;
@@ -0,0 +1,15 @@
+-- Drop the study_materials columns whose data 0008 copied to study_blobs.
+-- DDL commits as it goes, so after a failure some columns may already be gone;
+-- migrate.py skips those drops when the migration is rerun.
+
+ALTER TABLE study_materials DROP COLUMN local_path;
+
+ALTER TABLE study_materials DROP COLUMN file_size;
+
+ALTER TABLE study_materials DROP COLUMN drive_status;
+
+ALTER TABLE study_materials DROP COLUMN drive_attempts;
+
+ALTER TABLE study_materials DROP COLUMN drive_error;
+
+ALTER TABLE study_materials DROP COLUMN drive_uploaded_at;
@@ -0,0 +1,35 @@
+-- quizzes.content_version changes whenever a question or option of the quiz
+-- changes, through the API or directly in SQL. Every server process keeps its
+-- own answer-key cache (models/quiz_cache.py); the submit route reads the
+-- version with its eligibility check and reloads a key cached at an older one.
+-- Options removed by ON DELETE CASCADE fire no trigger, but the question or
+-- quiz delete that removes them does.
+
+ALTER TABLE quizzes ADD COLUMN content_version INT NOT NULL DEFAULT 0;
+
+CREATE TRIGGER trg_quiz_questions_insert_version AFTER INSERT ON quiz_questions
+FOR EACH ROW
+    UPDATE quizzes SET content_version = content_version + 1 WHERE id = NEW.quiz_id;
+
+CREATE TRIGGER trg_quiz_questions_update_version AFTER UPDATE ON quiz_questions
+FOR EACH ROW
+    UPDATE quizzes SET content_version = content_version + 1 WHERE id IN (OLD.quiz_id, NEW.quiz_id);
+
+CREATE TRIGGER trg_quiz_questions_delete_version AFTER DELETE ON quiz_questions
+FOR EACH ROW
+    UPDATE quizzes SET content_version = content_version + 1 WHERE id = OLD.quiz_id;
+
+CREATE TRIGGER trg_quiz_options_insert_version AFTER INSERT ON quiz_options
+FOR EACH ROW
+    UPDATE quizzes SET content_version = content_version + 1
+    WHERE id = (SELECT quiz_id FROM quiz_questions WHERE id = NEW.question_id);
+
+CREATE TRIGGER trg_quiz_options_update_version AFTER UPDATE ON quiz_options
+FOR EACH ROW
+    UPDATE quizzes SET content_version = content_version + 1
+    WHERE id IN (SELECT quiz_id FROM quiz_questions WHERE id IN (OLD.question_id, NEW.question_id));
+
+CREATE TRIGGER trg_quiz_options_delete_version AFTER DELETE ON quiz_options
+FOR EACH ROW
+    UPDATE quizzes SET content_version = content_version + 1
+    WHERE id = (SELECT quiz_id FROM quiz_questions WHERE id = OLD.question_id);
@@ -0,0 +1,17 @@
+-- State of the Google Sheets sync (services/sheets_sync.py), a single row.
+-- appending_through is the high-water mark of the batch being appended: the
+-- highest quiz_summary id sent, cleared once the batch is marked synced. A
+-- sweep re-reads the sheet only when it finds the mark set over rows that are
+-- still pending (an append failed or its process stopped). claimed_by/at keep
+-- the workers of several server processes from sweeping at the same time.
+
+CREATE TABLE IF NOT EXISTS sheets_sync_state (
+    id TINYINT PRIMARY KEY,
+    appending_through INT NULL,
+    claimed_by CHAR(32) NULL,
+    claimed_at TIMESTAMP NULL
+);
+
+-- Rows appended by a sweep that was running during the upgrade are reconciled once
+INSERT IGNORE INTO sheets_sync_state (id, appending_through)
+SELECT 1, COALESCE(MAX(id), 0) FROM quiz_summary;
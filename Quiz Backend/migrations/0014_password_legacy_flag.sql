@@ -0,0 +1,13 @@
+-- Plaintext passwords from before hashing (models/passwords.py) are accepted
+-- only on rows flagged here, so a value in an unknown format written later is
+-- never compared as plaintext. The flag is cleared when the password is hashed.
+
+ALTER TABLE students ADD COLUMN password_legacy TINYINT(1) NOT NULL DEFAULT 0;
+
+ALTER TABLE admins ADD COLUMN password_legacy TINYINT(1) NOT NULL DEFAULT 0;
+
+UPDATE students SET password_legacy = 1
+WHERE password NOT LIKE 'scrypt$%' AND password NOT LIKE '$2_$%' AND password NOT LIKE '$argon2%';
+
+UPDATE admins SET password_legacy = 1
+WHERE password NOT LIKE 'scrypt$%' AND password NOT LIKE '$2_$%' AND password NOT LIKE '$argon2%';
@@ -0,0 +1,220 @@
+import functools
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask import jsonify, request
+
+from config import ADMISSION_CONFIG
+
+
+#                   ----------- Token bucket stores -----------
+
+def _refill(tokens, updated, now, rate, burst):
+    return min(burst, tokens + (now - updated) * rate)
+
+
+class MemoryBucketStore:
+    """Token buckets in process memory, least recently used dropped beyond max_keys."""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()   # key -> (tokens, updated)
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst, cost=1):
+        """Take cost tokens; returns (allowed, seconds until enough tokens are available)."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = _refill(tokens, updated, now, rate, burst)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (cost - tokens) / rate
+
+
+class SQLiteBucketStore:
+    """Token buckets in a local SQLite file, shared by every worker process on the host."""
+
+    PRUNE_EVERY = 10000     # takes between deletions of idle buckets
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._takes = 0
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL, updated REAL)"
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def take(self, key, rate, burst, cost=1):
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens = _refill(*(row or (burst, now)), now, rate, burst)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            conn.execute("INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                         (key, tokens, now))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._takes += 1
+        if self._takes % self.PRUNE_EVERY == 0:
+            self.prune()
+        return allowed, 0.0 if allowed else (cost - tokens) / rate
+
+    def prune(self, idle_seconds=3600):
+        """Delete buckets untouched for idle_seconds (they have refilled by then)."""
+        conn = self._connect()
+        conn.execute("DELETE FROM buckets WHERE updated < ?", (time.time() - idle_seconds,))
+
+
+def create_bucket_store(config=ADMISSION_CONFIG):
+    if config["backend"] == "sqlite":
+        return SQLiteBucketStore(config["sqlite_path"])
+    return MemoryBucketStore(config["max_keys"])
+
+
+#                   ----------- Concurrency cap -----------
+
+class ConcurrencyLimiter:
+    """At most max_concurrent holders; up to max_queue callers wait, the rest are refused."""
+
+    def __init__(self, max_concurrent=16, max_queue=200, queue_timeout=10):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """Take a slot, queueing if needed; returns (error, queued).
+
+        error is None once a slot is held, else 'queue_full' or 'queue_timeout'.
+        """
+        with self._condition:
+            if self.active < self.max_concurrent and not self.waiting:
+                self.active += 1
+                return None, False
+            if self.waiting >= self.max_queue:
+                return 'queue_full', False
+            self.waiting += 1
+            try:
+                deadline = time.monotonic() + self.queue_timeout
+                while self.active >= self.max_concurrent:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return 'queue_timeout', True
+                    self._condition.wait(remaining)
+                self.active += 1
+                return None, True
+            finally:
+                self.waiting -= 1
+
+    def release(self):
+        with self._condition:
+            self.active -= 1
+            self._condition.notify()
+
+
+#                   ----------- Admission controller -----------
+
+class AdmissionController:
+    """Per-IP and per-account token buckets plus a concurrency cap for login routes."""
+
+    def __init__(self, store, config=ADMISSION_CONFIG):
+        self.store = store
+        self.config = config
+        self.limiter = ConcurrencyLimiter(
+            config["max_concurrent"], config["max_queue"], config["queue_timeout"]
+        )
+        self._counts = {
+            "admitted": 0,
+            "queued": 0,
+            "rejected_ip": 0,
+            "rejected_account": 0,
+            "rejected_queue_full": 0,
+            "rejected_queue_timeout": 0
+        }
+        self._lock = threading.Lock()
+
+    def _count(self, name):
+        with self._lock:
+            self._counts[name] += 1
+
+    def client_ip(self):
+        if self.config["trust_proxy"]:
+            forwarded = request.headers.get('X-Forwarded-For', '')
+            if forwarded:
+                return forwarded.split(',')[0].strip()
+        return request.remote_addr or 'unknown'
+
+    def _rejected(self, reason, retry_after, status=429):
+        self._count(f"rejected_{reason}")
+        response = jsonify({"error": "Too many login attempts, please retry shortly"})
+        response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+        return response, status
+
+    def guard(self, scope, account_field='email'):
+        """Route decorator; scope separates the buckets of different login routes."""
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                config = self.config
+                allowed, retry_after = self.store.take(
+                    f"{scope}:ip:{self.client_ip()}", config["ip_rate"], config["ip_burst"]
+                )
+                if not allowed:
+                    return self._rejected('ip', retry_after)
+
+                data = request.get_json(silent=True)
+                account = str(data.get(account_field) or '').strip().lower() if isinstance(data, dict) else ''
+                if account:
+                    allowed, retry_after = self.store.take(
+                        f"{scope}:account:{account}", config["account_rate"], config["account_burst"]
+                    )
+                    if not allowed:
+                        return self._rejected('account', retry_after)
+
+                error, queued = self.limiter.acquire()
+                if queued:
+                    self._count("queued")
+                if error:
+                    return self._rejected(error, config["queue_timeout"], status=503)
+                self._count("admitted")
+                try:
+                    return view(*args, **kwargs)
+                finally:
+                    self.limiter.release()
+            return wrapper
+        return decorator
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._counts)
+        counts.update(active=self.limiter.active, waiting=self.limiter.waiting)
+        return counts
+
+
+login_admission = AdmissionController(create_bucket_store())
@@ -0,0 +1,78 @@
+"""Reference counts of study material content in the study_blobs table.
+
+One row per unique file content, keyed by its SHA-256:
+
+    CREATE TABLE study_blobs (
+        sha256       CHAR(64) PRIMARY KEY,
+        size         BIGINT NOT NULL,
+        filename     VARCHAR(255) NOT NULL,   -- name of the first upload, used for the Drive copy
+        ref_count    INT NOT NULL DEFAULT 0,  -- study_materials rows with this sha256
+        drive_status ENUM('pending', 'uploading', 'uploaded', 'failed') NOT NULL DEFAULT 'pending',
+        drive_file_id, drive_attempts, drive_error, drive_uploaded_at, created_at
+    );
+
+The file itself is stored once (services/storage.py) and copied to Google
+Drive once (services/drive.py), however many classes it is uploaded to.
+Every helper takes the caller's cursor so the count changes commit with the
+route's own writes. Blobs whose count reaches zero are removed by
+`python -m services.storage gc`.
+"""
+
+
+def add_reference(cursor, sha256, size, filename):
+    """Count one more study material for this content, creating the blob row if new.
+
+    The row stays locked until the caller commits, so a concurrent gc cannot
+    delete the file between this call and the study material insert.
+    """
+    cursor.execute("""
+        INSERT INTO study_blobs (sha256, size, filename, ref_count)
+        VALUES (%s, %s, %s, 1)
+        ON DUPLICATE KEY UPDATE ref_count = ref_count + 1
+    """, (sha256, size, filename))
+
+
+def get_blob(cursor, sha256):
+    cursor.execute("""
+        SELECT sha256, size, filename, ref_count, drive_status, drive_file_id
+        FROM study_blobs WHERE sha256 = %s
+    """, (sha256,))
+    return cursor.fetchone()
+
+
+def release_material(cursor, material_id):
+    """Drop the reference of one study material before it is deleted."""
+    cursor.execute("""
+        UPDATE study_blobs b
+        JOIN study_materials sm ON sm.sha256 = b.sha256
+        SET b.ref_count = b.ref_count - 1
+        WHERE sm.id = %s
+    """, (material_id,))
+
+
+def release_class(cursor, class_id):
+    """Drop the references of a class's study materials before the class (and they) are deleted."""
+    cursor.execute("""
+        UPDATE study_blobs b
+        JOIN (
+            SELECT sha256, COUNT(*) AS materials
+            FROM study_materials
+            WHERE class_id = %s AND sha256 IS NOT NULL
+            GROUP BY sha256
+        ) sm ON sm.sha256 = b.sha256
+        SET b.ref_count = b.ref_count - sm.materials
+    """, (class_id,))
+
+
+def recount(cursor):
+    """Recompute every ref_count from study_materials (repair)."""
+    cursor.execute("""
+        UPDATE study_blobs b
+        LEFT JOIN (
+            SELECT sha256, COUNT(*) AS materials
+            FROM study_materials
+            WHERE sha256 IS NOT NULL
+            GROUP BY sha256
+        ) sm ON sm.sha256 = b.sha256
+        SET b.ref_count = COALESCE(sm.materials, 0)
+    """)
@@ -1,5 +1,214 @@
+import threading
+import time
+import weakref
+
 import mysql.connector
-from config import DB_CONFIG
+from mysql.connector.errors import PoolError
+from config import DB_CONFIG, POOL_CONFIG
+from models.metrics import instrument_cursor, instrument_connection
+
+
+class PooledConnection:
+    """Wraps a MySQL connection so that close() hands it back to the pool and its cursors are timed.
+
+    A wrapper garbage-collected without close() (a handler that raised before
+    closing it) closes its connection and frees its pool slot.
+    """
+
+    def __init__(self, pool, raw, created_at):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+        self._closed = False
+        self._finalizer = weakref.finalize(self, pool._abandon, raw)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._finalizer.detach()
+        self._pool._release(self._raw, self._created_at)
+
+    def cursor(self, *args, **kwargs):
+        return instrument_cursor(self._raw.cursor(*args, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """Thread-safe MySQL connection pool with overflow, pre-ping and recycling."""
+
+    def __init__(self, db_config, pool_size=10, max_overflow=10, pool_timeout=30,
+                 pre_ping=True, recycle=3600):
+        self.db_config = db_config
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.pool_timeout = pool_timeout
+        self.pre_ping = pre_ping
+        self.recycle = recycle
+
+        self._idle = []          # [(raw_connection, created_at)]
+        self._total = 0          # idle + checked out
+        self._cond = threading.Condition()
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_time": 0.0,
+            "timeouts": 0,
+            "created": 0,
+            "recycled": 0,
+            "ping_failures": 0,
+            "overflow_closed": 0,
+            "abandoned": 0          # checked out and never closed
+        }
+
+    def _create(self):
+        raw = mysql.connector.connect(**self.db_config)
+        with self._cond:
+            self._stats["created"] += 1
+        return raw, time.monotonic()
+
+    def _discard(self, raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def _is_usable(self, raw, created_at):
+        """Recycle connections past their lifetime and ping the rest if enabled."""
+        if self.recycle and time.monotonic() - created_at > self.recycle:
+            with self._cond:
+                self._stats["recycled"] += 1
+            return False
+        if self.pre_ping:
+            try:
+                if not raw.is_connected():
+                    raise mysql.connector.Error("connection lost")
+            except Exception:
+                with self._cond:
+                    self._stats["ping_failures"] += 1
+                return False
+        return True
+
+    def connect(self):
+        """Check out a connection, opening one if the pool has room."""
+        started = None
+        with self._cond:
+            while True:
+                if self._idle:
+                    raw, created_at = self._idle.pop()
+                    break
+                if self._total < self.pool_size + self.max_overflow:
+                    self._total += 1
+                    raw = None
+                    break
+                if started is None:
+                    started = time.monotonic()
+                    self._stats["waits"] += 1
+                remaining = self.pool_timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    self._stats["wait_time"] += time.monotonic() - started
+                    raise PoolError("Timed out waiting for a database connection")
+                self._cond.wait(remaining)
+            if started is not None:
+                self._stats["wait_time"] += time.monotonic() - started
+            self._stats["checkouts"] += 1
+
+        try:
+            if raw is not None and not self._is_usable(raw, created_at):
+                self._discard(raw)
+                raw = None
+            if raw is None:
+                raw, created_at = self._create()
+        except Exception:
+            with self._cond:
+                self._total -= 1
+                self._cond.notify()
+            raise
+
+        return PooledConnection(self, raw, created_at)
+
+    def _release(self, raw, created_at):
+        # Drop anything a handler left uncommitted before reusing the connection
+        try:
+            raw.rollback()
+            reusable = True
+        except Exception:
+            reusable = False
+
+        with self._cond:
+            if reusable and len(self._idle) < self.pool_size:
+                self._idle.append((raw, created_at))
+                raw = None
+            else:
+                self._total -= 1
+                if reusable:
+                    self._stats["overflow_closed"] += 1
+            self._cond.notify()
+
+        if raw is not None:
+            self._discard(raw)
+
+    def _abandon(self, raw):
+        # The handler may have stopped mid-transaction, so the connection is not reused
+        with self._cond:
+            self._total -= 1
+            self._stats["abandoned"] += 1
+            self._cond.notify()
+        print("A database connection was not closed; it was discarded and its pool slot freed")
+        self._discard(raw)
+
+    def dispose(self):
+        """Close every idle connection."""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._total -= len(idle)
+            self._cond.notify_all()
+        for raw, _ in idle:
+            self._discard(raw)
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats["idle"] = len(self._idle)
+            stats["in_use"] = self._total - len(self._idle)
+            stats["overflow"] = max(0, self._total - self.pool_size)
+            stats["pool_size"] = self.pool_size
+            stats["max_overflow"] = self.max_overflow
+        stats["wait_time"] = round(stats["wait_time"], 6)
+        return stats
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process-wide pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                options = {k: v for k, v in POOL_CONFIG.items() if k != "enabled"}
+                _pool = ConnectionPool(DB_CONFIG, **options)
+    return _pool
+
+
+def get_pool_stats():
+    if not POOL_CONFIG.get("enabled", True):
+        return {"enabled": False}
+    return get_pool().stats()
+
 
 def get_db_connection():
-    return mysql.connector.connect(**DB_CONFIG)
+    if not POOL_CONFIG.get("enabled", True):
+        return instrument_connection(mysql.connector.connect(**DB_CONFIG))
+    return get_pool().connect()
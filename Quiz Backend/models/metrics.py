@@ -0,0 +1,301 @@
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import request
+
+from config import METRICS_CONFIG
+
+# Request, database and external-call metrics in the Prometheus text format,
+# served at /metrics. Values are per process: with gunicorn workers > 1 each
+# worker reports its own numbers.
+
+# Slow queries and collector failures; init_app() switches this to the app's logger
+log = logging.getLogger(__name__)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _label_text(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+#                   ----------- Metric types -----------
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_values=(), amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for label_values, value in values:
+            lines.append(f"{self.name}{_label_text(self.labels, label_values)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = sorted(buckets)
+        self._series = {}     # label values -> [per-bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, label_values, value):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((key, (list(counts), total, count))
+                            for key, (counts, total, count) in self._series.items())
+        for label_values, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _label_text(self.labels, label_values, [('le', _number(float(bound)))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _label_text(self.labels, label_values, [('le', '+Inf')])
+            lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _label_text(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {_number(round(total, 6))}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []    # (prefix, function returning a dict of numbers)
+
+    def counter(self, name, help_text, labels=()):
+        metric = Counter(name, help_text, labels)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, labels=(), buckets=()):
+        metric = Histogram(name, help_text, labels, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, prefix, collect):
+        """Export the numeric values of collect() (e.g. pool stats) as gauges named prefix_<key>."""
+        self.collectors.append((prefix, collect))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for prefix, collect in self.collectors:
+            try:
+                values = collect()
+            except Exception as e:
+                log.warning("Metrics collector %s failed: %s", prefix, e)
+                continue
+            for key, value in sorted(values.items()):
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    lines.append(f"# TYPE {prefix}_{key} gauge")
+                    lines.append(f"{prefix}_{key} {_number(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+REQUEST_SECONDS = registry.histogram(
+    'quiz_http_request_duration_seconds', "Request latency by route.",
+    ('method', 'route', 'status'), METRICS_CONFIG["latency_buckets"]
+)
+REQUEST_DB_QUERIES = registry.histogram(
+    'quiz_http_request_db_queries', "Database queries executed per request.",
+    ('route',), METRICS_CONFIG["query_count_buckets"]
+)
+REQUEST_DB_SECONDS = registry.histogram(
+    'quiz_http_request_db_seconds', "Time spent in database queries per request.",
+    ('route',), METRICS_CONFIG["latency_buckets"]
+)
+DB_QUERY_SECONDS = registry.histogram(
+    'quiz_db_query_duration_seconds', "Duration of single queries by route and statement type.",
+    ('route', 'statement'), METRICS_CONFIG["latency_buckets"]
+)
+SLOW_QUERIES = registry.counter(
+    'quiz_db_slow_queries_total', "Queries slower than METRICS_CONFIG['slow_query_ms'].", ('route',)
+)
+EXTERNAL_CALL_SECONDS = registry.histogram(
+    'quiz_external_call_duration_seconds', "Calls to Google Drive, Google Sheets and SMTP.",
+    ('service', 'operation', 'outcome'), METRICS_CONFIG["latency_buckets"]
+)
+
+
+#                   ----------- Database timing -----------
+
+# The route being served by this thread; queries outside a request
+# (sheets sync, mail dispatch, sweeps) are labelled "background".
+_current = threading.local()
+
+_WHITESPACE = re.compile(r'\s+')
+# Quoted strings and numbers written into the SQL text (e.g. built IN lists)
+_LITERALS = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|\b\d+(?:\.\d+)?\b")
+
+
+def statement_type(sql):
+    words = sql.split(None, 1) if isinstance(sql, str) else []
+    return words[0].upper() if words else 'OTHER'
+
+
+def query_shape(sql):
+    """SQL text for the log: whitespace collapsed, literals replaced by ?, truncated."""
+    text = _LITERALS.sub('?', _WHITESPACE.sub(' ', str(sql)).strip())
+    return text[:METRICS_CONFIG["slow_query_sql_length"]]
+
+
+def record_query(sql, elapsed):
+    route = getattr(_current, 'route', None)
+    if route is not None:
+        _current.queries += 1
+        _current.db_time += elapsed
+    route = route or 'background'
+    DB_QUERY_SECONDS.observe((route, statement_type(sql)), elapsed)
+
+    if elapsed * 1000 >= METRICS_CONFIG["slow_query_ms"]:
+        SLOW_QUERIES.inc((route,))
+        log.warning("Slow query (%.1f ms, %s): %s", elapsed * 1000, route, query_shape(sql))
+
+
+class InstrumentedCursor:
+    """Times execute()/executemany() and passes everything else to the real cursor."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, operation, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._cursor.execute(operation, *args, **kwargs)
+        finally:
+            record_query(operation, time.perf_counter() - started)
+
+    def executemany(self, operation, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._cursor.executemany(operation, *args, **kwargs)
+        finally:
+            record_query(operation, time.perf_counter() - started)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._cursor.close()
+
+
+class InstrumentedConnection:
+    """Connection whose cursors are timed (used when the pool is disabled)."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self._conn.cursor(*args, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def instrument_cursor(cursor):
+    return InstrumentedCursor(cursor) if METRICS_CONFIG["enabled"] else cursor
+
+
+def instrument_connection(conn):
+    return InstrumentedConnection(conn) if METRICS_CONFIG["enabled"] else conn
+
+
+#                   ----------- External calls -----------
+
+@contextmanager
+def external_call(service, operation):
+    """Time a block calling an external service: with external_call('drive', 'upload'): ..."""
+    started = time.perf_counter()
+    outcome = 'error'
+    try:
+        yield
+        outcome = 'ok'
+    finally:
+        EXTERNAL_CALL_SECONDS.observe((service, operation, outcome), time.perf_counter() - started)
+
+
+#                   ----------- Request middleware -----------
+
+def init_app(app):
+    """Record latency, query count and DB time of every request."""
+    global log
+    if not METRICS_CONFIG["enabled"]:
+        return
+    log = app.logger
+
+    @app.before_request
+    def start_request_metrics():
+        _current.started = time.perf_counter()
+        _current.route = request.url_rule.rule if request.url_rule else 'unmatched'
+        _current.queries = 0
+        _current.db_time = 0.0
+
+    @app.after_request
+    def record_request_metrics(response):
+        route = getattr(_current, 'route', None)
+        if route is None:
+            return response
+        elapsed = time.perf_counter() - _current.started
+        REQUEST_SECONDS.observe((request.method, route, str(response.status_code)), elapsed)
+        REQUEST_DB_QUERIES.observe((route,), _current.queries)
+        REQUEST_DB_SECONDS.observe((route,), _current.db_time)
+        # Visible in the browser's network panel
+        response.headers['Server-Timing'] = (
+            f"db;dur={_current.db_time * 1000:.1f};desc=\"{_current.queries} queries\", "
+            f"app;dur={elapsed * 1000:.1f}"
+        )
+        return response
+
+    @app.teardown_request
+    def end_request_metrics(exc):
+        # Runs even when the request failed before after_request, so the
+        # thread's later queries are not counted against this route
+        _current.route = None
+
+
+def render():
+    return registry.render()
@@ -0,0 +1,209 @@
+"""Cached notification feeds for students.
+
+A student's feed is the class_notifications of their class plus their own
+student_notifications, newest first. It is assembled from three caches:
+
+    student_class_cache   student id -> class id (0 without a class)
+    class_feed_cache      class id   -> newest notifications sent to the class
+    student_feed_cache    student id -> newest notifications sent to the student
+
+The send routes invalidate the feed they add to and student/class changes
+invalidate the class membership, so polling a feed that did not change is
+answered from memory without a query. Feeds keep the newest
+NOTIFICATION_CACHE_CONFIG["feed_length"] notifications; a client polling
+from further back reads the rows in between from MySQL.
+"""
+import base64
+import heapq
+import itertools
+import json
+
+from config import NOTIFICATION_CACHE_CONFIG
+from models.cache import VersionedCache
+from models.db_connection import get_db_connection
+from models.pagination import encode_cursor
+
+FEED_LENGTH = NOTIFICATION_CACHE_CONFIG["feed_length"]
+_cache_config = {key: NOTIFICATION_CACHE_CONFIG[key] for key in ("max_entries", "ttl")}
+
+student_class_cache = VersionedCache(**_cache_config)
+class_feed_cache = VersionedCache(**_cache_config)
+student_feed_cache = VersionedCache(**_cache_config)
+
+
+#                   ----------- Loaders -----------
+
+def _fetch(query, params):
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(query, params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def load_student_class(student_id):
+    """Class id of the student, 0 without a class, None if the student does not exist (not cached)."""
+    rows = _fetch("SELECT class_id FROM students WHERE id = %s", (student_id,))
+    if not rows:
+        return None
+    return rows[0]['class_id'] or 0
+
+
+def load_class_feed(class_id):
+    rows = _fetch("""
+        SELECT id, message, created_at FROM class_notifications
+        WHERE class_id = %s
+        ORDER BY created_at DESC, id DESC
+        LIMIT %s
+    """, (class_id, FEED_LENGTH))
+    return tuple(dict(row, type='class') for row in rows)
+
+
+def load_student_feed(student_id):
+    rows = _fetch("""
+        SELECT id, message, created_at FROM student_notifications
+        WHERE student_id = %s
+        ORDER BY created_at DESC, id DESC
+        LIMIT %s
+    """, (student_id, FEED_LENGTH))
+    return tuple(dict(row, type='student') for row in rows)
+
+
+def load_class_feed_after(class_id, after, limit):
+    """Class notifications with id > after, oldest first (for clients behind the cached feed)."""
+    rows = _fetch("""
+        SELECT id, message, created_at FROM class_notifications
+        WHERE class_id = %s AND id > %s
+        ORDER BY id
+        LIMIT %s
+    """, (class_id, after, limit))
+    return [dict(row, type='class') for row in rows]
+
+
+def load_student_feed_after(student_id, after, limit):
+    rows = _fetch("""
+        SELECT id, message, created_at FROM student_notifications
+        WHERE student_id = %s AND id > %s
+        ORDER BY id
+        LIMIT %s
+    """, (student_id, after, limit))
+    return [dict(row, type='student') for row in rows]
+
+
+#                   ----------- Feed -----------
+
+def parse_feed_args(args):
+    """(since, limit, paged) from the query string; raises ValueError on bad input.
+
+    since is the cursor of an earlier response (None for the whole feed);
+    paged is False when neither parameter was sent (plain list response).
+    """
+    paged = 'limit' in args or 'since' in args
+    try:
+        limit = int(args.get('limit', FEED_LENGTH))
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    if not 1 <= limit <= FEED_LENGTH:
+        raise ValueError(f"limit must be between 1 and {FEED_LENGTH}")
+
+    since = None
+    if args.get('since'):
+        try:
+            padded = args['since'] + '=' * (-len(args['since']) % 4)
+            since = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        except (ValueError, TypeError):
+            raise ValueError("Invalid since cursor")
+        if not (isinstance(since, list) and len(since) == 2 and all(isinstance(key, int) for key in since)):
+            raise ValueError("Invalid since cursor")
+    return since, limit, paged
+
+
+def _newer(feed, after, load_after, limit):
+    """Up to limit + 1 rows of a cached feed with id > after, oldest first.
+
+    A client further behind than the cached rows reach gets them from MySQL
+    (load_after), so nothing between its cursor and the cache is skipped.
+    """
+    if len(feed) == FEED_LENGTH and all(row['id'] > after for row in feed):
+        return load_after()
+    rows = [row for row in feed if row['id'] > after]
+    rows.reverse()
+    return rows[:limit + 1]
+
+
+def _feed_key(row):
+    return row['created_at'], row['id']
+
+
+def read_feed(student_id, since=None, limit=FEED_LENGTH):
+    """Notifications of the student and their class, newest first.
+
+    Returns (items, cursor, has_more); poll with cursor for what comes next.
+    Without since: the newest limit notifications, and has_more if older
+    ones were left out. With since: the oldest limit notifications after
+    the cursor, and has_more if newer ones remain (poll again right away).
+    """
+    class_id = student_class_cache.get_or_load(student_id, lambda: load_student_class(student_id))
+    own = ()
+    shared = ()
+    if class_id is not None:
+        own = student_feed_cache.get_or_load(student_id, lambda: load_student_feed(student_id))
+    if class_id:
+        shared = class_feed_cache.get_or_load(class_id, lambda: load_class_feed(class_id))
+
+    # Ids grow with every notification sent, so one per table marks what the client has seen
+    if since is None:
+        items = list(itertools.islice(heapq.merge(shared, own, key=_feed_key, reverse=True), limit + 1))
+        cursor = encode_cursor([
+            max((row['id'] for row in shared), default=0),
+            max((row['id'] for row in own), default=0)
+        ])
+        return items[:limit], cursor, len(items) > limit
+
+    shared = _newer(shared, since[0], lambda: load_class_feed_after(class_id, since[0], limit + 1), limit)
+    own = _newer(own, since[1], lambda: load_student_feed_after(student_id, since[1], limit + 1), limit)
+    items = list(itertools.islice(heapq.merge(shared, own, key=_feed_key), limit + 1))
+    has_more = len(items) > limit
+    items = items[:limit]
+    cursor = encode_cursor([
+        max((row['id'] for row in items if row['type'] == 'class'), default=since[0]),
+        max((row['id'] for row in items if row['type'] == 'student'), default=since[1])
+    ])
+    items.reverse()
+    return items, cursor, has_more
+
+
+#                   ----------- Invalidation -----------
+# Called after the change is committed
+
+def invalidate_class_feed(class_id):
+    class_feed_cache.invalidate(int(class_id))
+
+
+def invalidate_student_feed(student_id):
+    student_feed_cache.invalidate(int(student_id))
+
+
+def invalidate_student(student_id):
+    """The student's class or existence changed."""
+    student_class_cache.invalidate(int(student_id))
+    student_feed_cache.invalidate(int(student_id))
+
+
+def invalidate_class(class_id):
+    """The class was deleted: its notifications go and its students lose their class."""
+    class_feed_cache.invalidate(int(class_id))
+    student_class_cache.clear()
+
+
+def stats():
+    """Cache counters for /metrics."""
+    values = {}
+    for name, cache in (('class_feeds', class_feed_cache), ('student_feeds', student_feed_cache),
+                        ('student_classes', student_class_cache)):
+        for key, value in cache.stats().items():
+            values[f"{name}_{key}"] = value
+    return values
@@ -0,0 +1,89 @@
+import base64
+import json
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+
+class Page:
+    """Keyset pagination and field projection for list endpoints.
+
+    Query parameters:
+        limit   page size (1..MAX_LIMIT); enables pagination
+        cursor  opaque next_cursor from the previous page; enables pagination
+        fields  comma-separated subset of the endpoint's fields
+
+    Pages are ordered by a unique key (the base table's id) and continue with
+    "WHERE key > last_key", so every page costs one index range scan no matter
+    how deep it is. Without limit/cursor the endpoint keeps its full response.
+    """
+
+    def __init__(self, args, fields, descending=False):
+        self.fields = fields
+        self.descending = descending
+        self.paginated = 'limit' in args or 'cursor' in args
+
+        try:
+            self.limit = int(args.get('limit', DEFAULT_LIMIT))
+        except ValueError:
+            raise ValueError("limit must be an integer")
+        if not 1 <= self.limit <= MAX_LIMIT:
+            raise ValueError(f"limit must be between 1 and {MAX_LIMIT}")
+
+        self.after = None
+        if args.get('cursor'):
+            self.after = decode_cursor(args['cursor'])
+
+        requested = args.get('fields')
+        if requested:
+            self.selected = [name.strip() for name in requested.split(',') if name.strip()]
+            if not self.selected:
+                raise ValueError("fields must name at least one field")
+            unknown = [name for name in self.selected if name not in fields]
+            if unknown:
+                raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        else:
+            self.selected = list(fields)
+
+    def select(self, key_expr):
+        """SELECT list for the requested fields, plus the page key when paginating."""
+        columns = [f"{self.fields[name]} AS {name}" for name in self.selected]
+        if self.paginated:
+            columns.append(f"{key_expr} AS _page_key")
+        return ", ".join(columns)
+
+    def clause(self, key_expr, default_order=""):
+        """WHERE/ORDER BY/LIMIT tail of the query and its parameters."""
+        if not self.paginated:
+            return default_order, ()
+        direction = "DESC" if self.descending else "ASC"
+        if self.after is None:
+            return f"ORDER BY {key_expr} {direction} LIMIT %s", (self.limit + 1,)
+        operator = "<" if self.descending else ">"
+        return (
+            f"WHERE {key_expr} {operator} %s ORDER BY {key_expr} {direction} LIMIT %s",
+            (self.after, self.limit + 1)
+        )
+
+    def result(self, rows):
+        """Page body: the items and the cursor of the next page (None on the last page)."""
+        has_more = len(rows) > self.limit
+        rows = rows[:self.limit]
+        next_cursor = encode_cursor(rows[-1]['_page_key']) if has_more else None
+        items = [{k: v for k, v in row.items() if k != '_page_key'} for row in rows]
+        return {"items": items, "next_cursor": next_cursor}
+
+
+def encode_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(key, int):
+        raise ValueError("Invalid cursor")
+    return key
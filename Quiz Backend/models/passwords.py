@@ -0,0 +1,314 @@
+import base64
+import hashlib
+import hmac
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from config import PASSWORD_CONFIG
+
+# Stored formats:
+#   scrypt$<n>$<r>$<p>$<salt>$<hash>   salt and hash in unpadded base64
+#   $2b$<rounds>$...                   bcrypt
+#   $argon2id$v=19$m=..,t=..,p=..$...  argon2
+# Anything else verifies only on rows flagged password_legacy (plaintext from
+# before hashing was introduced); it is replaced by a hash on that login.
+
+SCRYPT_PREFIX = 'scrypt$'
+
+
+def _b64encode(data):
+    return base64.b64encode(data).decode().rstrip('=')
+
+
+def _b64decode(text):
+    return base64.b64decode(text + '=' * (-len(text) % 4))
+
+
+#                   ----------- Algorithms -----------
+
+class ScryptHasher:
+    name = 'scrypt'
+
+    def __init__(self, n=2 ** 14, r=8, p=1):
+        self.n, self.r, self.p = n, r, p
+
+    def _derive(self, password, salt, n, r, p):
+        return hashlib.scrypt(
+            password.encode(), salt=salt, n=n, r=r, p=p, dklen=32,
+            maxmem=128 * r * (n + p + 2)
+        )
+
+    def hash(self, password):
+        salt = os.urandom(16)
+        digest = self._derive(password, salt, self.n, self.r, self.p)
+        return f"{SCRYPT_PREFIX}{self.n}${self.r}${self.p}${_b64encode(salt)}${_b64encode(digest)}"
+
+    def verify(self, password, stored):
+        try:
+            _, n, r, p, salt, digest = stored.split('$')
+            expected = _b64decode(digest)
+            actual = self._derive(password, _b64decode(salt), int(n), int(r), int(p))
+        except ValueError:
+            return False
+        return hmac.compare_digest(actual, expected)
+
+    def needs_rehash(self, stored):
+        return stored.split('$')[1:4] != [str(self.n), str(self.r), str(self.p)]
+
+
+class BcryptHasher:
+    name = 'bcrypt'
+
+    def __init__(self, rounds=12):
+        import bcrypt
+        self.bcrypt = bcrypt
+        self.rounds = rounds
+
+    def hash(self, password):
+        # bcrypt only reads the first 72 bytes of a password
+        return self.bcrypt.hashpw(password.encode()[:72], self.bcrypt.gensalt(self.rounds)).decode()
+
+    def verify(self, password, stored):
+        try:
+            return self.bcrypt.checkpw(password.encode()[:72], stored.encode())
+        except ValueError:
+            return False
+
+    def needs_rehash(self, stored):
+        return stored[4:6] != f"{self.rounds:02d}"
+
+
+class Argon2Hasher:
+    name = 'argon2'
+
+    def __init__(self, time_cost=2, memory_cost=19456, parallelism=1):
+        from argon2 import PasswordHasher
+        from argon2.exceptions import InvalidHashError, VerificationError
+        self.hasher = PasswordHasher(time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism)
+        self.errors = (InvalidHashError, VerificationError)
+
+    def hash(self, password):
+        return self.hasher.hash(password)
+
+    def verify(self, password, stored):
+        try:
+            return self.hasher.verify(stored, password)
+        except self.errors:
+            return False
+
+    def needs_rehash(self, stored):
+        return self.hasher.check_needs_rehash(stored)
+
+
+HASHERS = {
+    'scrypt': ScryptHasher,
+    'bcrypt': BcryptHasher,
+    'argon2': Argon2Hasher
+}
+
+
+# Recognise every supported format, whether or not its library is installed
+FORMATS = {
+    'scrypt': lambda stored: stored.startswith(SCRYPT_PREFIX),
+    'bcrypt': lambda stored: stored[:4] in ('$2a$', '$2b$', '$2y$'),
+    'argon2': lambda stored: stored.startswith('$argon2')
+}
+
+
+#                   ----------- Password manager -----------
+
+class PasswordManager:
+    """Hashes with the configured algorithm and verifies any supported format.
+
+    Hashing and verification run on a bounded thread pool: a burst of logins
+    queues for `workers` threads instead of saturating every core. hashlib.scrypt,
+    bcrypt and argon2 all release the GIL while they hash. The Flask routes
+    call check_in_pool(), which blocks the request thread until its turn on the
+    pool is over; ADMISSION_CONFIG["max_concurrent"] bounds how many request
+    threads can be waiting there, so keep it below the server's thread count.
+
+    An unknown account is checked against a dummy hash, so a login for an
+    e-mail that does not exist takes as long as one with a wrong password.
+    """
+
+    def __init__(self, algorithm='scrypt', params=None, workers=4):
+        self.algorithm = algorithm
+        self.params = params or {}
+        self.workers = workers
+        self._hashers = {}
+        self._pool = None
+        self._dummy = None
+
+    def hasher(self, name=None):
+        name = name or self.algorithm
+        if name not in self._hashers:
+            params = self.params.get(name, {}) if name == self.algorithm else {}
+            self._hashers[name] = HASHERS[name](**params)
+        return self._hashers[name]
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='passwords')
+        return self._pool
+
+    def identify(self, stored):
+        for name, matches in FORMATS.items():
+            if matches(stored):
+                return name
+        return None
+
+    def hash(self, password):
+        return self.hasher().hash(password)
+
+    def dummy_hash(self):
+        """A hash of a random password with the current settings, for unknown accounts."""
+        if self._dummy is None:
+            self._dummy = self.hash(_b64encode(os.urandom(16)))
+        return self._dummy
+
+    def check(self, password, stored, legacy=False):
+        """(matches, new_hash): new_hash is set when the stored value should be replaced.
+
+        stored is None for an unknown account; legacy is the row's password_legacy flag.
+        """
+        if password is None:
+            return False, None
+        name = self.identify(stored) if stored else None
+        if name is None:
+            if stored and legacy and hmac.compare_digest(password.encode(), stored.encode()):
+                return True, self.hash(password)
+            # Unknown account or unrecognised value: spend the time of a real verify
+            self.hasher().verify(password, self.dummy_hash())
+            return False, None
+        hasher = self.hasher(name)
+        if not hasher.verify(password, stored):
+            return False, None
+        if name != self.algorithm or hasher.needs_rehash(stored):
+            return True, self.hash(password)
+        return True, None
+
+    def hash_async(self, password):
+        return self.pool.submit(self.hash, password)
+
+    def check_async(self, password, stored, legacy=False):
+        return self.pool.submit(self.check, password, stored, legacy)
+
+    def check_in_pool(self, password, stored, legacy=False):
+        """check() on the hashing pool; blocks the calling thread until it is done."""
+        return self.check_async(password, stored, legacy).result()
+
+    def hash_many(self, passwords):
+        """Hash a list of passwords in parallel, preserving order (bulk import)."""
+        return list(self.pool.map(self.hash, passwords))
+
+
+password_manager = PasswordManager(
+    algorithm=PASSWORD_CONFIG["algorithm"],
+    params=PASSWORD_CONFIG,
+    workers=PASSWORD_CONFIG["workers"]
+)
+
+
+def hash_password(password):
+    return password_manager.hash_async(password).result()
+
+
+def check_password(password, stored, legacy=False):
+    return password_manager.check_in_pool(password, stored, legacy)
+
+
+#                   ----------- Command line -----------
+
+BENCHMARK_SETTINGS = [
+    ('scrypt', {'n': 2 ** 13, 'r': 8, 'p': 1}),
+    ('scrypt', {'n': 2 ** 14, 'r': 8, 'p': 1}),
+    ('scrypt', {'n': 2 ** 15, 'r': 8, 'p': 1}),
+    ('scrypt', {'n': 2 ** 17, 'r': 8, 'p': 1}),
+    ('bcrypt', {'rounds': 10}),
+    ('bcrypt', {'rounds': 12}),
+    ('bcrypt', {'rounds': 14}),
+    ('argon2', {'time_cost': 1, 'memory_cost': 47104, 'parallelism': 1}),
+    ('argon2', {'time_cost': 2, 'memory_cost': 19456, 'parallelism': 1}),
+    ('argon2', {'time_cost': 3, 'memory_cost': 65536, 'parallelism': 1})
+]
+
+
+def benchmark(seconds=2.0, workers=None):
+    """Logins/sec per core (one thread) and on a pool of `workers` threads, per cost setting."""
+    import time
+
+    workers = workers or os.cpu_count() or 1
+    results = []
+    for name, params in BENCHMARK_SETTINGS:
+        try:
+            hasher = HASHERS[name](**params)
+        except ImportError:
+            print(f"{name:7} {params}: library not installed, skipped")
+            continue
+        stored = hasher.hash('correct horse battery staple')
+
+        count, started = 0, time.perf_counter()
+        while time.perf_counter() - started < seconds:
+            hasher.verify('correct horse battery staple', stored)
+            count += 1
+        per_core = count / (time.perf_counter() - started)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            batch = max(workers * 2, int(per_core * seconds))
+            started = time.perf_counter()
+            list(pool.map(lambda _: hasher.verify('correct horse battery staple', stored), range(batch)))
+            pooled = batch / (time.perf_counter() - started)
+
+        print(f"{name:7} {params}: {1000 / per_core:8.1f} ms/verify  "
+              f"{per_core:8.1f} logins/s per core  {pooled:8.1f} logins/s on {workers} threads")
+        results.append((name, params, per_core, pooled))
+    return results
+
+
+def hash_existing_passwords(batch_size=500):
+    """Replace every password flagged password_legacy with a hash (students and admins)."""
+    from models.db_connection import get_db_connection
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        for table in ('students', 'admins'):
+            updated, last_id = 0, 0
+            while True:
+                cursor.execute(
+                    f"SELECT id, password FROM {table} WHERE id > %s AND password_legacy = 1 ORDER BY id LIMIT %s",
+                    (last_id, batch_size)
+                )
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                plaintext = [(row_id, password) for row_id, password in rows
+                             if password and password_manager.identify(password) is None]
+                hashes = password_manager.hash_many([password for _, password in plaintext])
+                cursor.executemany(
+                    f"UPDATE {table} SET password = %s, password_legacy = 0 WHERE id = %s",
+                    [(hashed, row_id) for (row_id, _), hashed in zip(plaintext, hashes)]
+                )
+                conn.commit()
+                updated += len(plaintext)
+            print(f"{table}: hashed {updated} plaintext passwords")
+    finally:
+        cursor.close()
+        conn.close()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Password hashing tools.")
+    parser.add_argument('command', choices=['benchmark', 'hash-existing'])
+    parser.add_argument('--seconds', type=float, default=2.0, help="benchmark time per setting")
+    parser.add_argument('--workers', type=int, help="benchmark pool size (default: CPU count)")
+    args = parser.parse_args()
+
+    if args.command == 'benchmark':
+        benchmark(args.seconds, args.workers)
+    else:
+        hash_existing_passwords()
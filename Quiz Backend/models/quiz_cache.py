@@ -0,0 +1,122 @@
+import hashlib
+import json
+from collections import namedtuple
+
+from config import QUIZ_CACHE_CONFIG
+from models.cache import VersionedCache
+from models.db_connection import get_db_connection
+from models.scoring import AnswerKey
+
+
+# Serialized response body for get_quiz_questions and its strong ETag
+QuizPayload = namedtuple('QuizPayload', ['body', 'etag'])
+
+quiz_content_cache = VersionedCache(**QUIZ_CACHE_CONFIG)
+answer_key_cache = VersionedCache(**QUIZ_CACHE_CONFIG)
+
+
+def load_quiz_payload(quiz_id):
+    """Query the questions and options of a quiz and serialize them once."""
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        query = """
+            SELECT q.id AS question_id, q.question AS question_text, 
+                   o.id AS option_id, o.option_text, o.is_correct 
+            FROM quiz_questions q
+            JOIN quiz_options o ON q.id = o.question_id
+            WHERE q.quiz_id = %s
+        """
+        cursor.execute(query, (quiz_id,))
+        data = cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+
+    # Group questions with their options
+    questions = {}
+    for row in data:
+        question_id = row['question_id']
+        if question_id not in questions:
+            questions[question_id] = {
+                "question_id": question_id,
+                "question_text": row['question_text'],
+                "options": []
+            }
+        questions[question_id]['options'].append({
+            "option_id": row['option_id'],
+            "option_text": row['option_text'],
+            "is_correct": row['is_correct']  # Used for result calculation
+        })
+
+    body = json.dumps(list(questions.values()), separators=(',', ':'), default=str).encode('utf-8')
+    return QuizPayload(body, hashlib.sha256(body).hexdigest()[:32])
+
+
+def get_quiz_payload(quiz_id):
+    return quiz_content_cache.get_or_load(quiz_id, lambda: load_quiz_payload(quiz_id))
+
+
+def load_answer_key(quiz_id, cursor):
+    cursor.execute("""
+        SELECT q.id AS question_id, o.id AS correct_option_id
+        FROM quiz_questions q
+        JOIN quiz_options o ON q.id = o.question_id
+        WHERE o.is_correct = 1 AND q.quiz_id = %s
+    """, (quiz_id,))
+    return AnswerKey.from_rows(cursor.fetchall())
+
+
+def load_quiz_version(quiz_id, cursor):
+    """quizzes.content_version, bumped by triggers on every question and option change."""
+    cursor.execute("SELECT content_version FROM quizzes WHERE id = %s", (quiz_id,))
+    row = cursor.fetchone()
+    if not row:
+        return None
+    return row['content_version'] if isinstance(row, dict) else row[0]
+
+
+def get_answer_key(quiz_id, cursor=None, version=None):
+    """Return the AnswerKey for a quiz, from the cache if it is still current.
+
+    Entries are kept with the quiz's content_version and reloaded when the
+    database has a newer one, so a key changed through another server process
+    is never graded against. Pass the version if it was already read (the
+    submit route selects it with its eligibility check); otherwise it is read
+    here. Pass the caller's dictionary cursor to avoid opening another connection.
+    """
+    if cursor is None:
+        conn = get_db_connection()
+        own_cursor = conn.cursor(dictionary=True)
+        try:
+            return get_answer_key(quiz_id, own_cursor, version)
+        finally:
+            own_cursor.close()
+            conn.close()
+
+    if version is None:
+        version = load_quiz_version(quiz_id, cursor)
+    cached = answer_key_cache.get(quiz_id)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    # The version was read before the key, so a key stored here is never older than its version
+    cache_version = answer_key_cache.version(quiz_id)
+    answer_key = load_answer_key(quiz_id, cursor)
+    answer_key_cache.set(quiz_id, (version, answer_key), cache_version)
+    return answer_key
+
+
+def invalidate_quiz(quiz_id):
+    """Drop cached content and answer key for a quiz after its questions or options change."""
+    if quiz_id is not None:
+        quiz_content_cache.invalidate(int(quiz_id))
+        answer_key_cache.invalidate(int(quiz_id))
+
+
+def quiz_id_for_question(cursor, question_id):
+    cursor.execute("SELECT quiz_id FROM quiz_questions WHERE id = %s", (question_id,))
+    row = cursor.fetchone()
+    if not row:
+        return None
+    return row['quiz_id'] if isinstance(row, dict) else row[0]
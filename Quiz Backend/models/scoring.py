@@ -0,0 +1,85 @@
+import sys
+from array import array
+from operator import eq
+
+# Marks a question with no (or an unreadable) answer in an encoded submission
+UNANSWERED = -1
+
+
+class AnswerKey:
+    """Correct options of a quiz laid out as an array in question-id order.
+
+    Submissions are encoded into arrays aligned with the same positions, so
+    grading is a single element-wise comparison instead of per-answer dict
+    lookups and int() conversions.
+    """
+
+    def __init__(self, correct_answers):
+        # correct_answers: {question_id: correct_option_id}
+        self.question_ids = tuple(sorted(int(q_id) for q_id in correct_answers))
+        self.positions = {q_id: i for i, q_id in enumerate(self.question_ids)}
+        correct = {int(q_id): int(opt_id) for q_id, opt_id in correct_answers.items()}
+        self.correct = array('q', (correct[q_id] for q_id in self.question_ids))
+
+    def __len__(self):
+        return len(self.question_ids)
+
+    @classmethod
+    def from_rows(cls, rows):
+        return cls({row['question_id']: row['correct_option_id'] for row in rows})
+
+    def encode(self, answers):
+        """Convert {question_id: selected_option_id} into an aligned array."""
+        encoded = array('q', [UNANSWERED]) * len(self.question_ids)
+        for q_id, opt_id in answers.items():
+            try:
+                position = self.positions.get(int(q_id))
+                if position is not None:
+                    encoded[position] = int(opt_id)
+            except (TypeError, ValueError):
+                continue
+        return encoded
+
+    def score(self, answers):
+        """Grade one submission, given as a dict or an already encoded array."""
+        if not isinstance(answers, array):
+            answers = self.encode(answers)
+        return sum(map(eq, self.correct, answers))
+
+    def score_many(self, submissions):
+        """Grade a batch of submissions, e.g. every attempt of a quiz on re-grade."""
+        correct = self.correct
+        scores = []
+        for answers in submissions:
+            if not isinstance(answers, array):
+                answers = self.encode(answers)
+            scores.append(sum(map(eq, correct, answers)))
+        return scores
+
+
+# Per-attempt answers are stored in quiz_results.answers as packed
+# (question_id, option_id) pairs of unsigned 32-bit ints, little-endian:
+#   ALTER TABLE quiz_results ADD COLUMN answers BLOB NULL;
+
+def pack_answers(answers):
+    """Pack {question_id: option_id} into 8 bytes per answer; invalid pairs are dropped."""
+    pairs = array('I')
+    for q_id, opt_id in answers.items():
+        try:
+            q_id, opt_id = int(q_id), int(opt_id)
+        except (TypeError, ValueError):
+            continue
+        if 0 <= q_id < 2 ** 32 and 0 <= opt_id < 2 ** 32:
+            pairs.extend((q_id, opt_id))
+    if sys.byteorder != 'little':
+        pairs.byteswap()
+    return pairs.tobytes()
+
+
+def unpack_answers(data):
+    """Inverse of pack_answers."""
+    pairs = array('I')
+    pairs.frombytes(bytes(data or b''))
+    if sys.byteorder != 'little':
+        pairs.byteswap()
+    return dict(zip(pairs[0::2], pairs[1::2]))
@@ -0,0 +1,346 @@
+import functools
+import threading
+import time
+import uuid
+
+from flask import g, jsonify, request
+
+from config import SESSION_CONFIG
+from models.cache import VersionedCache
+from models.db_connection import get_db_connection
+
+
+#                   ----------- Backends -----------
+
+class MySQLSessionBackend:
+    """Sessions in a MySQL table with (user column, session_token, expires_at).
+
+    Expiry is computed by the database clock, so app servers with skewed
+    clocks still agree on when a session ends.
+    """
+
+    def __init__(self, table, user_column, connection_factory=get_db_connection):
+        self.table = table
+        self.user_column = user_column
+        self.connection_factory = connection_factory
+
+    def _execute(self, query, params=(), fetch=False, cursor=None):
+        if cursor is not None:
+            # The caller's cursor: the write commits with the caller's transaction
+            cursor.execute(query, params)
+            return cursor.fetchone() if fetch else cursor.rowcount
+        conn = self.connection_factory()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(query, params)
+            if fetch:
+                return cursor.fetchone()
+            conn.commit()
+            return cursor.rowcount
+        finally:
+            cursor.close()
+            conn.close()
+
+    def create(self, user_id, ttl, cursor=None):
+        token = str(uuid.uuid4())
+        self._execute(
+            f"INSERT INTO {self.table} ({self.user_column}, session_token, expires_at) "
+            f"VALUES (%s, %s, NOW() + INTERVAL %s SECOND)",
+            (user_id, token, ttl), cursor=cursor
+        )
+        return token
+
+    def lookup(self, token):
+        """(user_id, seconds until expiry) of a live session, or None."""
+        row = self._execute(
+            f"SELECT {self.user_column}, TIMESTAMPDIFF(SECOND, NOW(), expires_at) "
+            f"FROM {self.table} WHERE session_token = %s AND expires_at > NOW()",
+            (token,), fetch=True
+        )
+        return (row[0], row[1]) if row else None
+
+    def has_active(self, user_id, cursor=None):
+        row = self._execute(
+            f"SELECT 1 FROM {self.table} WHERE {self.user_column} = %s AND expires_at > NOW() LIMIT 1",
+            (user_id,), fetch=True, cursor=cursor
+        )
+        return row is not None
+
+    def delete(self, token):
+        return self._execute(f"DELETE FROM {self.table} WHERE session_token = %s", (token,))
+
+    def delete_user(self, user_id):
+        return self._execute(f"DELETE FROM {self.table} WHERE {self.user_column} = %s", (user_id,))
+
+    def sweep(self, batch_size=1000):
+        """Delete expired sessions in batches, so the sweep never holds long locks."""
+        deleted = 0
+        while True:
+            count = self._execute(
+                f"DELETE FROM {self.table} WHERE expires_at <= NOW() LIMIT %s", (batch_size,)
+            )
+            deleted += count
+            if count < batch_size:
+                return deleted
+
+
+class MemorySessionBackend:
+    """Stand-in for the sessions tables: keeps sessions in this process only."""
+
+    def __init__(self):
+        self._sessions = {}     # token -> (user_id, expires_at)
+        self._lock = threading.Lock()
+
+    def create(self, user_id, ttl, cursor=None):
+        token = str(uuid.uuid4())
+        with self._lock:
+            self._sessions[token] = (user_id, time.time() + ttl)
+        return token
+
+    def lookup(self, token):
+        with self._lock:
+            session = self._sessions.get(token)
+        if session is None or session[1] <= time.time():
+            return None
+        return session[0], session[1] - time.time()
+
+    def has_active(self, user_id, cursor=None):
+        now = time.time()
+        with self._lock:
+            return any(uid == user_id and expires > now for uid, expires in self._sessions.values())
+
+    def delete(self, token):
+        with self._lock:
+            return 1 if self._sessions.pop(token, None) else 0
+
+    def delete_user(self, user_id):
+        with self._lock:
+            tokens = [token for token, (uid, _) in self._sessions.items() if uid == user_id]
+            for token in tokens:
+                del self._sessions[token]
+        return len(tokens)
+
+    def sweep(self, batch_size=1000):
+        now = time.time()
+        with self._lock:
+            expired = [token for token, (_, expires) in self._sessions.items() if expires <= now]
+            for token in expired:
+                del self._sessions[token]
+        return len(expired)
+
+
+def create_session_backend(table, user_column, config=SESSION_CONFIG):
+    if config["backend"] == "memory":
+        return MemorySessionBackend()
+    return MySQLSessionBackend(table, user_column)
+
+
+#                   ----------- Store -----------
+
+class SessionStore:
+    """Session tokens for one kind of user, with an LRU/TTL cache in front of the backend.
+
+    validate() answers from the cache while the entry is younger than
+    cache_ttl and the session has not expired; only misses reach the
+    backend. A logout invalidates the token here at once, and in other
+    processes when their cache entry ages out.
+    """
+
+    def __init__(self, backend, ttl=12 * 3600, cache_entries=10000, cache_ttl=30):
+        self.backend = backend
+        self.ttl = ttl
+        self.cache = VersionedCache(max_entries=cache_entries, ttl=cache_ttl)
+
+    def create(self, user_id, cursor=None):
+        """New session token for user_id.
+
+        With cursor (a route's own connection) the insert is not committed and
+        the token is not cached: the caller commits, then calls remember().
+        """
+        token = self.backend.create(user_id, self.ttl, cursor=cursor)
+        if cursor is None:
+            self.remember(token, user_id)
+        return token
+
+    def remember(self, token, user_id):
+        self.cache.set(token, (user_id, time.monotonic() + self.ttl))
+
+    def validate(self, token):
+        """User id for a live token, or None."""
+        if not token:
+            return None
+        entry = self.cache.get(token)
+        if entry is None:
+            version = self.cache.version(token)
+            session = self.backend.lookup(token)
+            if session is None:
+                return None
+            user_id, remaining = session
+            entry = (user_id, time.monotonic() + remaining)
+            self.cache.set(token, entry, version)
+        user_id, expires_at = entry
+        if time.monotonic() >= expires_at:
+            self.cache.invalidate(token)
+            return None
+        return user_id
+
+    def has_active(self, user_id, cursor=None):
+        return self.backend.has_active(user_id, cursor=cursor)
+
+    def revoke(self, token):
+        self.cache.invalidate(token)
+        return self.backend.delete(token)
+
+    def revoke_user(self, user_id):
+        # Tokens are cached by value, so drop the whole cache rather than scan it
+        self.cache.clear()
+        return self.backend.delete_user(user_id)
+
+    def sweep(self):
+        return self.backend.sweep()
+
+
+def _create_store(table, user_column):
+    return SessionStore(
+        create_session_backend(table, user_column),
+        ttl=SESSION_CONFIG["ttl"],
+        cache_entries=SESSION_CONFIG["cache_entries"],
+        cache_ttl=SESSION_CONFIG["cache_ttl"]
+    )
+
+
+student_sessions = _create_store("sessions", "student_id")
+admin_sessions = _create_store("admin_sessions", "admin_id")
+
+SESSION_STORES = {"student": student_sessions, "admin": admin_sessions}
+
+
+#                   ----------- Sweeper -----------
+
+class SessionSweeper:
+    """Background thread that deletes expired sessions every interval seconds."""
+
+    def __init__(self, stores, interval=600):
+        self.stores = stores
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        if not self.interval:
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name='session-sweeper', daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def run_once(self):
+        return {name: store.sweep() for name, store in self.stores.items()}
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                deleted = self.run_once()
+                if any(deleted.values()):
+                    print(f"Swept expired sessions: {deleted}")
+            except Exception as e:
+                print(f"Session sweep failed, will retry: {e}")
+
+
+session_sweeper = SessionSweeper(SESSION_STORES, interval=SESSION_CONFIG["sweep_interval"])
+
+
+#                   ----------- Request checks -----------
+
+def request_token():
+    """Session token from 'Authorization: Bearer <token>' or the X-Session-Token header."""
+    header = request.headers.get('Authorization', '')
+    if header[:7].lower() == 'bearer ':
+        return header[7:].strip()
+    return request.headers.get('X-Session-Token')
+
+
+def check_session(role, enforce=None, owner_arg=None):
+    """Validate the request's token for role; returns an error response or None.
+
+    On success the user id is stored as g.<role>_id. With owner_arg, a URL
+    argument of that name (e.g. <student_id>) must be the session's own user.
+    """
+    if enforce is None:
+        enforce = SESSION_CONFIG["enforce"]
+    token = request_token()
+    if not token:
+        if enforce:
+            return jsonify({"error": "Session token is required"}), 401
+        return None
+    user_id = SESSION_STORES[role].validate(token)
+    if user_id is None:
+        return jsonify({"error": "Invalid or expired session"}), 401
+    setattr(g, f"{role}_id", user_id)
+    if owner_arg and owner_arg in (request.view_args or {}):
+        return check_owner(role, request.view_args[owner_arg])
+    return None
+
+
+def check_any_session(roles, enforce=None):
+    """check_session for routes open to several roles: the first role the token is valid for wins."""
+    if enforce is None:
+        enforce = SESSION_CONFIG["enforce"]
+    token = request_token()
+    if not token:
+        if enforce:
+            return jsonify({"error": "Session token is required"}), 401
+        return None
+    for role in roles:
+        user_id = SESSION_STORES[role].validate(token)
+        if user_id is not None:
+            setattr(g, f"{role}_id", user_id)
+            return None
+    return jsonify({"error": "Invalid or expired session"}), 401
+
+
+def check_owner(role, user_id):
+    """403 response if the request's session belongs to another user than user_id, else None.
+
+    Requests without a session (only possible with "enforce" off) are not checked.
+    """
+    session_user = g.get(f"{role}_id")
+    if session_user is not None and str(session_user) != str(user_id):
+        return jsonify({"error": "This session belongs to another user"}), 403
+    return None
+
+
+def session_required(role):
+    """Route decorator: reject the request unless it carries a live token for role."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            error = check_session(role, enforce=True)
+            if error:
+                return error
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def protect_blueprint(blueprint, role, exempt=(), owner_arg=None):
+    """Run check_session for every route of blueprint except the exempt endpoints."""
+    exempt = {f"{blueprint.name}.{name}" for name in exempt}
+
+    @blueprint.before_request
+    def _check_session():
+        if request.method == 'OPTIONS' or request.endpoint in exempt:
+            return None
+        return check_session(role, owner_arg=owner_arg)
+
+
+if __name__ == '__main__':
+    # Sweep from cron instead of the in-process thread: python -m models.sessions
+    print(f"Deleted expired sessions: {session_sweeper.run_once()}")
@@ -0,0 +1,72 @@
+"""Storing a student's quiz submission (the submit route, and benchmark.py's submit comparison).
+
+One SELECT returns the attempt limit, the answer key version, the attempts so
+far and whether the quiz is visible to the student; the answer key comes from
+models/quiz_cache.py. The attempt number is allocated and the limit
+re-checked in the INSERT itself; with the unique key on (student_id, quiz_id,
+attempt_number) a concurrent double submit fails with 1062 (or 1213) and is
+retried instead of producing two rows with the same attempt number.
+"""
+from collections import namedtuple
+
+from models.quiz_cache import get_answer_key
+from models.scoring import pack_answers
+
+# Attempts to store a submission that collides with a concurrent one
+SUBMIT_RETRIES = 3
+
+# status: 'stored', 'not_found', 'not_assigned' or 'limit_reached'
+SubmitResult = namedtuple('SubmitResult', ['status', 'score', 'feedback', 'attempt_limit'])
+
+
+def submit_attempt(conn, cursor, student_id, quiz_id, answers):
+    """Grade and store one attempt on the caller's connection and dictionary cursor; commits."""
+    cursor.execute("""
+        SELECT
+            q.attempt_limit,
+            q.content_version,
+            (SELECT COUNT(*) FROM quiz_results qr
+             WHERE qr.student_id = %s AND qr.quiz_id = q.id) AS attempt_count,
+            EXISTS (SELECT 1 FROM student_quiz_visibility v
+                    WHERE v.student_id = %s AND v.quiz_id = q.id) AS is_assigned
+        FROM quizzes q
+        WHERE q.id = %s
+    """, (student_id, student_id, quiz_id))
+    eligibility = cursor.fetchone()
+
+    if not eligibility:
+        return SubmitResult('not_found', None, None, None)
+
+    attempt_limit = eligibility['attempt_limit']
+    if eligibility['attempt_count'] >= attempt_limit:
+        return SubmitResult('limit_reached', None, None, attempt_limit)
+    if not eligibility['is_assigned']:
+        return SubmitResult('not_assigned', None, None, attempt_limit)
+
+    # Score against the cached answer key, reloaded if the quiz changed since it was cached
+    answer_key = get_answer_key(quiz_id, cursor, eligibility['content_version'])
+    score = answer_key.score(answers)
+    feedback = f"Your score is {score}/{len(answer_key)}."
+    packed_answers = pack_answers(answers)
+
+    for retry in range(SUBMIT_RETRIES):
+        try:
+            cursor.execute("""
+                INSERT INTO quiz_results (student_id, quiz_id, attempt_number, score, feedback, answers)
+                SELECT %s, %s, COALESCE(MAX(attempt_number), 0) + 1, %s, %s, %s
+                FROM quiz_results
+                WHERE student_id = %s AND quiz_id = %s
+                HAVING COUNT(*) < %s
+            """, (student_id, quiz_id, score, feedback, packed_answers,
+                  student_id, quiz_id, attempt_limit))
+            inserted = cursor.rowcount
+            conn.commit()
+            break
+        except Exception as e:
+            conn.rollback()
+            if not e.args or e.args[0] not in (1062, 1213) or retry == SUBMIT_RETRIES - 1:
+                raise
+
+    if not inserted:
+        return SubmitResult('limit_reached', None, None, attempt_limit)
+    return SubmitResult('stored', score, feedback, attempt_limit)
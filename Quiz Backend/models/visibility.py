@@ -0,0 +1,169 @@
+"""Maintenance of the student_quiz_visibility table.
+
+One row per (student, quiz) the student can see, with a flag per reason:
+
+    CREATE TABLE student_quiz_visibility (
+        student_id  INT NOT NULL,
+        quiz_id     INT NOT NULL,
+        via_student TINYINT(1) NOT NULL DEFAULT 0,  -- quiz_student_assignments
+        via_class   TINYINT(1) NOT NULL DEFAULT 0,  -- quiz_class_assignments for the student's class
+        PRIMARY KEY (student_id, quiz_id),
+        KEY idx_visibility_quiz (quiz_id)
+    );
+
+"Which quizzes can student X see" is then a primary-key range scan instead of
+the quizzes/assignments/students LEFT JOIN with an OR predicate. Every helper
+takes the caller's cursor so the change commits with the route's own writes.
+"""
+
+
+def _prune(cursor, where, params):
+    cursor.execute(
+        f"DELETE FROM student_quiz_visibility WHERE via_student = 0 AND via_class = 0 AND {where}",
+        params
+    )
+
+
+def grant_student(cursor, quiz_id, student_id):
+    cursor.execute("""
+        INSERT INTO student_quiz_visibility (student_id, quiz_id, via_student)
+        VALUES (%s, %s, 1)
+        ON DUPLICATE KEY UPDATE via_student = 1
+    """, (student_id, quiz_id))
+
+
+def grant_students(cursor, quiz_id, student_ids):
+    """grant_student for many students in one statement."""
+    if not student_ids:
+        return
+    placeholders = ', '.join(['%s'] * len(student_ids))
+    cursor.execute(f"""
+        INSERT INTO student_quiz_visibility (student_id, quiz_id, via_student)
+        SELECT s.id, %s, 1 FROM students s WHERE s.id IN ({placeholders})
+        ON DUPLICATE KEY UPDATE via_student = 1
+    """, [quiz_id, *student_ids])
+
+
+def revoke_student(cursor, quiz_id, student_id):
+    cursor.execute(
+        "UPDATE student_quiz_visibility SET via_student = 0 WHERE student_id = %s AND quiz_id = %s",
+        (student_id, quiz_id)
+    )
+    _prune(cursor, "student_id = %s AND quiz_id = %s", (student_id, quiz_id))
+
+
+def grant_class(cursor, quiz_id, class_id):
+    cursor.execute("""
+        INSERT INTO student_quiz_visibility (student_id, quiz_id, via_class)
+        SELECT s.id, %s, 1 FROM students s WHERE s.class_id = %s
+        ON DUPLICATE KEY UPDATE via_class = 1
+    """, (quiz_id, class_id))
+
+
+def grant_classes(cursor, quiz_id, class_ids):
+    """grant_class for many classes in one statement."""
+    if not class_ids:
+        return
+    placeholders = ', '.join(['%s'] * len(class_ids))
+    cursor.execute(f"""
+        INSERT INTO student_quiz_visibility (student_id, quiz_id, via_class)
+        SELECT s.id, %s, 1 FROM students s WHERE s.class_id IN ({placeholders})
+        ON DUPLICATE KEY UPDATE via_class = 1
+    """, [quiz_id, *class_ids])
+
+
+def revoke_class(cursor, quiz_id, class_id):
+    cursor.execute("""
+        UPDATE student_quiz_visibility v
+        JOIN students s ON s.id = v.student_id
+        SET v.via_class = 0
+        WHERE v.quiz_id = %s AND s.class_id = %s
+    """, (quiz_id, class_id))
+    _prune(cursor, "quiz_id = %s", (quiz_id,))
+
+
+def refresh_student(cursor, student_id):
+    """Recompute a student's class-based rows, e.g. after their class changed."""
+    cursor.execute(
+        "UPDATE student_quiz_visibility SET via_class = 0 WHERE student_id = %s",
+        (student_id,)
+    )
+    cursor.execute("""
+        INSERT INTO student_quiz_visibility (student_id, quiz_id, via_class)
+        SELECT s.id, qca.quiz_id, 1
+        FROM students s
+        JOIN quiz_class_assignments qca ON qca.class_id = s.class_id
+        WHERE s.id = %s
+        ON DUPLICATE KEY UPDATE via_class = 1
+    """, (student_id,))
+    _prune(cursor, "student_id = %s", (student_id,))
+
+
+def add_students(cursor, emails):
+    """Class-based rows for newly inserted students, identified by email (bulk import)."""
+    if not emails:
+        return
+    placeholders = ', '.join(['%s'] * len(emails))
+    cursor.execute(f"""
+        INSERT INTO student_quiz_visibility (student_id, quiz_id, via_class)
+        SELECT s.id, qca.quiz_id, 1
+        FROM students s
+        JOIN quiz_class_assignments qca ON qca.class_id = s.class_id
+        WHERE s.email IN ({placeholders})
+        ON DUPLICATE KEY UPDATE via_class = 1
+    """, list(emails))
+
+
+def remove_class(cursor, class_id):
+    """Drop class-based rows of a class's students before the class is deleted."""
+    cursor.execute("""
+        UPDATE student_quiz_visibility v
+        JOIN students s ON s.id = v.student_id
+        SET v.via_class = 0
+        WHERE s.class_id = %s
+    """, (class_id,))
+    cursor.execute("""
+        DELETE v FROM student_quiz_visibility v
+        JOIN students s ON s.id = v.student_id
+        WHERE s.class_id = %s AND v.via_student = 0 AND v.via_class = 0
+    """, (class_id,))
+
+
+def remove_student(cursor, student_id):
+    cursor.execute("DELETE FROM student_quiz_visibility WHERE student_id = %s", (student_id,))
+
+
+def remove_quiz(cursor, quiz_id):
+    cursor.execute("DELETE FROM student_quiz_visibility WHERE quiz_id = %s", (quiz_id,))
+
+
+def rebuild(cursor):
+    """Rebuild the whole table from the assignment tables (backfill or repair)."""
+    cursor.execute("DELETE FROM student_quiz_visibility")
+    cursor.execute("""
+        INSERT INTO student_quiz_visibility (student_id, quiz_id, via_student)
+        SELECT student_id, quiz_id, 1 FROM quiz_student_assignments
+        ON DUPLICATE KEY UPDATE via_student = 1
+    """)
+    cursor.execute("""
+        INSERT INTO student_quiz_visibility (student_id, quiz_id, via_class)
+        SELECT s.id, qca.quiz_id, 1
+        FROM quiz_class_assignments qca
+        JOIN students s ON s.class_id = qca.class_id
+        ON DUPLICATE KEY UPDATE via_class = 1
+    """)
+
+
+if __name__ == '__main__':
+    # Backfill after creating the table: python -m models.visibility
+    from models.db_connection import get_db_connection
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        rebuild(cursor)
+        conn.commit()
+        print("student_quiz_visibility rebuilt.")
+    finally:
+        cursor.close()
+        conn.close()
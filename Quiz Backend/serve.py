@@ -0,0 +1,60 @@
+import argparse
+
+from config import SERVER_CONFIG
+
+
+def serve_waitress(config):
+    from waitress import serve
+    from wsgi import app, start_background_workers
+
+    start_background_workers()
+    print(f"Serving on http://{config['host']}:{config['port']} with waitress, {config['threads']} threads")
+    serve(
+        app,
+        host=config['host'],
+        port=config['port'],
+        threads=config['threads'],
+        connection_limit=config['connection_limit'],
+        backlog=config['backlog']
+    )
+
+
+def serve_gunicorn(config):
+    from gunicorn.app.base import BaseApplication
+
+    class GunicornApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f"{config['host']}:{config['port']}")
+            self.cfg.set('workers', config['workers'])
+            self.cfg.set('threads', config['threads'])
+            self.cfg.set('worker_class', 'gthread')
+            self.cfg.set('backlog', config['backlog'])
+            self.cfg.set('timeout', config['timeout'])
+
+        def load(self):
+            # Loaded in each worker after the fork, so every process gets its own pool and background threads
+            from wsgi import app, start_background_workers
+            start_background_workers()
+            return app
+
+    GunicornApplication().run()
+
+
+SERVERS = {
+    'waitress': serve_waitress,
+    'gunicorn': serve_gunicorn
+}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run the API with a production WSGI server.")
+    parser.add_argument('--server', choices=sorted(SERVERS), help="overrides SERVER_CONFIG['server']")
+    parser.add_argument('--host')
+    parser.add_argument('--port', type=int)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--threads', type=int)
+    args = parser.parse_args()
+
+    config = dict(SERVER_CONFIG)
+    config.update({key: value for key, value in vars(args).items() if value is not None})
+    SERVERS[config['server']](config)
@@ -0,0 +1,356 @@
+import os
+import queue
+import shutil
+import threading
+import uuid
+
+from config import DRIVE_CONFIG
+from models.db_connection import get_db_connection
+from models.metrics import external_call
+from services.storage import blob_store
+
+
+#                   ----------- Drive clients -----------
+
+class GoogleDriveClient:
+    """Uploads files into one Google Drive folder with resumable uploads.
+
+    The service account credentials are loaded once. Each worker thread builds
+    its Drive service once and keeps it, since httplib2 is not thread-safe.
+    """
+
+    def __init__(self, service_account_file, folder_id, chunk_size=8 * 1024 * 1024):
+        self.service_account_file = service_account_file
+        self.folder_id = folder_id
+        self.chunk_size = chunk_size
+        self._credentials = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _service(self):
+        service = getattr(self._local, 'service', None)
+        if service is None:
+            from googleapiclient.discovery import build
+            from google.oauth2.service_account import Credentials
+
+            with self._lock, external_call('drive', 'authorize'):
+                if self._credentials is None:
+                    self._credentials = Credentials.from_service_account_file(
+                        self.service_account_file,
+                        scopes=['https://www.googleapis.com/auth/drive']
+                    )
+                service = build('drive', 'v3', credentials=self._credentials, cache_discovery=False)
+            self._local.service = service
+        return service
+
+    def upload(self, path, name):
+        """Upload the file at path as name; returns the Drive file id."""
+        from googleapiclient.http import MediaFileUpload
+
+        service = self._service()
+        media = MediaFileUpload(path, resumable=True, chunksize=self.chunk_size)
+        request = service.files().create(
+            body={'name': name, 'parents': [self.folder_id]}, media_body=media, fields='id'
+        )
+        with external_call('drive', 'upload'):
+            response = None
+            while response is None:
+                _, response = request.next_chunk()
+        return response['id']
+
+    def delete(self, file_id):
+        service = self._service()
+        with external_call('drive', 'delete'):
+            service.files().delete(fileId=file_id).execute()
+
+    def link(self, file_id):
+        return f"https://drive.google.com/file/d/{file_id}/view"
+
+
+class LocalDriveClient:
+    """Stand-in for Google Drive: copies files into a local folder."""
+
+    def __init__(self, path):
+        self.path = path
+        self.files = {}     # file id -> stored path
+        os.makedirs(path, exist_ok=True)
+
+    def upload(self, path, name):
+        file_id = uuid.uuid4().hex
+        stored = os.path.join(self.path, f"{file_id}_{name}")
+        shutil.copyfile(path, stored)
+        self.files[file_id] = stored
+        return file_id
+
+    def delete(self, file_id):
+        stored = self.files.pop(file_id, None)
+        if stored and os.path.exists(stored):
+            os.remove(stored)
+
+    def link(self, file_id):
+        # Nothing to link to; materials keep their local download URL
+        return None
+
+
+def create_drive_client(config=DRIVE_CONFIG):
+    if config["backend"] == "local":
+        return LocalDriveClient(config["local_path"])
+    return GoogleDriveClient(config["service_account_file"], config["folder_id"], config["chunk_size"])
+
+
+#                   ----------- Upload state -----------
+
+def get_upload_status(cursor, material_id):
+    """Drive copy state of one study material's content, or None if it does not exist.
+
+    Materials from before content-addressed storage have no blob; their fields are null.
+    """
+    cursor.execute("""
+        SELECT sm.id AS material_id, sm.title, b.size AS file_size, sm.sha256, b.ref_count,
+               b.drive_status AS status, b.drive_attempts AS attempts, b.drive_error AS error,
+               b.drive_file_id AS file_drive_id, b.drive_uploaded_at
+        FROM study_materials sm
+        LEFT JOIN study_blobs b ON b.sha256 = sm.sha256
+        WHERE sm.id = %s
+    """, (material_id,))
+    return cursor.fetchone()
+
+
+#                   ----------- Upload worker -----------
+
+class DriveUploadWorker:
+    """Copies study material content to Google Drive from background threads.
+
+    Work is per blob (unique SHA-256), so content uploaded to several classes
+    is sent once. The upload route only stores the file and calls enqueue().
+    State lives in study_blobs.drive_status, so the admin can poll it, failed
+    uploads are retried with exponential backoff, and unfinished ones resume
+    after a restart.
+
+    Each server process runs a worker. A blob being copied is claimed
+    (drive_claimed_by/at); other processes only take it over once the claim
+    is older than claim_timeout, and a worker that lost its claim deletes
+    its own Drive copy instead of recording it. Every check_interval seconds,
+    blobs whose claim expired (the process died, possibly before this one
+    started) are queued again.
+    """
+
+    def __init__(self, client_factory=create_drive_client, workers=1, max_attempts=5, backoff=5.0,
+                 claim_timeout=3600, check_interval=300):
+        self.client_factory = client_factory
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.claim_timeout = claim_timeout
+        self.check_interval = check_interval
+        self._client = None
+        self._resumed = False
+        self._stop = threading.Event()
+        self._queue = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                self._client = self.client_factory()
+            return self._client
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f'drive-upload-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            if self.check_interval:
+                thread = threading.Thread(target=self._check_claims, name='drive-claim-check', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        try:
+            self.resume()
+        except Exception as e:
+            print(f"Could not resume pending Drive uploads: {e}")
+
+    def stop(self):
+        """Stop checking for expired claims (queued uploads still run)."""
+        self._stop.set()
+
+    def resume(self):
+        """Queue every blob whose Drive copy has not finished (e.g. after a restart)."""
+        self.release_expired()
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT sha256 FROM study_blobs WHERE drive_status = 'pending' ORDER BY created_at")
+            for (sha256,) in cursor.fetchall():
+                self._queue.put(sha256)
+        finally:
+            cursor.close()
+            conn.close()
+        self._resumed = True
+
+    def release_expired(self):
+        """Hand uploads claimed longer than claim_timeout ago back to 'pending'; returns their sha256s.
+
+        An upload whose process died starts again from the beginning; uploads
+        claimed more recently may still be running in another process.
+        """
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                SELECT sha256 FROM study_blobs
+                WHERE drive_status = 'uploading'
+                  AND (drive_claimed_at IS NULL OR drive_claimed_at < NOW() - INTERVAL %s SECOND)
+                FOR UPDATE
+            """, (self.claim_timeout,))
+            released = [sha256 for (sha256,) in cursor.fetchall()]
+            if released:
+                placeholders = ', '.join(['%s'] * len(released))
+                cursor.execute(f"""
+                    UPDATE study_blobs
+                    SET drive_status = 'pending', drive_claimed_by = NULL, drive_claimed_at = NULL
+                    WHERE sha256 IN ({placeholders})
+                """, released)
+            conn.commit()
+        finally:
+            cursor.close()
+            conn.close()
+        return released
+
+    def _check_claims(self):
+        # A resume that failed at start (MySQL down) is retried here. After that only the
+        # released blobs are queued: other pending blobs may be waiting out their backoff
+        while not self._stop.wait(self.check_interval):
+            try:
+                if not self._resumed:
+                    self.resume()
+                    continue
+                for sha256 in self.release_expired():
+                    print(f"Drive upload of blob {sha256} is started again, its claim expired")
+                    self._queue.put(sha256)
+            except Exception as e:
+                print(f"Checking for expired Drive claims failed, will retry: {e}")
+
+    def enqueue(self, sha256):
+        """Queue a committed blob for upload; returns immediately (no-op once it is uploaded)."""
+        if not self._threads:
+            self.start()
+        else:
+            self._queue.put(sha256)
+
+    def link(self, file_id):
+        """Link stored in study_materials.file_path for a Drive copy, or None to keep the local one."""
+        return self.client.link(file_id)
+
+    def _run(self):
+        while True:
+            sha256 = self._queue.get()
+            try:
+                self.upload(sha256)
+            except Exception as e:
+                print(f"Drive upload of blob {sha256} failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _claim(self, sha256):
+        """Mark the blob as uploading by this call; returns (filename, attempts, claim) or None."""
+        claim = uuid.uuid4().hex
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                UPDATE study_blobs
+                SET drive_status = 'uploading', drive_claimed_by = %s, drive_claimed_at = NOW()
+                WHERE sha256 = %s AND drive_status = 'pending'
+            """, (claim, sha256))
+            if cursor.rowcount != 1:
+                conn.rollback()
+                return None
+            cursor.execute("SELECT filename, drive_attempts FROM study_blobs WHERE sha256 = %s", (sha256,))
+            filename, attempts = cursor.fetchone()
+            conn.commit()
+            return filename, attempts, claim
+        finally:
+            cursor.close()
+            conn.close()
+
+    def upload(self, sha256):
+        """Upload one blob now (worker threads call this); returns the Drive file id or None."""
+        claimed = self._claim(sha256)
+        if claimed is None:
+            return None
+        filename, attempts, claim = claimed
+
+        # No database connection is held while the file is uploading
+        file_id, error = None, None
+        try:
+            file_id = self.client.upload(blob_store.path(sha256), filename)
+        except Exception as e:
+            error = str(e)
+        if not file_id:
+            # Retried like a failed upload, so the claim is released either way
+            error = error or "Drive returned no file id"
+
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            if file_id:
+                cursor.execute("""
+                    UPDATE study_blobs
+                    SET drive_status = 'uploaded', drive_file_id = %s, drive_attempts = drive_attempts + 1,
+                        drive_error = NULL, drive_uploaded_at = NOW(), drive_claimed_by = NULL, drive_claimed_at = NULL
+                    WHERE sha256 = %s AND drive_claimed_by = %s
+                """, (file_id, sha256, claim))
+                lost = cursor.rowcount != 1
+                if not lost:
+                    # Every material with this content gets the one Drive copy
+                    cursor.execute("""
+                        UPDATE study_materials
+                        SET file_drive_id = %s, file_path = COALESCE(%s, file_path)
+                        WHERE sha256 = %s
+                    """, (file_id, self.link(file_id), sha256))
+            else:
+                exhausted = attempts + 1 >= self.max_attempts
+                cursor.execute("""
+                    UPDATE study_blobs
+                    SET drive_status = %s, drive_attempts = drive_attempts + 1, drive_error = %s,
+                        drive_claimed_by = NULL, drive_claimed_at = NULL
+                    WHERE sha256 = %s AND drive_claimed_by = %s
+                """, ('failed' if exhausted else 'pending', error[:500], sha256, claim))
+                lost = cursor.rowcount != 1
+            conn.commit()
+        finally:
+            cursor.close()
+            conn.close()
+
+        if lost:
+            # The claim timed out and another process took the blob over (or it was deleted)
+            print(f"Drive upload of blob {sha256} was taken over by another process")
+            if file_id:
+                try:
+                    self.client.delete(file_id)
+                except Exception as e:
+                    print(f"Could not delete duplicate Drive file {file_id}: {e}")
+            return None
+        if file_id:
+            print(f"Copied blob {sha256} ({filename}) to Google Drive, file ID: {file_id}")
+        elif not exhausted:
+            delay = self.backoff * (2 ** attempts)
+            print(f"Drive upload of blob {sha256} failed ({error}), retrying in {delay:.1f}s")
+            timer = threading.Timer(delay, self._queue.put, args=(sha256,))
+            timer.daemon = True
+            timer.start()
+        return file_id
+
+
+drive_uploader = DriveUploadWorker(
+    workers=DRIVE_CONFIG["workers"],
+    max_attempts=DRIVE_CONFIG["max_attempts"],
+    backoff=DRIVE_CONFIG["backoff"],
+    claim_timeout=DRIVE_CONFIG["claim_timeout"],
+    check_interval=DRIVE_CONFIG["check_interval"]
+)
@@ -0,0 +1,302 @@
+import csv
+import io
+import json
+import re
+import zipfile
+import posixpath
+from xml.etree.ElementTree import iterparse, parse
+
+# Readers turn an uploaded file into an iterable of (row_number, dict) pairs,
+# keyed by normalised header names, so an import can validate and insert
+# rows in one pass. row_number is the line/row a user sees in their file.
+
+IMPORT_FORMATS = ('csv', 'xlsx', 'json')
+
+_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+_DOC_REL = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id'
+
+
+def normalise_header(name):
+    return re.sub(r'\s+', '_', str(name or '').strip().lower())
+
+
+def _clean(value):
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    value = str(value).strip()
+    return value or None
+
+
+def detect_format(filename, requested=None):
+    """Import format from an explicit ?format= or the file extension; None if unsupported."""
+    fmt = (requested or posixpath.splitext(filename or '')[1].lstrip('.')).lower()
+    if fmt in ('ndjson', 'jsonl'):
+        fmt = 'json'
+    return fmt if fmt in IMPORT_FORMATS else None
+
+
+def read_csv(stream):
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    reader = csv.reader(text)
+    header = next(reader, None)
+    if header is None:
+        return
+    keys = [normalise_header(h) for h in header]
+    for row in reader:
+        if not any(cell.strip() for cell in row):
+            continue
+        yield reader.line_num, {key: _clean(value) for key, value in zip(keys, row)}
+
+
+def read_json(stream):
+    """A JSON array of objects (parsed whole) or NDJSON, one object per line (streamed)."""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig')
+    first = text.read(1)
+    while first and first.isspace():
+        first = text.read(1)
+    if not first:
+        return
+
+    if first == '[':
+        rows = json.loads(first + text.read())
+        for number, row in enumerate(rows, start=1):
+            yield number, _json_row(row)
+        return
+
+    line = first + text.readline()
+    number = 1
+    while line:
+        if line.strip():
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield number, _json_row(row)
+        line = text.readline()
+        number += 1
+
+
+def _json_row(row):
+    if not isinstance(row, dict):
+        return None
+    return {normalise_header(key): _clean(value) for key, value in row.items()}
+
+
+#                   ----------- XLSX -----------
+
+def _column_index(ref):
+    index = 0
+    for char in ref:
+        if not char.isalpha():
+            break
+        index = index * 26 + ord(char.upper()) - 64
+    return index - 1
+
+
+def _first_sheet(workbook):
+    """Path of the first worksheet, following workbook.xml and its relationships."""
+    try:
+        sheet = parse(workbook.open('xl/workbook.xml')).getroot().find(f'{_NS}sheets/{_NS}sheet')
+        rels = parse(workbook.open('xl/_rels/workbook.xml.rels')).getroot()
+        for rel in rels.iter(f'{_REL_NS}Relationship'):
+            if rel.get('Id') == sheet.get(_DOC_REL):
+                target = rel.get('Target')
+                return target.lstrip('/') if target.startswith('/') else posixpath.normpath('xl/' + target)
+    except (KeyError, AttributeError):
+        pass
+    return 'xl/worksheets/sheet1.xml'
+
+
+def _shared_strings(workbook):
+    try:
+        source = workbook.open('xl/sharedStrings.xml')
+    except KeyError:
+        return []
+    strings = []
+    for _, element in iterparse(source):
+        if element.tag == f'{_NS}si':
+            strings.append(''.join(t.text or '' for t in element.iter(f'{_NS}t')))
+            element.clear()
+    return strings
+
+
+def _cell_value(cell, strings):
+    kind = cell.get('t')
+    if kind == 'inlineStr':
+        return ''.join(t.text or '' for t in cell.iter(f'{_NS}t'))
+    value = cell.findtext(f'{_NS}v')
+    if value is None:
+        return None
+    if kind == 's':
+        return strings[int(value)]
+    if kind in ('str', 'e'):
+        return value
+    if kind == 'b':
+        return value == '1'
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def read_xlsx(stream):
+    """Rows of the first worksheet; the sheet XML is parsed incrementally."""
+    with zipfile.ZipFile(stream) as workbook:
+        strings = _shared_strings(workbook)
+        keys = None
+        counter = 0
+        for _, element in iterparse(workbook.open(_first_sheet(workbook))):
+            if element.tag != f'{_NS}row':
+                continue
+            counter += 1
+            values = {}
+            for position, cell in enumerate(element.iter(f'{_NS}c')):
+                ref = cell.get('r')
+                values[_column_index(ref) if ref else position] = _cell_value(cell, strings)
+            number = int(element.get('r') or counter)
+            element.clear()
+
+            if keys is None:
+                keys = {index: normalise_header(value) for index, value in values.items()}
+                continue
+            row = {key: _clean(values.get(index)) for index, key in keys.items()}
+            if any(value is not None for value in row.values()):
+                yield number, row
+
+
+READERS = {
+    'csv': read_csv,
+    'xlsx': read_xlsx,
+    'json': read_json
+}
+
+
+#                   ----------- Quiz documents -----------
+
+# A quiz document is {"title", "description", "attempt_limit", "questions":
+# [{"question": text, "options": [{"option_text": text, "is_correct": bool}]}]}.
+# GIFT files and question/option tables (CSV, XLSX, JSON rows) are converted
+# into its "questions" list.
+
+QUIZ_IMPORT_FORMATS = ('json', 'gift', 'csv', 'xlsx')
+
+_TRUE_VALUES = {'1', 'true', 'yes', 'y', 'x', 'correct'}
+
+
+def detect_quiz_format(filename, requested=None):
+    fmt = (requested or posixpath.splitext(filename or '')[1].lstrip('.')).lower()
+    if fmt == 'txt':
+        fmt = 'gift'
+    return fmt if fmt in QUIZ_IMPORT_FORMATS else None
+
+
+def questions_from_rows(rows):
+    """Group (question, option, is_correct) rows, one option per row, into questions."""
+    questions = {}
+    for number, row in rows:
+        row = row or {}
+        text = row.get('question') or row.get('question_text')
+        option = row.get('option') or row.get('option_text')
+        if not text or not option:
+            raise ValueError(f"Row {number}: question and option are required")
+        question = questions.setdefault(text, {"question": text, "options": []})
+        question['options'].append({
+            "option_text": option,
+            "is_correct": (row.get('is_correct') or row.get('correct') or '').lower() in _TRUE_VALUES
+        })
+    return list(questions.values())
+
+
+def _gift_tokens(text):
+    """Split text on unescaped GIFT control characters; yields (marker, raw) pairs."""
+    marker, current, escaped = None, [], False
+    for char in text:
+        if escaped:
+            current.append('\\' + char)
+            escaped = False
+        elif char == '\\':
+            escaped = True
+        elif char in '=~':
+            if marker is not None or ''.join(current).strip():
+                yield marker, ''.join(current)
+            marker, current = char, []
+        else:
+            current.append(char)
+    yield marker, ''.join(current)
+
+
+def _gift_unescape(text):
+    return re.sub(r'\\(.)', lambda m: '\n' if m.group(1) == 'n' else m.group(1), text).strip()
+
+
+def _gift_strip(text):
+    """Drop unescaped '#' feedback from an answer."""
+    return re.split(r'(?<!\\)#', text, maxsplit=1)[0]
+
+
+def _gift_question(block, start_line):
+    braces = [m.start() for m in re.finditer(r'(?<!\\)[{}]', block)]
+    if len(braces) != 2 or block[braces[0]] != '{' or block[braces[1]] != '}':
+        raise ValueError(f"Line {start_line}: expected exactly one {{...}} answer block")
+    before, answers, after = block[:braces[0]], block[braces[0] + 1:braces[1]], block[braces[1] + 1:]
+
+    before = re.sub(r'^\s*::.*?(?<!\\)::', '', before, count=1, flags=re.S)
+    before = re.sub(r'^\s*\[(html|moodle|plain|markdown)\]', '', before)
+    text = _gift_unescape(before)
+    if _gift_unescape(after):
+        text = f"{text} _____ {_gift_unescape(after)}"
+
+    answers = answers.strip()
+    if answers.upper() in ('T', 'TRUE', 'F', 'FALSE'):
+        correct = answers.upper().startswith('T')
+        return {"question": text, "options": [
+            {"option_text": "True", "is_correct": correct},
+            {"option_text": "False", "is_correct": not correct}
+        ]}
+    if answers.startswith('#') or '->' in answers:
+        raise ValueError(f"Line {start_line}: only multiple-choice and true/false GIFT questions are supported")
+
+    options = []
+    for marker, raw in _gift_tokens(answers):
+        if marker is None:
+            raise ValueError(f"Line {start_line}: answers must start with '=' or '~'")
+        raw = _gift_strip(raw)
+        weight = re.match(r'\s*%(-?[\d.]+)%', raw)
+        if weight:
+            raw = raw[weight.end():]
+        correct = marker == '=' or (weight is not None and float(weight.group(1)) >= 100)
+        options.append({"option_text": _gift_unescape(raw), "is_correct": correct})
+    return {"question": text, "options": options}
+
+
+def parse_gift(stream):
+    """Questions of a GIFT (Moodle) file; blank lines separate questions."""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig').read()
+    questions, block, start_line = [], [], 1
+    for number, line in enumerate(text.splitlines() + [''], start=1):
+        stripped = line.strip()
+        if stripped.startswith('//') or stripped.startswith('$CATEGORY'):
+            continue
+        if stripped:
+            if not block:
+                start_line = number
+            block.append(line)
+        elif block:
+            questions.append(_gift_question('\n'.join(block), start_line))
+            block = []
+    return questions
+
+
+def read_quiz_document(stream, fmt):
+    """Quiz document from an uploaded file; tables and GIFT only provide questions."""
+    if fmt == 'json':
+        document = json.load(io.TextIOWrapper(stream, encoding='utf-8-sig'))
+        if not isinstance(document, dict):
+            raise ValueError("JSON quiz document must be an object")
+        return document
+    if fmt == 'gift':
+        return {"questions": parse_gift(stream)}
+    return {"questions": questions_from_rows(READERS[fmt](stream))}
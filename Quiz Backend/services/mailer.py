@@ -0,0 +1,293 @@
+import queue
+import threading
+import uuid
+
+from flask import current_app
+from flask_mail import Message
+
+from config import MAIL_DISPATCH_CONFIG
+from models.db_connection import get_db_connection
+from models.metrics import external_call
+
+
+EMAIL_BODY = "Dear {name},\n\n{message}\n\nBest regards,\nAdmin Team"
+
+
+def create_mail_job(cursor, subject, message, recipients, created_by=None):
+    """Record an e-mail job and one pending delivery per (name, email) recipient.
+
+    Uses the caller's cursor so the job commits together with the notification;
+    call mail_dispatcher.dispatch(job_id) after the commit.
+    """
+    cursor.execute(
+        "INSERT INTO email_jobs (subject, message, created_by) VALUES (%s, %s, %s)",
+        (subject, message, created_by)
+    )
+    job_id = cursor.lastrowid
+    cursor.executemany(
+        "INSERT INTO email_deliveries (job_id, name, email) VALUES (%s, %s, %s)",
+        [(job_id, name, email) for name, email in recipients]
+    )
+    return job_id
+
+
+def get_mail_job(cursor, job_id):
+    """Job details with per-recipient delivery status, or None if it does not exist."""
+    cursor.execute("SELECT id AS job_id, subject, created_at FROM email_jobs WHERE id = %s", (job_id,))
+    job = cursor.fetchone()
+    if not job:
+        return None
+    cursor.execute("""
+        SELECT email, name, status, attempts, last_error, sent_at
+        FROM email_deliveries
+        WHERE job_id = %s
+        ORDER BY id
+    """, (job_id,))
+    deliveries = cursor.fetchall()
+    counts = {"pending": 0, "sending": 0, "sent": 0, "failed": 0}
+    for delivery in deliveries:
+        counts[delivery['status']] += 1
+    job['counts'] = counts
+    job['status'] = 'in_progress' if counts['pending'] or counts['sending'] else 'completed'
+    job['deliveries'] = deliveries
+    return job
+
+
+class MailDispatcher:
+    """Sends notification e-mails from background threads.
+
+    Jobs are split into batches; each batch is sent over a single SMTP
+    connection and at most `workers` batches are in flight at once. Delivery
+    state lives in email_deliveries, so failed recipients are retried with
+    exponential backoff and unfinished jobs resume after a restart.
+
+    Every server process runs a dispatcher and resumes the same pending jobs,
+    so a batch is claimed ('sending', claimed_by) with a conditional UPDATE
+    before SMTP is contacted; only the process that claimed a row sends it.
+    Every check_interval seconds, batches whose claim expired (the process
+    died mid-send, possibly before this one started) are sent again.
+    """
+
+    def __init__(self, workers=4, batch_size=50, max_attempts=5, backoff=2.0, claim_timeout=600,
+                 check_interval=60):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.claim_timeout = claim_timeout
+        self.check_interval = check_interval
+        self.app = None
+        self._resumed = False
+        self._stop = threading.Event()
+        self._queue = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['mail_dispatcher'] = self
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f'mail-dispatch-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            if self.check_interval:
+                thread = threading.Thread(target=self._check_claims, name='mail-claim-check', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        try:
+            self.resume()
+        except Exception as e:
+            print(f"Could not resume pending e-mail jobs: {e}")
+
+    def stop(self):
+        """Stop checking for expired claims (queued batches are still sent)."""
+        self._stop.set()
+
+    def resume(self):
+        """Queue every job that still has pending deliveries (e.g. after a restart).
+
+        Batches claimed longer than claim_timeout ago belong to a process that
+        died mid-send; they are handed back to 'pending' first.
+        """
+        self.release_expired()
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT DISTINCT job_id FROM email_deliveries WHERE status = 'pending'")
+            for (job_id,) in cursor.fetchall():
+                self._queue.put((job_id, None))
+        finally:
+            cursor.close()
+            conn.close()
+        self._resumed = True
+
+    def release_expired(self):
+        """Hand deliveries claimed longer than claim_timeout ago back to 'pending'; returns {job_id: [ids]}."""
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                SELECT id, job_id FROM email_deliveries
+                WHERE status = 'sending' AND claimed_at < NOW() - INTERVAL %s SECOND
+                FOR UPDATE
+            """, (self.claim_timeout,))
+            rows = cursor.fetchall()
+            if rows:
+                placeholders = ', '.join(['%s'] * len(rows))
+                cursor.execute(f"""
+                    UPDATE email_deliveries
+                    SET status = 'pending', claimed_by = NULL, claimed_at = NULL
+                    WHERE id IN ({placeholders})
+                """, [delivery_id for delivery_id, _ in rows])
+            conn.commit()
+        finally:
+            cursor.close()
+            conn.close()
+        released = {}
+        for delivery_id, job_id in rows:
+            released.setdefault(job_id, []).append(delivery_id)
+        return released
+
+    def _check_claims(self):
+        # A resume that failed at start (MySQL down) is retried here. After that only the
+        # released rows are queued: other pending rows may be waiting out their backoff
+        while not self._stop.wait(self.check_interval):
+            try:
+                if not self._resumed:
+                    self.resume()
+                    continue
+                for job_id, ids in self.release_expired().items():
+                    print(f"Sending {len(ids)} e-mails of job {job_id} again, their claim expired")
+                    for start in range(0, len(ids), self.batch_size):
+                        self._queue.put((job_id, ids[start:start + self.batch_size]))
+            except Exception as e:
+                print(f"Checking for expired e-mail claims failed, will retry: {e}")
+
+    def dispatch(self, job_id):
+        """Queue a committed job; returns immediately."""
+        if not self._threads:
+            self.start()
+        else:
+            self._queue.put((job_id, None))
+
+    def _run(self):
+        while True:
+            job_id, delivery_ids = self._queue.get()
+            try:
+                with self.app.app_context():
+                    if delivery_ids is None:
+                        self._split(job_id)
+                    else:
+                        self._send_batch(job_id, delivery_ids)
+            except Exception as e:
+                print(f"Mail dispatch for job {job_id} failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _split(self, job_id):
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "SELECT id FROM email_deliveries WHERE job_id = %s AND status = 'pending' ORDER BY id",
+                (job_id,)
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+            conn.close()
+        for start in range(0, len(ids), self.batch_size):
+            self._queue.put((job_id, ids[start:start + self.batch_size]))
+
+    def _claim(self, cursor, delivery_ids):
+        """Mark the still-pending deliveries of a batch as sent by this call; returns the claim id."""
+        claim = uuid.uuid4().hex
+        placeholders = ', '.join(['%s'] * len(delivery_ids))
+        cursor.execute(f"""
+            UPDATE email_deliveries
+            SET status = 'sending', claimed_by = %s, claimed_at = NOW()
+            WHERE id IN ({placeholders}) AND status = 'pending'
+        """, [claim] + list(delivery_ids))
+        return claim
+
+    def _send_batch(self, job_id, delivery_ids):
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        try:
+            # Committed before SMTP is contacted: another process resuming this job skips these rows
+            claim = self._claim(cursor, delivery_ids)
+            conn.commit()
+            placeholders = ', '.join(['%s'] * len(delivery_ids))
+            cursor.execute(f"""
+                SELECT d.id, d.name, d.email, d.attempts, j.subject, j.message
+                FROM email_deliveries d
+                JOIN email_jobs j ON j.id = d.job_id
+                WHERE d.id IN ({placeholders}) AND d.claimed_by = %s
+            """, list(delivery_ids) + [claim])
+            deliveries = cursor.fetchall()
+            if not deliveries:
+                return
+
+            sent, failures = [], []
+            try:
+                # One SMTP session for the whole batch
+                with external_call('smtp', 'session'), current_app.extensions['mail'].connect() as smtp:
+                    for delivery in deliveries:
+                        try:
+                            with external_call('smtp', 'send'):
+                                smtp.send(self._message(delivery))
+                            sent.append(delivery['id'])
+                        except Exception as e:
+                            failures.append((delivery, str(e)))
+            except Exception as e:
+                # Connecting (or closing) failed: retry whatever was not sent
+                failures = [(d, str(e)) for d in deliveries if d['id'] not in sent]
+
+            if sent:
+                placeholders = ', '.join(['%s'] * len(sent))
+                cursor.execute(f"""
+                    UPDATE email_deliveries
+                    SET status = 'sent', attempts = attempts + 1, sent_at = NOW(), last_error = NULL,
+                        claimed_by = NULL, claimed_at = NULL
+                    WHERE id IN ({placeholders})
+                """, sent)
+
+            retry_ids = []
+            for delivery, error in failures:
+                exhausted = delivery['attempts'] + 1 >= self.max_attempts
+                cursor.execute("""
+                    UPDATE email_deliveries
+                    SET status = %s, attempts = attempts + 1, last_error = %s, claimed_by = NULL, claimed_at = NULL
+                    WHERE id = %s
+                """, ('failed' if exhausted else 'pending', error[:500], delivery['id']))
+                if not exhausted:
+                    retry_ids.append(delivery['id'])
+            conn.commit()
+        finally:
+            cursor.close()
+            conn.close()
+
+        if retry_ids:
+            attempt = min(d['attempts'] for d, _ in failures if d['id'] in retry_ids) + 1
+            delay = self.backoff * (2 ** (attempt - 1))
+            print(f"Retrying {len(retry_ids)} e-mails of job {job_id} in {delay:.1f}s")
+            timer = threading.Timer(delay, self._queue.put, args=((job_id, retry_ids),))
+            timer.daemon = True
+            timer.start()
+
+    def _message(self, delivery):
+        msg = Message(
+            delivery['subject'],
+            sender=current_app.config['MAIL_USERNAME'],
+            recipients=[delivery['email']]
+        )
+        msg.body = EMAIL_BODY.format(name=delivery['name'], message=delivery['message'])
+        return msg
+
+
+mail_dispatcher = MailDispatcher(**MAIL_DISPATCH_CONFIG)
@@ -0,0 +1,301 @@
+import csv
+import os
+import threading
+import time
+import uuid
+
+from config import SHEETS_CONFIG
+from models.db_connection import get_db_connection
+from models.metrics import external_call
+
+
+#                   ----------- Sheets clients -----------
+
+class GoogleSheetsClient:
+    """Appends rows to the first worksheet of the configured spreadsheet."""
+
+    def __init__(self, service_account_file=None, spreadsheet_id=None, sheet=None):
+        self.service_account_file = service_account_file
+        self.spreadsheet_id = spreadsheet_id
+        self._sheet = sheet
+
+    @property
+    def sheet(self):
+        # Authorize once and keep the worksheet handle for every later batch
+        if self._sheet is None:
+            import gspread
+            from google.oauth2.service_account import Credentials
+
+            with external_call('sheets', 'authorize'):
+                credentials = Credentials.from_service_account_file(
+                    self.service_account_file,
+                    scopes=['https://www.googleapis.com/auth/spreadsheets']
+                )
+                self._sheet = gspread.authorize(credentials).open_by_key(self.spreadsheet_id).sheet1
+        return self._sheet
+
+    def append_rows(self, rows):
+        sheet = self.sheet
+        with external_call('sheets', 'append_rows'):
+            sheet.append_rows(rows, value_input_option='RAW')
+
+    def synced_ids(self):
+        """Return the quiz_summary ids already in the sheet (column A)."""
+        sheet = self.sheet
+        with external_call('sheets', 'col_values'):
+            values = sheet.col_values(1)
+        return _parse_ids(values)
+
+
+class LocalSheetsClient:
+    """Stand-in for Google Sheets: keeps rows in memory and optionally in a CSV file."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.rows = []
+        if path and os.path.exists(path):
+            with open(path, newline='') as f:
+                self.rows = [row for row in csv.reader(f)]
+
+    def append_rows(self, rows):
+        rows = [list(row) for row in rows]
+        if self.path:
+            with open(self.path, 'a', newline='') as f:
+                csv.writer(f).writerows(rows)
+        self.rows.extend(rows)
+
+    def synced_ids(self):
+        return _parse_ids(row[0] for row in self.rows if row)
+
+
+def _parse_ids(values):
+    # Skips the header cell and anything else that is not a row id
+    ids = set()
+    for value in values:
+        try:
+            ids.add(int(value))
+        except (TypeError, ValueError):
+            pass
+    return ids
+
+
+def create_sheets_client(config=SHEETS_CONFIG):
+    if config.get("backend") == "local":
+        return LocalSheetsClient(config.get("local_path"))
+    return GoogleSheetsClient(config["service_account_file"], config["spreadsheet_id"])
+
+
+#                   ----------- Sync -----------
+
+def summary_row_values(row):
+    """Convert a quiz_summary row to the column layout used in the sheet."""
+    inserted_at = row['inserted_at'].strftime('%Y-%m-%d %H:%M:%S') if row['inserted_at'] else None
+    return [
+        row['id'], row['student_name'], row['quiz_title'],
+        row['score'], row['attempt_number'], row['feedback'], inserted_at
+    ]
+
+
+def _append_with_retry(client, rows, synced_ids, max_retries, backoff):
+    """Append rows not yet in the sheet, retrying with exponential backoff.
+
+    After a failed call the sheet is re-read, since the append may have landed
+    even though the request errored; only rows still missing are resent. A
+    failed re-read counts as a failed attempt, and nothing is resent until
+    a re-read succeeds.
+    """
+    attempt = 0
+    reread = False
+    while True:
+        try:
+            if reread:
+                synced_ids.update(client.synced_ids())
+                reread = False
+            pending = [row for row in rows if row['id'] not in synced_ids]
+            if not pending:
+                return
+            client.append_rows([summary_row_values(row) for row in pending])
+            synced_ids.update(row['id'] for row in pending)
+            return
+        except Exception as e:
+            attempt += 1
+            if attempt >= max_retries:
+                raise
+            delay = backoff * (2 ** (attempt - 1))
+            print(f"Appending to Google Sheets failed ({e}), retrying in {delay:.1f}s...")
+            time.sleep(delay)
+            reread = True
+
+
+def sync_pending_rows(client, batch_size=500, max_retries=5, backoff=1.0,
+                      connection_factory=get_db_connection, claim_timeout=600):
+    """Push unsynced quiz_summary rows to the sheet and mark them synced.
+
+    quiz_summary.synced_to_google is the durable queue: rows stay pending until
+    the sheet accepted them, so nothing is lost if the process stops. Rows are
+    sent in id order, batch_size rows per append_rows call and per UPDATE.
+
+    sheets_sync_state.appending_through records the last id of a batch until it
+    is marked synced. Only a sweep that finds it set over pending rows (the last
+    append failed, or its process stopped) reads the sheet's ids, so rows that
+    are already there are marked synced instead of being appended twice. One
+    process sweeps at a time; the others return 0.
+    """
+    claim = uuid.uuid4().hex
+    conn = connection_factory()
+    cursor = conn.cursor(dictionary=True)
+    synced = 0
+    try:
+        cursor.execute("""
+            UPDATE sheets_sync_state SET claimed_by = %s, claimed_at = NOW()
+            WHERE id = 1 AND (claimed_by IS NULL OR claimed_at < NOW() - INTERVAL %s SECOND)
+        """, (claim, claim_timeout))
+        claimed = cursor.rowcount == 1
+        conn.commit()
+        if not claimed:
+            return 0
+
+        cursor.execute("SELECT appending_through FROM sheets_sync_state WHERE id = 1")
+        appending_through = cursor.fetchone()['appending_through']
+        synced_ids = set()
+        high_water_mark = 0
+        while True:
+            cursor.execute("""
+                SELECT * FROM quiz_summary
+                WHERE synced_to_google = 0 AND id > %s
+                ORDER BY id LIMIT %s
+            """, (high_water_mark, batch_size))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+
+            if appending_through is not None and rows[0]['id'] <= appending_through:
+                synced_ids = client.synced_ids()
+            appending_through = None
+
+            ids = [row['id'] for row in rows]
+            cursor.execute("""
+                UPDATE sheets_sync_state SET appending_through = %s, claimed_at = NOW()
+                WHERE id = 1 AND claimed_by = %s
+            """, (ids[-1], claim))
+            conn.commit()
+
+            _append_with_retry(client, rows, synced_ids, max_retries, backoff)
+
+            placeholders = ', '.join(['%s'] * len(ids))
+            cursor.execute(
+                f"UPDATE quiz_summary SET synced_to_google = 1 WHERE id IN ({placeholders})",
+                ids
+            )
+            cursor.execute("UPDATE sheets_sync_state SET appending_through = NULL WHERE id = 1 AND claimed_by = %s",
+                           (claim,))
+            conn.commit()
+            synced += len(rows)
+            high_water_mark = ids[-1]
+
+            if len(rows) < batch_size:
+                break
+        return synced
+    finally:
+        try:
+            conn.rollback()
+            cursor.execute("UPDATE sheets_sync_state SET claimed_by = NULL, claimed_at = NULL "
+                           "WHERE id = 1 AND claimed_by = %s", (claim,))
+            conn.commit()
+        except Exception as e:
+            print(f"Could not release the Google Sheets sync claim: {e}")
+        cursor.close()
+        conn.close()
+
+
+class SheetsSyncWorker:
+    """Background thread that drains quiz_summary into Google Sheets.
+
+    Submissions call notify() instead of waiting on the sync; notifications that
+    arrive while a sweep is running are coalesced into the next one.
+    """
+
+    def __init__(self, client_factory=create_sheets_client, interval=30, batch_size=500,
+                 max_retries=5, backoff=1.0, claim_timeout=600):
+        self.client_factory = client_factory
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.claim_timeout = claim_timeout
+        self._client = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = self.client_factory()
+        return self._client
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name='sheets-sync', daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def notify(self):
+        self.start()
+        self._wake.set()
+
+    def run_once(self):
+        return sync_pending_rows(self.client, self.batch_size, self.max_retries, self.backoff,
+                                 claim_timeout=self.claim_timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                synced = self.run_once()
+                if synced:
+                    print(f"Synced {synced} quiz_summary rows to Google Sheets.")
+            except Exception as e:
+                print(f"Google Sheets sync failed, will retry: {e}")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+
+sync_worker = SheetsSyncWorker(
+    interval=SHEETS_CONFIG["interval"],
+    batch_size=SHEETS_CONFIG["batch_size"],
+    max_retries=SHEETS_CONFIG["max_retries"],
+    backoff=SHEETS_CONFIG["backoff"],
+    claim_timeout=SHEETS_CONFIG["claim_timeout"]
+)
+
+
+def start_sync():
+    """Start the sync worker in this process, unless a separate daemon runs it."""
+    if SHEETS_CONFIG.get("mode") == "thread":
+        sync_worker.start()
+
+
+def notify_sync():
+    """Tell the sync worker new quiz_summary rows are waiting."""
+    if SHEETS_CONFIG.get("mode") == "thread":
+        sync_worker.notify()
+
+
+if __name__ == '__main__':
+    # Daemon mode: run the worker in its own process until interrupted
+    print("Starting Google Sheets sync daemon...")
+    sync_worker.start()
+    try:
+        while sync_worker._thread.is_alive():
+            sync_worker._thread.join(1)
+    except KeyboardInterrupt:
+        sync_worker.stop()
+    print("Google Sheets sync daemon stopped.")
@@ -0,0 +1,316 @@
+import hashlib
+import mimetypes
+import os
+import re
+import shutil
+import tempfile
+import time
+
+from flask import Response, request, send_file
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.formparser import parse_form_data
+
+from config import UPLOAD_CONFIG, DOWNLOAD_CONFIG
+
+# Room for the multipart boundaries and the small text fields next to the file
+FORM_OVERHEAD = 64 * 1024
+
+
+class StreamedUpload:
+    """A file part written to a temporary file as it is received.
+
+    The content is hashed with SHA-256 and counted on the way in; more than
+    max_bytes raises RequestEntityTooLarge. save_as() moves the finished file
+    into place without copying it again.
+    """
+
+    def __init__(self, folder, max_bytes=None, filename=None):
+        os.makedirs(folder, exist_ok=True)
+        fd, self.temp_path = tempfile.mkstemp(dir=folder, suffix='.part')
+        self._file = os.fdopen(fd, 'w+b')
+        self._hash = hashlib.sha256()
+        self.max_bytes = max_bytes
+        self.filename = filename
+        self.size = 0
+
+    def write(self, data):
+        self.size += len(data)
+        if self.max_bytes is not None and self.size > self.max_bytes:
+            raise RequestEntityTooLarge()
+        self._hash.update(data)
+        return self._file.write(data)
+
+    def seek(self, *args):
+        return self._file.seek(*args)
+
+    def tell(self):
+        return self._file.tell()
+
+    def read(self, *args):
+        return self._file.read(*args)
+
+    def close(self):
+        self._file.close()
+
+    @property
+    def sha256(self):
+        return self._hash.hexdigest()
+
+    def save_as(self, path):
+        self._file.close()
+        os.replace(self.temp_path, path)
+
+    def discard(self):
+        self._file.close()
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+
+def receive_upload(environ, field='file', config=UPLOAD_CONFIG):
+    """Parse a multipart request, streaming its file parts to disk.
+
+    Returns (form, upload): the text fields and the StreamedUpload of `field`
+    (None if it was not sent). Raises RequestEntityTooLarge past
+    config["max_bytes"]; partial files are removed.
+    """
+    uploads = []
+
+    def stream_factory(total_content_length, content_type, filename, content_length=None):
+        upload = StreamedUpload(config["folder"], config["max_bytes"], filename)
+        uploads.append(upload)
+        return upload
+
+    try:
+        _, form, files = parse_form_data(
+            environ, stream_factory=stream_factory, silent=False,
+            max_content_length=config["max_bytes"] + FORM_OVERHEAD
+        )
+    except Exception:
+        for upload in uploads:
+            upload.discard()
+        raise
+
+    part = files.get(field)
+    upload = part.stream if part is not None and part.filename else None
+    for other in uploads:
+        if other is not upload:
+            other.discard()
+    return form, upload
+
+
+#                   ----------- Content-addressed blobs -----------
+
+SHA256_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+
+def hash_file(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BlobStore:
+    """Files stored once per content at <root>/ab/cd/<sha256>.
+
+    Two levels of two hex characters spread the files over 65,536 directories,
+    so no directory grows large however many materials are uploaded.
+    """
+
+    def __init__(self, root, levels=2, width=2):
+        self.root = root
+        self.levels = levels
+        self.width = width
+
+    def path(self, sha256):
+        if not SHA256_PATTERN.match(sha256 or ''):
+            raise ValueError("Not a SHA-256 hex digest")
+        shards = [sha256[i * self.width:(i + 1) * self.width] for i in range(self.levels)]
+        return os.path.join(self.root, *shards, sha256)
+
+    def exists(self, sha256):
+        return os.path.exists(self.path(sha256))
+
+    def put(self, upload):
+        """Store a finished StreamedUpload under its hash; returns False if that content was already stored."""
+        path = self.path(upload.sha256)
+        if os.path.exists(path):
+            upload.discard()
+            return False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        upload.save_as(path)
+        return True
+
+    def delete(self, sha256):
+        path = self.path(sha256)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def files(self):
+        """(sha256, path) of every stored file."""
+        for directory, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if SHA256_PATTERN.match(filename):
+                    yield filename, os.path.join(directory, filename)
+
+
+blob_store = BlobStore(UPLOAD_CONFIG["blob_folder"])
+
+
+def send_blob(sha256, download_name, store=blob_store, config=DOWNLOAD_CONFIG):
+    """Download response for a stored blob.
+
+    The strong ETag is the content hash, so If-None-Match and If-Modified-Since
+    get 304 and If-Range/Range get 206 partial content. With "offload" set,
+    the front server reads and sends the bytes (and applies Range) instead of
+    Python; otherwise the file goes out through the server's file wrapper,
+    which gunicorn sends with sendfile().
+    """
+    path = store.path(sha256)
+    mimetype = mimetypes.guess_type(download_name)[0] or 'application/octet-stream'
+
+    if config["offload"]:
+        stat = os.stat(path)
+        response = Response(mimetype=mimetype)
+        response.headers.set('Content-Disposition', 'attachment', filename=download_name)
+        response.set_etag(sha256)
+        response.last_modified = stat.st_mtime
+        if config["offload"] == "x-accel":
+            relative = os.path.relpath(path, store.root).replace(os.sep, '/')
+            response.headers['X-Accel-Redirect'] = config["x_accel_prefix"] + relative
+        else:
+            response.headers['X-Sendfile'] = path
+        response = response.make_conditional(request.environ)
+        if response.status_code == 304:
+            response.headers.pop('X-Accel-Redirect', None)
+            response.headers.pop('X-Sendfile', None)
+    else:
+        response = send_file(
+            path, mimetype=mimetype, as_attachment=True, download_name=download_name,
+            etag=sha256, conditional=True, max_age=config["max_age"]
+        )
+
+    # Content behind one URL never changes, but downloads need a login, so no shared caches
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.max_age = config["max_age"]
+    return response
+
+
+def collect_garbage(store=blob_store, drive_client=None, orphan_age=UPLOAD_CONFIG["orphan_age"], batch_size=500):
+    """Delete blobs no study material references: the row, the file and the Drive copy.
+
+    Files without a study_blobs row (an upload whose insert failed after the
+    file was stored) are removed once older than orphan_age seconds.
+    Returns (blobs removed, orphan files removed).
+    """
+    from models.db_connection import get_db_connection
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    removed, orphans, drive_ids = 0, 0, []
+    try:
+        cursor.execute("SELECT sha256 FROM study_blobs WHERE ref_count <= 0")
+        for (sha256,) in cursor.fetchall():
+            cursor.execute(
+                "SELECT drive_file_id FROM study_blobs WHERE sha256 = %s AND ref_count <= 0 FOR UPDATE",
+                (sha256,)
+            )
+            row = cursor.fetchone()
+            if row is None:
+                conn.rollback()
+                continue
+            cursor.execute("DELETE FROM study_blobs WHERE sha256 = %s", (sha256,))
+            # Removed while the row is locked: an upload of the same content waits
+            # for this commit and then stores its own copy
+            store.delete(sha256)
+            conn.commit()
+            removed += 1
+            if row[0]:
+                drive_ids.append(row[0])
+
+        cutoff = time.time() - orphan_age
+        candidates = [(sha256, path) for sha256, path in store.files() if os.path.getmtime(path) < cutoff]
+        for start in range(0, len(candidates), batch_size):
+            batch = candidates[start:start + batch_size]
+            placeholders = ', '.join(['%s'] * len(batch))
+            cursor.execute(
+                f"SELECT sha256 FROM study_blobs WHERE sha256 IN ({placeholders})",
+                [sha256 for sha256, _ in batch]
+            )
+            known = {row[0] for row in cursor.fetchall()}
+            for sha256, path in batch:
+                if sha256 not in known:
+                    os.remove(path)
+                    orphans += 1
+    finally:
+        cursor.close()
+        conn.close()
+
+    if drive_ids:
+        if drive_client is None:
+            from services.drive import create_drive_client
+            drive_client = create_drive_client()
+        for file_id in drive_ids:
+            try:
+                drive_client.delete(file_id)
+            except Exception as e:
+                print(f"Could not delete Drive file {file_id}: {e}")
+    return removed, orphans
+
+
+def adopt_files(folder=UPLOAD_CONFIG["folder"], store=blob_store):
+    """Copy files from the flat upload folder into the blob layout when a study_blobs row expects them.
+
+    For materials uploaded before content-addressed storage; the originals stay
+    in place for their existing download links. Returns the number copied.
+    """
+    from models.db_connection import get_db_connection
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    adopted = 0
+    try:
+        for entry in os.scandir(folder):
+            if not entry.is_file() or entry.name.endswith('.part'):
+                continue
+            sha256 = hash_file(entry.path)
+            if store.exists(sha256):
+                continue
+            cursor.execute("SELECT 1 FROM study_blobs WHERE sha256 = %s", (sha256,))
+            if cursor.fetchone():
+                os.makedirs(os.path.dirname(store.path(sha256)), exist_ok=True)
+                shutil.copyfile(entry.path, store.path(sha256))
+                adopted += 1
+    finally:
+        cursor.close()
+        conn.close()
+    return adopted
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Study material storage maintenance.")
+    parser.add_argument('command', choices=['gc', 'adopt', 'recount'])
+    args = parser.parse_args()
+
+    if args.command == 'gc':
+        removed, orphans = collect_garbage()
+        print(f"Removed {removed} unreferenced blobs and {orphans} orphan files.")
+    elif args.command == 'adopt':
+        print(f"Copied {adopt_files()} files into the blob store.")
+    else:
+        from models import blobs
+        from models.db_connection import get_db_connection
+
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            blobs.recount(cursor)
+            conn.commit()
+            print("Recomputed study_blobs.ref_count from study_materials.")
+        finally:
+            cursor.close()
+            conn.close()
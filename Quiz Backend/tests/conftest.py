@@ -0,0 +1,139 @@
+"""Shared fixtures for the backend tests: run with `python -m pytest tests` from Quiz Backend.
+
+The services take their connections from get_db_connection(); tests patch it
+with SQLiteDatabase.connect, a file-backed SQLite database that understands
+the part of MySQL's dialect the code under test uses (%s placeholders,
+NOW() +/- INTERVAL n SECOND, INSERT IGNORE, FOR UPDATE). Each connect()
+opens its own connection, so transactions are isolated as they are in MySQL.
+"""
+import os
+import re
+import sqlite3
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_INTERVAL = re.compile(r"NOW\(\)\s*([+-])\s*INTERVAL\s+(%s|\d+)\s+SECOND", re.IGNORECASE)
+
+
+def translate(query):
+    query = _INTERVAL.sub(
+        lambda m: f"datetime('now', printf('{m.group(1)}%d seconds', {m.group(2)}))", query
+    )
+    query = query.replace("NOW()", "datetime('now')")
+    query = query.replace("INSERT IGNORE", "INSERT OR IGNORE").replace(" FOR UPDATE", "")
+    return query.replace("%s", "?")
+
+
+class SQLiteCursor:
+    def __init__(self, raw, dictionary=False):
+        self._cursor = raw.cursor()
+        self.dictionary = dictionary
+        self.lastrowid = None
+        self.rowcount = -1
+
+    def execute(self, query, params=()):
+        self._cursor.execute(translate(query), tuple(params))
+        self.lastrowid = self._cursor.lastrowid
+        self.rowcount = self._cursor.rowcount
+
+    def executemany(self, query, seq_params):
+        self._cursor.executemany(translate(query), [tuple(params) for params in seq_params])
+        self.rowcount = self._cursor.rowcount
+
+    def _row(self, row):
+        if row is None or not self.dictionary:
+            return row
+        return {column[0]: value for column, value in zip(self._cursor.description, row)}
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    def fetchmany(self, size=1):
+        return [self._row(row) for row in self._cursor.fetchmany(size)]
+
+    def __iter__(self):
+        for row in self._cursor:
+            yield self._row(row)
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    def __init__(self, path):
+        self._raw = sqlite3.connect(path, timeout=10, check_same_thread=False)
+
+    def cursor(self, dictionary=False, **kwargs):
+        return SQLiteCursor(self._raw, dictionary)
+
+    def commit(self):
+        self._raw.commit()
+
+    def rollback(self):
+        self._raw.rollback()
+
+    def close(self):
+        self._raw.close()
+
+
+class SQLiteDatabase:
+    def __init__(self, path):
+        self.path = path
+
+    def connect(self):
+        return SQLiteConnection(self.path)
+
+    def execute_script(self, sql):
+        raw = sqlite3.connect(self.path)
+        try:
+            raw.executescript(sql)
+        finally:
+            raw.close()
+
+    def query(self, query, params=()):
+        """Rows of a query as dicts (for assertions)."""
+        conn = self.connect()
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+            conn.close()
+
+    def execute(self, query, params=()):
+        conn = self.connect()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(query, params)
+            conn.commit()
+            return cursor.lastrowid
+        finally:
+            cursor.close()
+            conn.close()
+
+
+@pytest.fixture
+def sqlite_db(tmp_path):
+    return SQLiteDatabase(str(tmp_path / "quiz.sqlite3"))
+
+
+def wait_for(condition, timeout=10):
+    """Poll condition() until it is true (returns True) or timeout seconds pass (returns False)."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
@@ -0,0 +1,218 @@
+"""DriveUploadWorker against LocalDriveClient and the SQLite stand-in."""
+import hashlib
+import os
+
+import pytest
+
+from conftest import wait_for
+from services import drive
+from services.drive import DriveUploadWorker, LocalDriveClient
+from services.storage import BlobStore
+
+SCHEMA = """
+CREATE TABLE study_blobs (
+    sha256 TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    filename TEXT NOT NULL,
+    ref_count INTEGER NOT NULL DEFAULT 0,
+    drive_status TEXT NOT NULL DEFAULT 'pending',
+    drive_file_id TEXT,
+    drive_attempts INTEGER NOT NULL DEFAULT 0,
+    drive_error TEXT,
+    drive_uploaded_at TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    drive_claimed_by TEXT,
+    drive_claimed_at TIMESTAMP
+);
+CREATE TABLE study_materials (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT,
+    sha256 TEXT,
+    file_path TEXT,
+    file_drive_id TEXT
+);
+"""
+
+
+class FlakyDriveClient(LocalDriveClient):
+    """LocalDriveClient whose first `failures` uploads raise."""
+
+    def __init__(self, path, failures):
+        super().__init__(path)
+        self.failures = failures
+        self.calls = 0
+
+    def upload(self, path, name):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise IOError("Drive unavailable")
+        return super().upload(path, name)
+
+
+@pytest.fixture
+def db(sqlite_db, monkeypatch):
+    sqlite_db.execute_script(SCHEMA)
+    monkeypatch.setattr(drive, 'get_db_connection', sqlite_db.connect)
+    return sqlite_db
+
+
+started = []
+
+
+@pytest.fixture(autouse=True)
+def stop_workers():
+    yield
+    while started:
+        started.pop().stop()
+
+
+def make_worker(client, **options):
+    worker = DriveUploadWorker(client_factory=lambda: client, **options)
+    started.append(worker)
+    return worker
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = BlobStore(str(tmp_path / "blobs"))
+    monkeypatch.setattr(drive, 'blob_store', store)
+    return store
+
+
+def add_blob(db, store, content, filename="notes.pdf", materials=1, **columns):
+    sha256 = hashlib.sha256(content).hexdigest()
+    path = store.path(sha256)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content)
+    db.execute("INSERT INTO study_blobs (sha256, size, filename, ref_count) VALUES (%s, %s, %s, %s)",
+               (sha256, len(content), filename, materials))
+    for i in range(materials):
+        db.execute("INSERT INTO study_materials (title, sha256, file_path) VALUES (%s, %s, %s)",
+                   (f"Material {i}", sha256, f"/api/admin/study-materials/{i}/download"))
+    for column, value in columns.items():
+        db.execute(f"UPDATE study_blobs SET {column} = {value} WHERE sha256 = %s", (sha256,))
+    return sha256
+
+
+def blob(db, sha256):
+    return db.query("SELECT * FROM study_blobs WHERE sha256 = %s", (sha256,))[0]
+
+
+def test_upload_copies_blob_once_for_every_material(db, store, tmp_path):
+    client = LocalDriveClient(str(tmp_path / "drive"))
+    sha256 = add_blob(db, store, b"chapter 1", materials=3)
+
+    worker = make_worker(client)
+    file_id = worker.upload(sha256)
+
+    assert list(client.files) == [file_id]
+    with open(client.files[file_id], 'rb') as f:
+        assert f.read() == b"chapter 1"
+    row = blob(db, sha256)
+    assert (row['drive_status'], row['drive_file_id'], row['drive_attempts']) == ('uploaded', file_id, 1)
+    assert row['drive_claimed_by'] is None
+    materials = db.query("SELECT file_drive_id, file_path FROM study_materials ORDER BY id")
+    assert [m['file_drive_id'] for m in materials] == [file_id] * 3
+    # LocalDriveClient has no link, so the local download URL is kept
+    assert materials[0]['file_path'] == "/api/admin/study-materials/0/download"
+
+    # Already uploaded: a second call does nothing
+    assert worker.upload(sha256) is None
+    assert len(client.files) == 1
+
+
+def test_failed_upload_is_retried_with_backoff(db, store, tmp_path):
+    client = FlakyDriveClient(str(tmp_path / "drive"), failures=2)
+    sha256 = add_blob(db, store, b"chapter 2")
+
+    worker = make_worker(client, max_attempts=5, backoff=0.05)
+    worker.start()
+
+    assert wait_for(lambda: blob(db, sha256)['drive_status'] == 'uploaded')
+    row = blob(db, sha256)
+    assert row['drive_attempts'] == 3
+    assert row['drive_error'] is None
+    assert client.calls == 3
+
+
+def test_upload_without_a_file_id_is_retried(db, store, tmp_path):
+    class NoIdClient(LocalDriveClient):
+        def upload(self, path, name):
+            return None
+
+    sha256 = add_blob(db, store, b"chapter 6")
+    worker = make_worker(NoIdClient(str(tmp_path / "drive")), backoff=60)
+
+    assert worker.upload(sha256) is None
+    row = blob(db, sha256)
+    assert (row['drive_status'], row['drive_attempts'], row['drive_claimed_by']) == ('pending', 1, None)
+    assert row['drive_error'] == "Drive returned no file id"
+
+
+def test_upload_fails_after_max_attempts(db, store, tmp_path):
+    client = FlakyDriveClient(str(tmp_path / "drive"), failures=100)
+    sha256 = add_blob(db, store, b"chapter 3")
+
+    worker = make_worker(client, max_attempts=2, backoff=0.05)
+    worker.start()
+
+    assert wait_for(lambda: blob(db, sha256)['drive_status'] == 'failed')
+    row = blob(db, sha256)
+    assert row['drive_attempts'] == 2
+    assert 'Drive unavailable' in row['drive_error']
+    assert client.files == {}
+
+
+def test_resume_leaves_uploads_in_flight_elsewhere(db, store, tmp_path):
+    client = LocalDriveClient(str(tmp_path / "drive"))
+    # Claimed an hour ago by a process that died, and just now by a sibling process
+    stale = add_blob(db, store, b"stale", drive_status="'uploading'", drive_claimed_by="'dead'",
+                     drive_claimed_at="datetime('now', '-3600 seconds')")
+    alive = add_blob(db, store, b"alive", drive_status="'uploading'", drive_claimed_by="'alive'",
+                     drive_claimed_at="datetime('now')")
+
+    worker = make_worker(client, claim_timeout=600)
+    worker.start()
+
+    assert wait_for(lambda: blob(db, stale)['drive_status'] == 'uploaded')
+    worker._queue.join()
+    assert len(client.files) == 1
+    row = blob(db, alive)
+    assert (row['drive_status'], row['drive_claimed_by']) == ('uploading', 'alive')
+
+
+def test_upload_taken_over_by_another_process_deletes_its_copy(db, store, tmp_path):
+    sha256 = add_blob(db, store, b"chapter 4")
+
+    class SlowClient(LocalDriveClient):
+        def upload(self, path, name):
+            # While this upload runs, its claim times out and another process takes the blob
+            db.execute("UPDATE study_blobs SET drive_claimed_by = 'other', drive_claimed_at = NOW() "
+                       "WHERE sha256 = %s", (sha256,))
+            return super().upload(path, name)
+
+    client = SlowClient(str(tmp_path / "drive"))
+    worker = make_worker(client)
+
+    assert worker.upload(sha256) is None
+    assert client.files == {}
+    assert os.listdir(client.path) == []
+    row = blob(db, sha256)
+    assert (row['drive_status'], row['drive_file_id'], row['drive_claimed_by']) == ('uploading', None, 'other')
+    assert db.query("SELECT file_drive_id FROM study_materials")[0]['file_drive_id'] is None
+
+
+def test_claims_expiring_after_start_are_uploaded_again(db, store, tmp_path):
+    client = LocalDriveClient(str(tmp_path / "drive"))
+    # Claimed by a process that died just before this one started: not yet expired at start
+    sha256 = add_blob(db, store, b"chapter 5", drive_status="'uploading'", drive_claimed_by="'dead'",
+                      drive_claimed_at="datetime('now')")
+
+    worker = make_worker(client, claim_timeout=1, check_interval=0.1)
+    worker.start()
+    worker._queue.join()
+    assert blob(db, sha256)['drive_status'] == 'uploading'
+
+    assert wait_for(lambda: blob(db, sha256)['drive_status'] == 'uploaded')
+    assert len(client.files) == 1
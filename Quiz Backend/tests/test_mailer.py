@@ -0,0 +1,277 @@
+"""MailDispatcher against a local aiosmtpd server and the SQLite stand-in."""
+import socket
+import threading
+
+import pytest
+from aiosmtpd.controller import Controller
+from flask import Flask
+from flask_mail import Mail
+
+import app as server
+from conftest import wait_for
+from services import mailer
+from services.mailer import MailDispatcher, create_mail_job, get_mail_job
+
+SCHEMA = """
+CREATE TABLE email_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    subject TEXT NOT NULL,
+    message TEXT NOT NULL,
+    created_by INTEGER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE email_deliveries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id INTEGER NOT NULL,
+    name TEXT,
+    email TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    sent_at TIMESTAMP,
+    claimed_by TEXT,
+    claimed_at TIMESTAMP
+);
+"""
+
+
+class RecordingHandler:
+    """Accepts every message; refuses recipients in `refuse` until their count runs out."""
+
+    def __init__(self):
+        self.received = []      # one recipient per message
+        self.refuse = {}        # email -> times to answer 451
+        self.lock = threading.Lock()
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        with self.lock:
+            if self.refuse.get(address, 0) > 0:
+                self.refuse[address] -= 1
+                return '451 Try again later'
+        envelope.rcpt_tos.append(address)
+        return '250 OK'
+
+    async def handle_DATA(self, server, session, envelope):
+        with self.lock:
+            self.received.extend(envelope.rcpt_tos)
+        return '250 Message accepted'
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server():
+    handler = RecordingHandler()
+    port = free_port()
+    controller = Controller(handler, hostname='127.0.0.1', port=port)
+    controller.start()
+    yield handler, port
+    controller.stop()
+
+
+@pytest.fixture
+def db(sqlite_db, monkeypatch):
+    sqlite_db.execute_script(SCHEMA)
+    monkeypatch.setattr(mailer, 'get_db_connection', sqlite_db.connect)
+    return sqlite_db
+
+
+def make_app(port):
+    app = Flask(__name__)
+    app.config.update(
+        MAIL_SERVER='127.0.0.1', MAIL_PORT=port, MAIL_USE_TLS=False, MAIL_USE_SSL=False,
+        MAIL_USERNAME='admin@example.com', MAIL_PASSWORD=None, MAIL_SUPPRESS_SEND=False
+    )
+    Mail(app)
+    return app
+
+
+started = []
+
+
+@pytest.fixture(autouse=True)
+def stop_dispatchers():
+    yield
+    while started:
+        started.pop().stop()
+
+
+def make_dispatcher(port, **options):
+    options.setdefault('workers', 2)
+    options.setdefault('batch_size', 3)
+    options.setdefault('backoff', 0.05)
+    dispatcher = MailDispatcher(**options)
+    dispatcher.init_app(make_app(port))
+    started.append(dispatcher)
+    return dispatcher
+
+
+def create_job(db, recipients):
+    conn = db.connect()
+    cursor = conn.cursor()
+    try:
+        job_id = create_mail_job(cursor, "Notice", "Exam moved", recipients, created_by=1)
+        conn.commit()
+        return job_id
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def statuses(db, job_id):
+    return [row['status'] for row in db.query(
+        "SELECT status FROM email_deliveries WHERE job_id = %s ORDER BY id", (job_id,)
+    )]
+
+
+def recipients(count):
+    return [(f"Student {i}", f"student{i}@example.com") for i in range(count)]
+
+
+def test_job_is_delivered_once_per_recipient(db, smtp_server):
+    handler, port = smtp_server
+    job_id = create_job(db, recipients(7))
+
+    dispatcher = make_dispatcher(port)
+    dispatcher.dispatch(job_id)
+
+    assert wait_for(lambda: statuses(db, job_id) == ['sent'] * 7)
+    assert sorted(handler.received) == sorted(email for _, email in recipients(7))
+
+    conn = db.connect()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        job = get_mail_job(cursor, job_id)
+    finally:
+        cursor.close()
+        conn.close()
+    assert job['status'] == 'completed'
+    assert job['counts'] == {"pending": 0, "sending": 0, "sent": 7, "failed": 0}
+
+
+def test_processes_resuming_the_same_job_do_not_send_twice(db, smtp_server):
+    handler, port = smtp_server
+    job_id = create_job(db, recipients(30))
+
+    # Two server processes starting at once both find the job pending
+    first = make_dispatcher(port, batch_size=2)
+    second = make_dispatcher(port, batch_size=2)
+    threads = [threading.Thread(target=dispatcher.start) for dispatcher in (first, second)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert wait_for(lambda: statuses(db, job_id) == ['sent'] * 30)
+    first._queue.join()
+    second._queue.join()
+    assert sorted(handler.received) == sorted(email for _, email in recipients(30))
+
+
+def test_batch_claimed_by_another_process_is_skipped(db, smtp_server):
+    handler, port = smtp_server
+    job_id = create_job(db, recipients(2))
+    db.execute(
+        "UPDATE email_deliveries SET status = 'sending', claimed_by = 'other', claimed_at = NOW() WHERE job_id = %s",
+        (job_id,)
+    )
+
+    dispatcher = make_dispatcher(port)
+    dispatcher._send_batch(job_id, [row['id'] for row in db.query("SELECT id FROM email_deliveries")])
+
+    assert handler.received == []
+    assert statuses(db, job_id) == ['sending', 'sending']
+
+
+def test_stale_claims_are_resumed(db, smtp_server):
+    handler, port = smtp_server
+    job_id = create_job(db, recipients(2))
+    ids = [row['id'] for row in db.query("SELECT id FROM email_deliveries ORDER BY id")]
+    # One claim from a process that died an hour ago, one still in progress elsewhere
+    db.execute("UPDATE email_deliveries SET status = 'sending', claimed_by = 'dead', "
+               "claimed_at = NOW() - INTERVAL 3600 SECOND WHERE id = %s", (ids[0],))
+    db.execute("UPDATE email_deliveries SET status = 'sending', claimed_by = 'alive', "
+               "claimed_at = NOW() WHERE id = %s", (ids[1],))
+
+    dispatcher = make_dispatcher(port, claim_timeout=600)
+    dispatcher.start()
+
+    assert wait_for(lambda: statuses(db, job_id)[0] == 'sent')
+    dispatcher._queue.join()
+    assert handler.received == ["student0@example.com"]
+    assert statuses(db, job_id) == ['sent', 'sending']
+
+
+def test_claims_expiring_after_start_are_sent_again(db, smtp_server):
+    handler, port = smtp_server
+    job_id = create_job(db, recipients(2))
+    # Claimed by a process that died just before this one started: not yet expired at start
+    db.execute("UPDATE email_deliveries SET status = 'sending', claimed_by = 'dead', claimed_at = NOW()")
+
+    dispatcher = make_dispatcher(port, claim_timeout=1, check_interval=0.1)
+    dispatcher.start()
+    dispatcher._queue.join()
+    assert handler.received == []
+
+    assert wait_for(lambda: statuses(db, job_id) == ['sent', 'sent'])
+    assert sorted(handler.received) == ["student0@example.com", "student1@example.com"]
+
+
+def test_refused_recipient_is_retried_with_backoff(db, smtp_server):
+    handler, port = smtp_server
+    handler.refuse["student1@example.com"] = 2
+    job_id = create_job(db, recipients(3))
+
+    dispatcher = make_dispatcher(port, max_attempts=5)
+    dispatcher.dispatch(job_id)
+
+    assert wait_for(lambda: statuses(db, job_id) == ['sent'] * 3)
+    retried = db.query("SELECT attempts, last_error FROM email_deliveries WHERE email = %s",
+                       ("student1@example.com",))[0]
+    assert retried['attempts'] == 3
+    assert retried['last_error'] is None
+    assert sorted(handler.received) == sorted(email for _, email in recipients(3))
+
+
+def test_recipient_fails_after_max_attempts(db, smtp_server):
+    handler, port = smtp_server
+    handler.refuse["student0@example.com"] = 100
+    job_id = create_job(db, recipients(1))
+
+    dispatcher = make_dispatcher(port, max_attempts=2)
+    dispatcher.dispatch(job_id)
+
+    assert wait_for(lambda: statuses(db, job_id) == ['failed'])
+    failed = db.query("SELECT attempts, last_error FROM email_deliveries")[0]
+    assert failed['attempts'] == 2
+    assert '451' in failed['last_error']
+    assert handler.received == []
+
+
+def test_pending_job_is_sent_when_the_server_starts(db, smtp_server, monkeypatch):
+    handler, port = smtp_server
+    # Committed before the restart, never dispatched by the process that created it
+    job_id = create_job(db, recipients(2))
+
+    for key, value in make_app(port).config.items():
+        if key.startswith('MAIL_'):
+            monkeypatch.setitem(server.app.config, key, value)
+    monkeypatch.setitem(server.app.extensions, 'mail', Mail(server.app).state)
+    dispatcher = MailDispatcher(workers=2, batch_size=3)
+    dispatcher.init_app(server.app)
+    started.append(dispatcher)
+    monkeypatch.setattr(server, 'mail_dispatcher', dispatcher)
+    # Only the mail dispatcher talks to the test database
+    monkeypatch.setattr(server.drive_uploader, 'start', lambda: None)
+    monkeypatch.setattr(server.session_sweeper, 'start', lambda: None)
+    monkeypatch.setattr(server, 'start_sync', lambda: None)
+    monkeypatch.setattr(server, '_workers_started', False)
+
+    server.start_background_workers()
+
+    assert wait_for(lambda: statuses(db, job_id) == ['sent', 'sent'])
+    assert sorted(handler.received) == ["student0@example.com", "student1@example.com"]
@@ -0,0 +1,59 @@
+"""Per-request query attribution and slow-query logging in models/metrics.py."""
+import logging
+
+import pytest
+from flask import Flask
+
+from models import metrics
+
+
+class FakeCursor:
+    def execute(self, operation, params=None):
+        pass
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setitem(metrics.METRICS_CONFIG, "enabled", True)
+    monkeypatch.setattr(metrics, 'log', metrics.log)
+    app = Flask(__name__)
+    metrics.init_app(app)
+
+    @app.route('/query')
+    def query():
+        metrics.InstrumentedCursor(FakeCursor()).execute("SELECT 1")
+        return "ok"
+
+    @app.route('/fail')
+    def fail():
+        raise RuntimeError("boom")
+
+    @app.after_request
+    def broken_hook(response):
+        # An after_request hook that fails skips the hooks registered before it
+        if response.status_code == 500:
+            raise RuntimeError("hook failed")
+        return response
+
+    yield app
+    metrics._current.route = None
+
+
+def test_route_is_cleared_after_a_failed_request(app):
+    app.test_client().get('/query')
+    assert metrics._current.route is None
+
+    assert app.test_client().get('/fail').status_code == 500
+    assert metrics._current.route is None
+
+
+def test_slow_query_goes_to_the_app_logger_without_literals(app, monkeypatch, caplog):
+    monkeypatch.setitem(metrics.METRICS_CONFIG, "slow_query_ms", 0)
+    with caplog.at_level(logging.WARNING, logger=app.logger.name):
+        metrics.record_query("SELECT * FROM students\n  WHERE email = 'ann@example.com' AND id IN (12, 13)", 0.5)
+
+    [record] = caplog.records
+    assert record.name == app.logger.name
+    assert record.getMessage() == (
+        "Slow query (500.0 ms, background): SELECT * FROM students WHERE email = ? AND id IN (?, ?)"
+    )
@@ -0,0 +1,124 @@
+"""migrate.py against a fake MySQL connection that reports error codes like mysql-connector."""
+import pytest
+
+import migrate
+
+
+class MySQLError(Exception):
+    """mysql-connector errors carry the error number as args[0]."""
+
+
+class FakeCursor:
+    def __init__(self, database):
+        self.database = database
+
+    def execute(self, statement, params=()):
+        self.database.execute(statement, params)
+
+    def fetchall(self):
+        return [(version,) for version in sorted(self.database.applied)]
+
+    def close(self):
+        pass
+
+
+class FakeDatabase:
+    """Keeps the set of columns of one table; DDL takes effect at once (as MySQL commits it)."""
+
+    def __init__(self, columns):
+        self.columns = set(columns)
+        self.applied = set()
+        self.fail_on = None     # statement text that raises once, like a lost connection
+
+    def connect(self):
+        return self
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+    def execute(self, statement, params):
+        if self.fail_on and self.fail_on in statement:
+            self.fail_on = None
+            raise MySQLError(2013, "Lost connection to MySQL server during query")
+        words = statement.split()
+        if statement.startswith("INSERT INTO schema_migrations"):
+            self.applied.add(params[0])
+        elif words[:2] == ["ALTER", "TABLE"] and words[3:5] == ["DROP", "COLUMN"]:
+            if words[5] not in self.columns:
+                raise MySQLError(1091, f"Can't DROP '{words[5]}'; check that column/key exists")
+            self.columns.remove(words[5])
+        elif words[:2] == ["ALTER", "TABLE"] and words[3:5] == ["ADD", "COLUMN"]:
+            if words[5] in self.columns:
+                raise MySQLError(1060, f"Duplicate column name '{words[5]}'")
+            self.columns.add(words[5])
+        elif words[0] == "UPDATE":
+            missing = [column for column in ("local_path",) if column in statement and column not in self.columns]
+            if missing:
+                raise MySQLError(1054, f"Unknown column '{missing[0]}' in 'field list'")
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    (tmp_path / "0001_add.sql").write_text(
+        "ALTER TABLE study_materials ADD COLUMN local_path VARCHAR(500) NULL;\n\n"
+        "UPDATE study_materials SET title = local_path WHERE title IS NULL;\n"
+    )
+    (tmp_path / "0002_drop.sql").write_text(
+        "-- Drop the copied columns\n"
+        "ALTER TABLE study_materials DROP COLUMN local_path;\n\n"
+        "ALTER TABLE study_materials DROP COLUMN file_size;\n"
+    )
+    database = FakeDatabase({"id", "title", "file_size"})
+    monkeypatch.setattr(migrate, 'MIGRATIONS_DIR', str(tmp_path))
+    monkeypatch.setattr(migrate, 'get_db_connection', database.connect)
+    return database
+
+
+def test_migration_interrupted_between_drops_can_be_rerun(database):
+    database.fail_on = "DROP COLUMN file_size"
+    with pytest.raises(MySQLError):
+        migrate.migrate()
+    assert database.applied == {1}
+    assert database.columns == {"id", "title", "file_size"}
+
+    migrate.migrate()
+
+    assert database.applied == {1, 2}
+    assert database.columns == {"id", "title"}
+
+
+def test_rerun_skips_columns_already_dropped(database):
+    database.columns = {"id", "title"}
+    database.applied = {1}
+
+    migrate.migrate()
+
+    assert database.applied == {1, 2}
+
+
+def test_missing_column_is_still_an_error_outside_drops(database):
+    # 0001 has no column to add here, so its UPDATE reads a column that does not exist
+    database.columns = {"id", "title"}
+    with open(f"{migrate.MIGRATIONS_DIR}/0001_add.sql", "w") as f:
+        f.write("UPDATE study_materials SET title = local_path WHERE title IS NULL;\n")
+
+    with pytest.raises(MySQLError) as error:
+        migrate.migrate()
+    assert error.value.args[0] == 1054
+    assert database.applied == set()
+
+
+def test_only_drop_statements_tolerate_missing_objects():
+    assert 1091 in migrate.tolerated_errors("ALTER TABLE study_materials DROP COLUMN local_path")
+    assert 1091 in migrate.tolerated_errors("DROP TABLE old_uploads")
+    assert 1054 not in migrate.tolerated_errors("UPDATE study_materials SET original_filename = local_path")
+    assert 1091 not in migrate.tolerated_errors("ALTER TABLE study_materials ADD COLUMN sha256 CHAR(64) NULL")
@@ -0,0 +1,33 @@
+"""Page argument validation and cursors in models/pagination.py."""
+import pytest
+
+from models.pagination import Page
+
+FIELDS = {"id": "s.id", "name": "s.name", "email": "s.email"}
+
+
+def test_fields_selects_a_subset():
+    page = Page({'fields': 'name, email'}, FIELDS)
+    assert not page.paginated
+    assert page.select("s.id") == "s.name AS name, s.email AS email"
+
+
+@pytest.mark.parametrize('fields', [',', ' ', ' , '])
+def test_fields_naming_nothing_is_rejected(fields):
+    with pytest.raises(ValueError, match="at least one field"):
+        Page({'fields': fields}, FIELDS)
+
+
+def test_unknown_field_is_rejected():
+    with pytest.raises(ValueError, match="Unknown fields: phone"):
+        Page({'fields': 'name,phone'}, FIELDS)
+
+
+def test_next_cursor_continues_after_the_last_row():
+    page = Page({'limit': '2'}, FIELDS)
+    body = page.result([{"id": 1, "_page_key": 1}, {"id": 2, "_page_key": 2}, {"id": 3, "_page_key": 3}])
+    assert body["items"] == [{"id": 1}, {"id": 2}]
+
+    following = Page({'limit': '2', 'cursor': body["next_cursor"]}, FIELDS)
+    assert following.clause("s.id") == ("WHERE s.id > %s ORDER BY s.id ASC LIMIT %s", (2, 3))
+    assert following.result([{"id": 3, "_page_key": 3}])["next_cursor"] is None
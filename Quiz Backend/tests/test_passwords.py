@@ -0,0 +1,51 @@
+"""PasswordManager verification rules (cheap scrypt settings to keep the tests fast)."""
+import pytest
+
+from models.passwords import PasswordManager
+
+
+@pytest.fixture
+def manager():
+    manager = PasswordManager('scrypt', {'scrypt': {'n': 2 ** 4, 'r': 8, 'p': 1}}, workers=2)
+    verifies = []
+    hasher = manager.hasher()
+    original = hasher.verify
+    hasher.verify = lambda password, stored: verifies.append(stored) or original(password, stored)
+    manager.verifies = verifies
+    return manager
+
+
+def test_hash_verifies_and_wrong_password_does_not(manager):
+    stored = manager.hash('secret')
+    assert manager.check('secret', stored) == (True, None)
+    assert manager.check('wrong', stored) == (False, None)
+
+
+def test_outdated_cost_is_rehashed_on_login():
+    old = PasswordManager('scrypt', {'scrypt': {'n': 2 ** 4, 'r': 8, 'p': 1}}).hash('secret')
+    matches, new_hash = PasswordManager('scrypt', {'scrypt': {'n': 2 ** 5, 'r': 8, 'p': 1}}).check('secret', old)
+    assert matches
+    assert new_hash.startswith('scrypt$32$')
+
+
+def test_plaintext_is_accepted_only_on_legacy_rows(manager):
+    matches, new_hash = manager.check('secret', 'secret', legacy=True)
+    assert matches
+    assert manager.identify(new_hash) == 'scrypt'
+
+    assert manager.check('secret', 'secret') == (False, None)
+    assert manager.check('wrong', 'secret', legacy=True) == (False, None)
+
+
+def test_unknown_account_costs_a_verify(manager):
+    assert manager.check('secret', None) == (False, None)
+    assert manager.check('secret', 'not-a-hash') == (False, None)
+    # Both ran a real verify against the same dummy hash
+    assert len(manager.verifies) == 2
+    assert manager.verifies[0] == manager.verifies[1] == manager.dummy_hash()
+
+
+def test_check_in_pool_returns_the_result(manager):
+    stored = manager.hash('secret')
+    assert manager.check_in_pool('secret', stored) == (True, None)
+    assert manager.check_in_pool('secret', None) == (False, None)
@@ -0,0 +1,74 @@
+"""Answer-key cache consistency across server processes, against the SQLite stand-in."""
+import pytest
+
+from models import quiz_cache
+from models.cache import VersionedCache
+from models.quiz_cache import get_answer_key
+
+SCHEMA = """
+CREATE TABLE quizzes (
+    id INTEGER PRIMARY KEY,
+    title TEXT,
+    attempt_limit INTEGER,
+    content_version INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE quiz_questions (id INTEGER PRIMARY KEY, quiz_id INTEGER, question TEXT);
+CREATE TABLE quiz_options (id INTEGER PRIMARY KEY, question_id INTEGER, option_text TEXT, is_correct INTEGER);
+INSERT INTO quizzes (id, title, attempt_limit) VALUES (1, 'Algebra', 3);
+INSERT INTO quiz_questions (id, quiz_id, question) VALUES (10, 1, '1 + 1'), (11, 1, '2 + 2');
+INSERT INTO quiz_options (id, question_id, option_text, is_correct) VALUES
+    (100, 10, '2', 1), (101, 10, '3', 0), (110, 11, '4', 1), (111, 11, '5', 0);
+"""
+
+
+@pytest.fixture
+def db(sqlite_db, monkeypatch):
+    sqlite_db.execute_script(SCHEMA)
+    monkeypatch.setattr(quiz_cache, 'get_db_connection', sqlite_db.connect)
+    monkeypatch.setattr(quiz_cache, 'answer_key_cache', VersionedCache(ttl=300))
+    return sqlite_db
+
+
+def change_correct_option(db, question_id, option_id):
+    """An edit made by another server process: the database changes, this process's cache is not told.
+
+    MySQL bumps content_version with triggers (migration 0012); SQLite does it here.
+    """
+    db.execute("UPDATE quiz_options SET is_correct = (id = %s) WHERE question_id = %s", (option_id, question_id))
+    db.execute("UPDATE quizzes SET content_version = content_version + 1 WHERE id = "
+               "(SELECT quiz_id FROM quiz_questions WHERE id = %s)", (question_id,))
+
+
+def test_cached_key_is_used_while_the_quiz_is_unchanged(db):
+    first = get_answer_key(1)
+    assert first.score({"10": "100", "11": "110"}) == 2
+    assert get_answer_key(1) is first
+    assert get_answer_key(1, version=0) is first
+
+
+def test_key_changed_in_another_process_is_reloaded(db):
+    assert get_answer_key(1).score({"10": "101", "11": "110"}) == 1
+
+    change_correct_option(db, 10, 101)
+
+    assert get_answer_key(1).score({"10": "101", "11": "110"}) == 2
+
+
+def test_version_read_by_the_caller_is_used(db):
+    stale = get_answer_key(1)
+    change_correct_option(db, 10, 101)
+
+    # The submit route passes the version from its eligibility query
+    conn = db.connect()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("SELECT content_version FROM quizzes WHERE id = %s", (1,))
+        version = cursor.fetchone()['content_version']
+        fresh = get_answer_key(1, cursor, version)
+    finally:
+        cursor.close()
+        conn.close()
+
+    assert fresh is not stale
+    assert fresh.score({"10": "101", "11": "110"}) == 2
+    assert get_answer_key(1, version=version) is fresh
@@ -0,0 +1,85 @@
+"""Re-grading stored attempts after an answer key fix, against the SQLite stand-in."""
+import pytest
+from flask import Flask
+
+from controllers import Admin_controller
+from models import quiz_cache
+from models.cache import VersionedCache
+from models.scoring import pack_answers
+
+SCHEMA = """
+CREATE TABLE quizzes (
+    id INTEGER PRIMARY KEY,
+    title TEXT,
+    attempt_limit INTEGER,
+    content_version INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE quiz_questions (id INTEGER PRIMARY KEY, quiz_id INTEGER, question TEXT);
+CREATE TABLE quiz_options (id INTEGER PRIMARY KEY, question_id INTEGER, option_text TEXT, is_correct INTEGER);
+CREATE TABLE quiz_results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    student_id INTEGER,
+    quiz_id INTEGER,
+    attempt_number INTEGER,
+    score INTEGER,
+    feedback TEXT,
+    answers BLOB
+);
+INSERT INTO quizzes (id, title, attempt_limit) VALUES (1, 'Algebra', 3);
+INSERT INTO quiz_questions (id, quiz_id, question) VALUES (10, 1, '1 + 1'), (11, 1, '2 + 2');
+INSERT INTO quiz_options (id, question_id, option_text, is_correct) VALUES
+    (100, 10, '2', 1), (101, 10, '3', 0), (110, 11, '4', 1), (111, 11, '5', 0);
+"""
+
+
+@pytest.fixture
+def db(sqlite_db, monkeypatch):
+    sqlite_db.execute_script(SCHEMA)
+    monkeypatch.setattr(Admin_controller, 'get_db_connection', sqlite_db.connect)
+    monkeypatch.setattr(quiz_cache, 'get_db_connection', sqlite_db.connect)
+    monkeypatch.setattr(quiz_cache, 'answer_key_cache', VersionedCache(ttl=300))
+    return sqlite_db
+
+
+def add_attempt(db, student_id, answers, score, total):
+    db.execute(
+        "INSERT INTO quiz_results (student_id, quiz_id, attempt_number, score, feedback, answers) "
+        "VALUES (%s, 1, 1, %s, %s, %s)",
+        (student_id, score, f"Your score is {score}/{total}.", pack_answers(answers))
+    )
+
+
+def regrade():
+    with Flask(__name__).test_request_context(method='POST'):
+        response, status = Admin_controller.regrade_quiz_results(1)
+    assert status == 200
+    return response.get_json()
+
+
+def test_added_question_updates_feedback_of_unchanged_scores(db):
+    add_attempt(db, 1, {"10": "100", "11": "110"}, 2, 2)
+    add_attempt(db, 2, {"10": "101", "11": "110"}, 1, 2)
+    # The fix adds a question nobody answered: scores stay, the denominator does not
+    db.execute("INSERT INTO quiz_questions (id, quiz_id, question) VALUES (12, 1, '3 + 3')")
+    db.execute("INSERT INTO quiz_options (id, question_id, option_text, is_correct) VALUES (120, 12, '6', 1)")
+
+    assert regrade() == {"message": "Quiz results re-graded successfully",
+                         "regraded": 2, "changed": 2, "skipped": 0}
+    rows = db.query("SELECT score, feedback FROM quiz_results ORDER BY id")
+    assert rows == [{"score": 2, "feedback": "Your score is 2/3."},
+                    {"score": 1, "feedback": "Your score is 1/3."}]
+
+    # Nothing left to rewrite
+    assert regrade()["changed"] == 0
+
+
+def test_changed_key_rewrites_score_and_feedback(db):
+    add_attempt(db, 1, {"10": "101", "11": "110"}, 1, 2)
+    # Did not answer the corrected question: nothing to rewrite
+    add_attempt(db, 2, {"11": "110"}, 1, 2)
+    db.execute("UPDATE quiz_options SET is_correct = (id = 101) WHERE question_id = 10")
+
+    assert regrade()["changed"] == 1
+    rows = db.query("SELECT score, feedback FROM quiz_results ORDER BY id")
+    assert rows == [{"score": 2, "feedback": "Your score is 2/2."},
+                    {"score": 1, "feedback": "Your score is 1/2."}]
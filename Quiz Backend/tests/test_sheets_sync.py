@@ -0,0 +1,193 @@
+"""sync_pending_rows against LocalSheetsClient and the SQLite stand-in."""
+import pytest
+
+from services.sheets_sync import LocalSheetsClient, sync_pending_rows
+
+SCHEMA = """
+CREATE TABLE quiz_summary (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    student_name TEXT,
+    quiz_title TEXT,
+    score INTEGER,
+    attempt_number INTEGER,
+    feedback TEXT,
+    inserted_at TIMESTAMP,
+    synced_to_google INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE sheets_sync_state (
+    id INTEGER PRIMARY KEY,
+    appending_through INTEGER,
+    claimed_by TEXT,
+    claimed_at TIMESTAMP
+);
+INSERT INTO sheets_sync_state (id) VALUES (1);
+"""
+
+
+class FlakySheetsClient(LocalSheetsClient):
+    """LocalSheetsClient whose calls fail as configured.
+
+    append_failures: appends that raise without writing.
+    landed_failures: appends that write the rows and then raise (the response was lost).
+    read_failures: synced_ids() calls that raise once an append was attempted.
+    """
+
+    def __init__(self, append_failures=0, landed_failures=0, read_failures=0):
+        super().__init__()
+        self.append_failures = append_failures
+        self.landed_failures = landed_failures
+        self.read_failures = read_failures
+        self.append_calls = 0
+        self.read_calls = 0
+
+    def append_rows(self, rows):
+        self.append_calls += 1
+        if self.append_failures:
+            self.append_failures -= 1
+            raise IOError("503 Service Unavailable")
+        super().append_rows(rows)
+        if self.landed_failures:
+            self.landed_failures -= 1
+            raise IOError("Connection reset after the rows were written")
+
+    def synced_ids(self):
+        self.read_calls += 1
+        if self.read_failures and self.append_calls:
+            self.read_failures -= 1
+            raise IOError("Could not read the sheet")
+        return super().synced_ids()
+
+
+@pytest.fixture
+def db(sqlite_db):
+    sqlite_db.execute_script(SCHEMA)
+    return sqlite_db
+
+
+def add_results(db, count):
+    for i in range(count):
+        db.execute(
+            "INSERT INTO quiz_summary (student_name, quiz_title, score, attempt_number, feedback) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            (f"Student {i}", "Algebra", i % 10, 1, f"Your score is {i % 10}/10.")
+        )
+
+
+def sync(db, client, **options):
+    options.setdefault('batch_size', 4)
+    options.setdefault('backoff', 0)
+    return sync_pending_rows(client, connection_factory=db.connect, **options)
+
+
+def sheet_ids(client):
+    return [int(row[0]) for row in client.rows]
+
+
+def unsynced(db):
+    return db.query("SELECT COUNT(*) AS n FROM quiz_summary WHERE synced_to_google = 0")[0]['n']
+
+
+def state(db):
+    return db.query("SELECT * FROM sheets_sync_state WHERE id = 1")[0]
+
+
+def test_pending_rows_are_appended_in_order_and_marked(db):
+    add_results(db, 10)
+    client = FlakySheetsClient()
+
+    assert sync(db, client) == 10
+    assert sheet_ids(client) == list(range(1, 11))
+    assert client.rows[0] == [1, 'Student 0', 'Algebra', 0, 1, 'Your score is 0/10.', None]
+    assert unsynced(db) == 0
+    assert state(db)['appending_through'] is None
+    assert state(db)['claimed_by'] is None
+
+    # Nothing new: the next sweep appends nothing
+    assert sync(db, client) == 0
+    add_results(db, 2)
+    assert sync(db, client) == 2
+    assert sheet_ids(client) == list(range(1, 13))
+    # Sweeps whose appends succeeded never read the sheet back
+    assert client.read_calls == 0
+
+
+def test_sweep_resumes_after_rows_were_appended_but_not_marked(db):
+    add_results(db, 6)
+    client = FlakySheetsClient()
+    # The process stopped after appending rows 1-3 and before marking them synced
+    client.append_rows([[1], [2], [3]])
+    db.execute("UPDATE sheets_sync_state SET appending_through = 3")
+
+    assert sync(db, client) == 6
+    assert sheet_ids(client) == [1, 2, 3, 4, 5, 6]
+    assert client.read_calls == 1
+    assert unsynced(db) == 0
+
+
+def test_rows_committed_below_the_mark_are_still_appended(db):
+    add_results(db, 3)
+    client = FlakySheetsClient()
+    assert sync(db, client) == 3
+    # A submission that committed late has a lower id than rows already synced
+    db.execute("UPDATE quiz_summary SET synced_to_google = 0 WHERE id = 2")
+
+    assert sync(db, client) == 1
+    assert sheet_ids(client) == [1, 2, 3, 2]
+    assert client.read_calls == 0
+
+
+def test_only_one_process_sweeps_at_a_time(db):
+    add_results(db, 3)
+    client = FlakySheetsClient()
+    db.execute("UPDATE sheets_sync_state SET claimed_by = 'other', claimed_at = NOW()")
+
+    assert sync(db, client) == 0
+    assert client.rows == []
+
+    # A claim older than claim_timeout belongs to a process that died
+    db.execute("UPDATE sheets_sync_state SET claimed_at = NOW() - INTERVAL 3600 SECOND")
+    assert sync(db, client, claim_timeout=600) == 3
+    assert state(db)['claimed_by'] is None
+
+
+def test_failed_append_is_retried(db):
+    add_results(db, 3)
+    client = FlakySheetsClient(append_failures=2)
+
+    assert sync(db, client, max_retries=5) == 3
+    assert client.append_calls == 3
+    assert sheet_ids(client) == [1, 2, 3]
+
+
+def test_append_that_landed_despite_an_error_is_not_resent(db):
+    add_results(db, 3)
+    client = FlakySheetsClient(landed_failures=1)
+
+    assert sync(db, client, max_retries=5) == 3
+    assert sheet_ids(client) == [1, 2, 3]
+
+
+def test_failed_reread_is_retried_instead_of_escaping(db):
+    add_results(db, 3)
+    client = FlakySheetsClient(landed_failures=1, read_failures=1)
+
+    assert sync(db, client, max_retries=5) == 3
+    assert sheet_ids(client) == [1, 2, 3]
+    assert client.read_calls == 2
+    assert unsynced(db) == 0
+
+
+def test_rows_stay_pending_when_retries_run_out(db):
+    add_results(db, 3)
+    client = FlakySheetsClient(append_failures=10)
+
+    with pytest.raises(IOError):
+        sync(db, client, max_retries=3)
+    assert client.append_calls == 3
+    assert unsynced(db) == 3
+    assert state(db)['appending_through'] == 3
+
+    # The next sweep checks the sheet for them, then appends them
+    assert sync(db, client, max_retries=20) == 3
+    assert sheet_ids(client) == [1, 2, 3]
+    assert state(db)['appending_through'] is None
@@ -0,0 +1,9 @@
+# WSGI entry point for production servers, e.g.
+#   waitress-serve --threads 16 --port 5000 wsgi:app
+#   gunicorn --workers 2 --threads 16 --worker-class gthread --bind 0.0.0.0:5000 wsgi:app
+#   uvicorn wsgi:app --interface wsgi --workers 2 --port 5000   (ASGI server hosting the WSGI app)
+# or simply `python serve.py`, which reads SERVER_CONFIG. Background workers (Drive
+# uploads, session sweeps, Sheets sync) start with serve.py, or on the first request elsewhere.
+from app import app, start_background_workers
+
+application = app
@@ -0,0 +1,108 @@
+// Sends the login session token with every request to the backend API.
+// Include before a page's own script: <script src="api.js"></script>
+const API_BASE = 'http://127.0.0.1:5000/api/';
+
+(function () {
+    const nativeFetch = window.fetch.bind(window);
+
+    window.fetch = function (resource, options = {}) {
+        const url = typeof resource === 'string' ? resource : resource.url;
+        const token = localStorage.getItem('session_token');
+        if (!token || !url.startsWith(API_BASE)) {
+            return nativeFetch(resource, options);
+        }
+        const headers = new Headers(options.headers || {});
+        headers.set('Authorization', `Bearer ${token}`);
+        return nativeFetch(resource, { ...options, headers }).then(response => {
+            if (response.status === 401 && !url.endsWith('/logout')) {
+                // Expired or revoked session: log in again
+                localStorage.removeItem('session_token');
+                alert('Your session has expired. Please log in again.');
+                window.location.href = 'index.html';
+            }
+            return response;
+        });
+    };
+})();
+
+// Download an API file with the session token (plain links cannot send it)
+async function downloadFile(url, fallbackName = 'download') {
+    const response = await fetch(url);
+    if (!response.ok) {
+        let message = `Download failed (${response.status})`;
+        try {
+            message = (await response.json()).error || message;
+        } catch (e) { /* not JSON */ }
+        alert(message);
+        return;
+    }
+    const disposition = response.headers.get('Content-Disposition') || '';
+    const match = disposition.match(/filename\*=UTF-8''([^;]+)|filename="?([^";]+)"?/i);
+    const filename = match ? decodeURIComponent(match[1] || match[2]) : fallbackName;
+
+    const blobUrl = URL.createObjectURL(await response.blob());
+    const link = document.createElement('a');
+    link.href = blobUrl;
+    link.download = filename;
+    document.body.appendChild(link);
+    link.click();
+    link.remove();
+    setTimeout(() => URL.revokeObjectURL(blobUrl), 60000);
+}
+
+// Links marked data-api-download go through downloadFile; other links (e.g. Google Drive) open normally
+document.addEventListener('click', event => {
+    const link = event.target.closest('a[data-api-download]');
+    if (link && link.href.startsWith(API_BASE)) {
+        event.preventDefault();
+        downloadFile(link.href, link.dataset.apiDownload || 'download');
+    }
+});
+
+// List endpoints (students, results, study materials, ...) return {items, next_cursor}
+// when asked for a page; next_cursor is null on the last page
+const PAGE_SIZE = 100;
+
+async function fetchPage(url, cursor = null, limit = PAGE_SIZE) {
+    let pageUrl = `${url}${url.includes('?') ? '&' : '?'}limit=${limit}`;
+    if (cursor) {
+        pageUrl += `&cursor=${encodeURIComponent(cursor)}`;
+    }
+    const response = await fetch(pageUrl);
+    const data = await response.json();
+    if (!response.ok) {
+        throw new Error(data.error || `Request failed (${response.status})`);
+    }
+    return data;
+}
+
+// Every item of a list, a page at a time (for dropdowns and exports that need the whole list)
+async function fetchAllPages(url, limit = 500) {
+    const items = [];
+    let cursor = null;
+    do {
+        const page = await fetchPage(url, cursor, limit);
+        items.push(...page.items);
+        cursor = page.next_cursor;
+    } while (cursor);
+    return items;
+}
+
+// Show a list a page at a time: renders the first page now and the next one on each
+// click of the "Load more" button, which is hidden once the last page is shown
+function showPages(url, renderItems, button) {
+    let cursor = null;
+    async function loadNext() {
+        button.disabled = true;
+        try {
+            const page = await fetchPage(url, cursor);
+            renderItems(page.items);
+            cursor = page.next_cursor;
+        } finally {
+            button.disabled = false;
+            button.style.display = cursor ? '' : 'none';
+        }
+    }
+    button.onclick = () => loadNext().catch(error => alert(error.message));
+    return loadNext();
+}